@@ -8,10 +8,18 @@
 
 """
 
-import os
 import logging
 
-from utils.module_import import get_class
+from utils import out_tree
+from utils.module_import import get_class, register_plugins
+
+register_plugins('action', {
+    'copy': [],
+    'skip': [],
+    'pack': [],
+    'compress': [],
+    'ffmpeg.convert': ['ffmpeg', 'thread_tuner'],
+})
 
 
 def get_action_class(action_id: str):
@@ -47,6 +55,34 @@ class AbstractAction:
         """
         raise NotImplementedError
 
+    def get_output_paths(self, input_url: str, action_params: dict, out_dir_path: str):
+        """ Возвращает пути к файлам, которые создаст действие
+
+        Используется диспетчером для обнаружения конфликтов до начала обработки - ничего не должно меняться, а
+        обращений к файловой системе должно быть как можно меньше.
+
+        Args:
+            input_url: путь к обрабатываемому файлу
+            action_params: параметры действия
+            out_dir_path: путь к директории для выходных данных действия
+
+        Returns:
+            Список путей или None, если заранее их определить нельзя
+        """
+        return None
+
+    def finalize(self, simulate: bool) -> None:
+        """ Завершает работу действия
+
+        Вызывается диспетчером один раз после обработки всех файлов (в том числе - при аварийном завершении) для всех
+        использовавшихся действий. Подходит для действий, накапливающих результат нескольких запусков, например - для
+        дописывания архивов.
+
+        Args:
+            simulate: флаг симуляции
+        """
+        pass
+
 
 class OutDirCreatingAction(AbstractAction):
     """ Базовый класс для всех действий, которые сами создают структуру папок в `out_dir_path`
@@ -56,5 +92,4 @@ class OutDirCreatingAction(AbstractAction):
     def run(self, input_url: str, action_params: dict, out_dir_path: str, simulate: bool) -> None:
         if not simulate:
             logging.debug('Creating output directory "{}"...'.format(out_dir_path))
-            if not simulate:
-                os.makedirs(out_dir_path, exist_ok=True)
+            out_tree.makedirs(out_dir_path)
@@ -0,0 +1,183 @@
+""" Модуль с классом `CompressAction`
+
+"""
+
+import hashlib
+import logging
+import lzma
+import os
+import shutil
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from action import OutDirCreatingAction
+from utils import io_shaping, out_tree, urls
+
+READ_SIZE = 1024 * 1024
+
+CODECS = {
+    'zstd': {'extension': '.zst', 'level': 3},
+    'xz': {'extension': '.xz', 'level': 6},
+}
+
+COMPRESSED_EXTENSIONS = frozenset([
+    '.7z', '.aac', '.avi', '.bz2', '.cr2', '.docx', '.flac', '.gz', '.heic', '.jpeg', '.jpg', '.m2t', '.m2ts', '.m4a',
+    '.mkv', '.mov', '.mp3', '.mp4', '.mts', '.mxf', '.odp', '.ods', '.odt', '.ogg', '.png', '.pptx', '.rar', '.tgz',
+    '.webp', '.xlsx', '.xz', '.zip', '.zst',
+])
+
+COMPRESSED_SIGNATURES = (
+    (0, b'PK\x03\x04'),
+    (0, b'\x1f\x8b'),
+    (0, b'\xfd7zXZ\x00'),
+    (0, b'\x28\xb5\x2f\xfd'),
+    (0, b'BZh'),
+    (0, b'7z\xbc\xaf\x27\x1c'),
+    (0, b'Rar!'),
+    (0, b'\xff\xd8\xff'),
+    (0, b'\x89PNG'),
+    (0, b'OggS'),
+    (0, b'fLaC'),
+    (4, b'ftyp'),
+)
+
+
+def is_compressed(path: str) -> bool:
+    """ Проверяет, сжат ли уже файл - по расширению имени и по сигнатуре в начале файла
+
+    Args:
+        path: путь к файлу
+
+    Returns:
+        True, если повторное сжатие не имеет смысла
+    """
+    if os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return True
+    with open(path, 'rb') as f:
+        head = f.read(16)
+    return any([head[offset:offset + len(signature)] == signature for offset, signature in COMPRESSED_SIGNATURES])
+
+
+class _HashingWriter:
+
+    def __init__(self, file, checksum: str):
+        self._file = file
+        self.hash = hashlib.new(checksum) if checksum else None
+
+    def write(self, data: bytes) -> None:
+        if data:
+            if self.hash is not None:
+                self.hash.update(data)
+            self._file.write(data)
+
+
+class CompressAction(OutDirCreatingAction):
+    """ Действие, в котором входной файл сжимается в выходную папку
+
+    Файл сжимается потоково - многопоточным zstd или, если модуль `zstandard` не установлен, xz. Уже сжатые файлы
+    (архивы, изображения, медиафайлы) копируются как есть. Контрольные суммы исходного и сжатого потоков вычисляются
+    в том же проходе и записываются рядом с результатом в файл `<выходной файл>.<алгоритм>` в формате утилит
+    `sha256sum` и т.п.
+
+    Параметры действия:
+
+    - `codec` - `zstd` (по умолчанию) или `xz`
+    - `level` - уровень сжатия, по умолчанию - 3 для zstd и 6 для xz
+    - `threads` - количество потоков zstd, по умолчанию - количество процессоров
+    - `checksum` - алгоритм контрольных сумм из `hashlib`, по умолчанию - `sha256`; false - не вычислять
+    - `skip_compressed` - копировать ли уже сжатые файлы как есть, по умолчанию - true
+    """
+
+    def run(self, input_url: str, action_params: dict, out_dir_path: str, simulate: bool) -> None:
+        if urls.is_url(input_url):
+            raise ValueError('Action compress supports only local input files: "{}"'.format(input_url))
+        super().run(input_url, action_params, out_dir_path, simulate)
+        codec = action_params.get('codec', 'zstd')
+        if codec not in CODECS:
+            raise ValueError('Unknown compression codec: {}'.format(codec))
+        if codec == 'zstd' and zstandard is None:
+            logging.warning('zstandard module is not installed - falling back to xz')
+            codec = 'xz'
+        checksum = action_params.get('checksum', 'sha256')
+        in_name = os.path.split(input_url)[1]
+
+        skip = action_params.get('skip_compressed', True) and is_compressed(input_url)
+        out_name = in_name if skip else in_name + CODECS[codec]['extension']
+        out_path = os.path.join(out_dir_path, out_name)
+        checksum_path = '{}.{}'.format(out_path, checksum) if checksum else None
+        for path in (out_path, checksum_path):
+            if path is not None and out_tree.exists(path):
+                msg = 'Output file "{}" already exists'.format(path)
+                logging.error(msg)
+                raise FileExistsError(msg)
+
+        if skip:
+            logging.info('File is already compressed - copying it from "{}" to "{}"...'.format(input_url, out_path))
+        else:
+            logging.info('Compressing file from "{}" to "{}" using {}...'.format(input_url, out_path, codec))
+        if simulate:
+            logging.info('Done')
+            return
+
+        tmp_path = out_path + '.part'
+        try:
+            with io_shaping.open_file(input_url, 'rb') as in_file, io_shaping.open_file(tmp_path, 'wb') as out_file:
+                in_hash = hashlib.new(checksum) if checksum else None
+                writer = _HashingWriter(out_file, checksum)
+                if skip:
+                    compress, flush = None, None
+                elif codec == 'zstd':
+                    threads = action_params.get('threads', os.cpu_count() or 1)
+                    compressor = zstandard.ZstdCompressor(
+                        level=action_params.get('level', CODECS[codec]['level']), threads=threads
+                    ).compressobj(size=os.fstat(in_file.fileno()).st_size)
+                    compress, flush = compressor.compress, compressor.flush
+                else:
+                    compressor = lzma.LZMACompressor(preset=action_params.get('level', CODECS[codec]['level']))
+                    compress, flush = compressor.compress, compressor.flush
+                while True:
+                    data = in_file.read(READ_SIZE)
+                    if not data:
+                        break
+                    if in_hash is not None:
+                        in_hash.update(data)
+                    writer.write(data if compress is None else compress(data))
+                if flush is not None:
+                    writer.write(flush())
+            shutil.copystat(input_url, tmp_path)
+            os.replace(tmp_path, out_path)
+            out_tree.add(out_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        if checksum:
+            lines = ['{} *{}\n'.format(in_hash.hexdigest(), in_name)]
+            if not skip:
+                lines.append('{} *{}\n'.format(writer.hash.hexdigest(), out_name))
+            with open(checksum_path, 'x', encoding='utf-8') as c_file:
+                c_file.writelines(lines)
+            out_tree.add(checksum_path)
+            logging.debug('Checksums: {}'.format(''.join(lines).strip()))
+        logging.info('Done')
+
+    def get_output_paths(self, input_url: str, action_params: dict, out_dir_path: str):
+        in_name = os.path.split(input_url)[1]
+        if action_params.get('skip_compressed', True):
+            if os.path.splitext(in_name)[1].lower() not in COMPRESSED_EXTENSIONS:
+                return None
+            out_name = in_name
+        else:
+            codec = action_params.get('codec', 'zstd')
+            if codec not in CODECS or codec == 'zstd' and zstandard is None:
+                return None
+            out_name = in_name + CODECS[codec]['extension']
+        out_path = os.path.join(out_dir_path, out_name)
+        checksum = action_params.get('checksum', 'sha256')
+        return [out_path, '{}.{}'.format(out_path, checksum)] if checksum else [out_path]
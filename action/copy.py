@@ -4,24 +4,41 @@
 
 import logging
 import os
-import shutil
 
 from action import OutDirCreatingAction
+from utils import dedup, io_shaping, out_tree, urls
 
 
 class CopyAction(OutDirCreatingAction):
     """ Действие, в котором входной файл копируется в выходную папку
 
+    Файлы, доступные по HTTP, копируются параллельными запросами диапазонов (`utils.http_source.copy_url`).
     """
 
     def run(self, input_url: str, action_params: dict, out_dir_path: str, simulate: bool) -> None:
         super().run(input_url, action_params, out_dir_path, simulate)
-        out_path = os.path.join(out_dir_path, os.path.split(input_url)[1])
-        if os.path.exists(out_path):
+        out_path = self.get_output_paths(input_url, action_params, out_dir_path)[0]
+        if out_tree.exists(out_path):
             msg = 'Output file "{}" already exists'.format(out_path)
             logging.error(msg)
             raise FileExistsError(msg)
+        dedup_index = None if urls.is_url(input_url) else dedup.dedup_index
+        if dedup_index is not None and dedup_index.reuse(input_url, 'copy', [out_path], simulate):
+            logging.info('Done')
+            return
         logging.info('Copying file from "{}" to "{}"...'.format(input_url, out_path))
         if not simulate:
-            shutil.copy(input_url, out_path)
+            if urls.is_url(input_url):
+                from utils import http_source
+                http_source.copy_url(input_url, out_path)
+            else:
+                io_shaping.copy_file(input_url, out_path)
+            out_tree.add(out_path)
+            if dedup_index is not None:
+                dedup_index.record(input_url, 'copy', [out_path])
         logging.info('Done')
+
+    def get_output_paths(self, input_url: str, action_params: dict, out_dir_path: str) -> list:
+        if urls.is_url(input_url):
+            return [os.path.join(out_dir_path, urls.get_basename(input_url))]
+        return [os.path.join(out_dir_path, os.path.split(input_url)[1])]
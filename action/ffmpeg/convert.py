@@ -2,8 +2,11 @@
 
 """
 
+import hashlib
+import json
 import logging
 import os
+import time
 
 from dispatcher import ActionRunException
 from action import OutDirCreatingAction
@@ -11,15 +14,27 @@ from pyffwrapper.ffmpeg import FFmpegBaseCommand
 from pyffwrapper import exceptions as ffmpeg_exceptions
 from pyffwrapper.metadata_collector import FFprobeMetadataCollector
 from pyffwrapper import factory, profile_loader
+from utils import dedup, io_shaping, meta_filter, out_tree, probe, thread_tuning, transcode_cache, urls
 
 
 class FfmpegConvertAction(OutDirCreatingAction):
     """ Действие, в котором используется ffmpeg для выполнения преобразования входного файла
 
+    Метаданные входного файла для отрисовки профиля по умолчанию собираются полным анализом. Если профилю достаточно
+    свойств контейнера и потоков, параметр действия `probe` со значением `fast` позволяет обойтись быстрым запуском
+    ffprobe (см. `utils.probe`).
+
+    Параметр действия `remux_if` - спецификация в формате фильтра `ffprobe.meta`, описывающая входные файлы, которые
+    уже соответствуют результату профиля. Для них профиль отрисовывается с `remux` = True в контексте, и профиль может
+    заменить перекодирование копированием потоков (`-c copy`). Сэкономленное время оценивается по скорости
+    конвертирования профилем, измеренной при предыдущих запусках.
     """
 
     def __init__(self):
         super().__init__()
+        self._remux_count = 0
+        self._remux_saved_time = 0.0
+        self._remux_unestimated_count = 0
         logging.debug('Fetching FFmpegConvertCommand object...')
         self._ffmpeg_convert = factory.ffmpeg_factory.get_ffmpeg_command(FFmpegBaseCommand)
         logging.debug('Fetching FFprobeMetadataCollector object...')
@@ -27,21 +42,225 @@ class FfmpegConvertAction(OutDirCreatingAction):
 
     def run(self, input_url: str, action_params: dict, out_dir_path: str, simulate: bool) -> None:
         super().run(input_url, action_params, out_dir_path, simulate)
-        input_metadata = self._ffprobe_meta_collector.get_metadata(input_url)
+        input_metadata, remux = self.probe_input(input_url, action_params)
+        tuner = thread_tuning.thread_tuner
+        # Копирование потоков почти не нагружает процессоры, поэтому такое задание не занимает их долю
+        job_id = tuner.start_job() if tuner is not None and not remux else None
+        try:
+            self._convert(input_url, action_params, out_dir_path, simulate, input_metadata, remux)
+        finally:
+            if job_id is not None:
+                tuner.finish_job(job_id)
+
+    def probe_input(self, input_url: str, action_params: dict) -> tuple:
+        """ Собирает метаданные входного файла и проверяет его по условиям `remux_if`
+
+        Args:
+            input_url: путь к входному файлу
+            action_params: параметры действия
+
+        Returns:
+            Кортеж (метаданные входного файла, выбрано ли копирование потоков)
+        """
+        input_metadata = self._get_input_metadata(input_url, action_params.get('probe', 'deep'))
         logging.debug('Input metadata: {}'.format(input_metadata))
+        return input_metadata, self._check_remux(input_url, action_params, input_metadata)
+
+    def render_profile(self, input_url: str, action_params: dict, threads: int) -> tuple:
+        """ Собирает метаданные входного файла и отрисовывает по ним профиль конвертирования
+
+        Args:
+            input_url: путь к входному файлу
+            action_params: параметры действия
+            threads: количество потоков для ffmpeg
+
+        Returns:
+            Кортеж (отрисованный профиль, метаданные входного файла, выбрано ли копирование потоков)
+        """
+        input_metadata, remux = self.probe_input(input_url, action_params)
+        return self._render_profile(action_params, input_metadata, remux, threads), input_metadata, remux
+
+    @staticmethod
+    def _render_profile(action_params: dict, input_metadata: dict, remux: bool, threads: int):
         context = {
             'input': input_metadata,
-            'vars': action_params['profile_vars'] if 'profile_vars' in action_params else {}
+            'vars': action_params['profile_vars'] if 'profile_vars' in action_params else {},
+            'threads': threads,
+            'filter_threads': threads,
+            'remux': remux,
         }
         logging.debug('Profile rendering context: \r\n{}'.format(context))
-        profile = profile_loader.profile_loader.get_profile(action_params['profile'], context=context)
+        return profile_loader.profile_loader.get_profile(action_params['profile'], context=context)
+
+    def _convert(self, input_url: str, action_params: dict, out_dir_path: str, simulate: bool, input_metadata: dict,
+                 remux: bool) -> None:
+        tuner = thread_tuning.thread_tuner
+        threads = tuner.suggest(action_params['profile']) if tuner is not None else os.cpu_count() or 1
+        profile = self._render_profile(action_params, input_metadata, remux, threads)
+        out_paths = [os.path.join(out_dir_path, o['filename']) for o in profile.outputs]
+        # Кэш и дедупликация считают хэш содержимого входного файла - для удалённого файла это означало бы его полную
+        # загрузку, поэтому для URL они не используются
+        remote = urls.is_url(input_url)
+        cache = None if remote else transcode_cache.transcode_cache
+        dedup_index = None if remote else dedup.dedup_index
+        action_key = None
+        if cache is not None or dedup_index is not None:
+            action_key = self._get_action_key(profile)
+        if cache is not None:
+            if cache.get(input_url, action_key, out_paths, simulate):
+                return
+        if dedup_index is not None:
+            if dedup_index.reuse(input_url, action_key, out_paths, simulate):
+                return
+        input_params = self._get_input_params(profile.inputs[0]['parameters'], input_url, input_metadata)
         logging.debug('Starting FFmpeg conversion...')
+        start = time.monotonic()
         try:
             self._ffmpeg_convert.exec(
-                [(profile.inputs[0]['parameters'], input_url)],
-                [(o['parameters'], os.path.join(out_dir_path, o['filename'])) for o in profile.outputs],
+                [(input_params, input_url)],
+                [(o['parameters'], p) for o, p in zip(profile.outputs, out_paths)],
                 simulate
             )
         except (ffmpeg_exceptions.FFmpegInputNotFoundException, ffmpeg_exceptions.FFmpegOutputAlreadyExistsException,
                 ffmpeg_exceptions.FFmpegProcessException) as e:
             raise ActionRunException from e
+        if simulate:
+            return
+        for p in out_paths:
+            out_tree.add(p)
+        if remux:
+            self._record_remux(action_params['profile'], threads, start, input_metadata)
+        elif tuner is not None and input_params is profile.inputs[0]['parameters']:
+            speed = thread_tuning.measure(start, input_metadata)
+            if speed is not None:
+                tuner.record(action_params['profile'], threads, speed)
+        if dedup_index is not None:
+            dedup_index.record(input_url, action_key, out_paths)
+        if cache is not None:
+            cache.put(input_url, action_key, out_paths)
+
+    def finalize(self, simulate: bool) -> None:
+        if not self._remux_count:
+            return
+        message = '{} file(s) were remuxed instead of transcoding, estimated time saved: {:.0f} s'.format(
+            self._remux_count, self._remux_saved_time)
+        if self._remux_unestimated_count:
+            message += ' (transcoding speed of {} file(s) is unknown)'.format(self._remux_unestimated_count)
+        logging.info(message)
+
+    def _check_remux(self, input_url: str, action_params: dict, input_metadata: dict) -> bool:
+        """ Проверяет, соответствует ли входной файл условиям `remux_if`
+
+        Если метаданных уровня `fast` для проверки не хватает, используются метаданные полного анализа. Если решение
+        вынести всё равно нельзя, файл перекодируется.
+
+        Args:
+            input_url: путь к входному файлу
+            action_params: параметры действия
+            input_metadata: уже собранные метаданные входного файла
+
+        Returns:
+            True, если можно обойтись копированием потоков
+        """
+        spec = action_params.get('remux_if')
+        if not spec:
+            return False
+        result = meta_filter.evaluate(spec, input_metadata)
+        if result is None and action_params.get('probe', 'deep') != 'deep':
+            result = meta_filter.evaluate(spec, self._get_input_metadata(input_url, 'deep'))
+        if result is None:
+            logging.warning('Input can\'t be checked against remux conditions - transcoding')
+            return False
+        logging.info('Input {} remux conditions - {}'.format(
+            'matches' if result else 'doesn\'t match', 'remuxing' if result else 'transcoding'))
+        return result
+
+    def _record_remux(self, profile_name: str, threads: int, start: float, input_metadata: dict) -> None:
+        """ Учитывает время, сэкономленное копированием потоков вместо перекодирования
+
+        """
+        self._remux_count += 1
+        elapsed = time.monotonic() - start
+        duration = thread_tuning.get_duration(input_metadata)
+        tuner = thread_tuning.thread_tuner
+        estimate = tuner.estimate(profile_name, threads, duration) if tuner is not None and duration else None
+        if estimate is None:
+            self._remux_unestimated_count += 1
+            logging.info('Remuxed in {:.1f} s'.format(elapsed))
+            return
+        saved = max(0.0, estimate - elapsed)
+        self._remux_saved_time += saved
+        logging.info('Remuxed in {:.1f} s, estimated time saved: {:.1f} s'.format(elapsed, saved))
+
+    def _get_input_metadata(self, input_url: str, level: str) -> dict:
+        """ Возвращает метаданные входного файла заданного уровня, по возможности - из кэша
+
+        Args:
+            input_url: путь к входному файлу
+            level: уровень - `fast` или `deep`
+
+        Returns:
+            Метаданные
+        """
+        if level not in ('fast', 'deep'):
+            raise ValueError('Unknown probe level: {}'.format(level))
+        prober = probe.metadata_prober
+        if prober is None:
+            return self._ffprobe_meta_collector.get_metadata(input_url)
+        if level == 'fast':
+            metadata = prober.get_fast(input_url)
+            if metadata is not None:
+                return metadata
+            logging.warning('Fast probe failed - using deep probe')
+        return prober.get_deep(input_url, self._ffprobe_meta_collector.get_metadata)
+
+    @staticmethod
+    def _get_input_params(params, input_url: str, input_metadata: dict):
+        """ Возвращает параметры входа, дополненные ограничением скорости чтения, если оно действует для входного файла
+
+        ffmpeg читает файл сам, поэтому ограничение передаётся ему параметром `-readrate` (ffmpeg 5.0 и новее) -
+        множителем скорости воспроизведения, вычисленным по битрейту входного файла.
+
+        Args:
+            params: параметры входа из отрисованного профиля
+            input_url: путь к входному файлу
+            input_metadata: метаданные входного файла
+
+        Returns:
+            Параметры входа
+        """
+        if io_shaping.io_shaper is None:
+            return params
+        rate = io_shaping.io_shaper.get_rate(input_url, 'read')
+        try:
+            bit_rate = float(input_metadata['format']['bit_rate'])
+        except (KeyError, TypeError, ValueError):
+            bit_rate = 0
+        if rate is None or bit_rate <= 0:
+            return params
+        # нулевой `-readrate` ffmpeg считает отсутствием ограничения, поэтому малые значения не округляются до нуля
+        read_rate = '{:g}'.format(max(rate * 8 / bit_rate, 0.001))
+        logging.info('Limiting ffmpeg input read rate to {}x of realtime'.format(read_rate))
+        if type(params) == str:
+            return '-readrate {} {}'.format(read_rate, params).strip()
+        return ['-readrate', read_rate] + list(params)
+
+    @staticmethod
+    def _get_action_key(profile) -> str:
+        """ Возвращает строку, однозначно описывающую преобразование по отрисованному профилю
+
+        Учитываются параметры входа и выходов, а также расширения имён выходных файлов (от них зависит выбор
+        контейнера), но не сами имена.
+
+        Args:
+            profile: отрисованный профиль конвертирования
+
+        Returns:
+            Строка-ключ
+        """
+        key_data = json.dumps(
+            [profile.inputs[0]['parameters'],
+             [(o['parameters'], os.path.splitext(o['filename'])[1].lower()) for o in profile.outputs]],
+            sort_keys=True, default=str
+        )
+        return 'ffmpeg.convert:{}'.format(hashlib.sha256(key_data.encode('utf-8')).hexdigest())
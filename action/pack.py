@@ -0,0 +1,92 @@
+""" Модуль с классом `PackAction`
+
+"""
+
+import logging
+import os
+
+from collections import OrderedDict
+
+from action import OutDirCreatingAction
+from utils import out_tree, urls
+from utils.pack import PackWriter, get_format
+
+DEFAULT_ARCHIVE_NAME = 'pack.tar'
+
+
+class PackAction(OutDirCreatingAction):
+    """ Действие, в котором входной файл дописывается в архив в выходной папке
+
+    Все файлы, попадающие в одну выходную папку, упаковываются в один архив. Полезно для множества мелких служебных
+    файлов: вместо тысяч отдельных операций с метаданными в выходной папке выполняется одна последовательная запись.
+
+    Параметры действия:
+
+    - `archive` - имя файла архива, по умолчанию - `pack.tar`
+    - `format` - `tar` или `zip`, по умолчанию определяется по расширению имени архива
+    - `index` - сохранять ли индекс для tar-архивов, по умолчанию - True
+
+    Одновременно открыто не более `MAX_OPEN_ARCHIVES` архивов - если файлы разных выходных папок чередуются, давно не
+    использовавшийся архив закрывается и при необходимости открывается снова для дописывания.
+    """
+
+    MAX_OPEN_ARCHIVES = 16
+
+    def __init__(self):
+        super().__init__()
+        self._writers = OrderedDict()
+        self._created = set()
+        self._simulated = {}
+
+    def _get_writer(self, archive_path: str, action_params: dict) -> PackWriter:
+        try:
+            self._writers.move_to_end(archive_path)
+            return self._writers[archive_path]
+        except KeyError:
+            pass
+        append = archive_path in self._created
+        if not append and out_tree.exists(archive_path):
+            msg = 'Output archive "{}" already exists'.format(archive_path)
+            logging.error(msg)
+            raise FileExistsError(msg)
+        if len(self._writers) >= self.MAX_OPEN_ARCHIVES:
+            old_path, old_writer = self._writers.popitem(last=False)
+            logging.debug('Too many open archives - closing "{}"...'.format(old_path))
+            old_writer.close()
+        logging.debug('{} archive "{}"...'.format('Reopening' if append else 'Creating', archive_path))
+        writer = PackWriter(archive_path, action_params.get('format', get_format(archive_path)),
+                            action_params.get('index', True), append)
+        self._writers[archive_path] = writer
+        if not append:
+            out_tree.add(archive_path)
+        self._created.add(archive_path)
+        return writer
+
+    def run(self, input_url: str, action_params: dict, out_dir_path: str, simulate: bool) -> None:
+        if urls.is_url(input_url):
+            raise ValueError('Action pack supports only local input files: "{}"'.format(input_url))
+        super().run(input_url, action_params, out_dir_path, simulate)
+        archive_path = os.path.join(out_dir_path, action_params.get('archive', DEFAULT_ARCHIVE_NAME))
+        name = os.path.split(input_url)[1]
+        if simulate:
+            writer = self._simulated.setdefault(archive_path, set())
+        else:
+            writer = self._get_writer(archive_path, action_params)
+        if name in writer:
+            msg = 'File "{}" already exists in archive "{}"'.format(name, archive_path)
+            logging.error(msg)
+            raise FileExistsError(msg)
+        logging.info('Packing file "{}" into "{}"...'.format(input_url, archive_path))
+        if simulate:
+            writer.add(name)
+        else:
+            writer.add(input_url, name)
+        logging.info('Done')
+
+    def finalize(self, simulate: bool) -> None:
+        while self._writers:
+            archive_path, writer = self._writers.popitem()
+            logging.info('Closing archive "{}"...'.format(archive_path))
+            writer.close()
+        self._created = set()
+        self._simulated = {}
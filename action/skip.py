@@ -14,3 +14,6 @@ class SkipAction(AbstractAction):
 
     def run(self, input_url: str, action_params: dict, out_dir_path: str, simulate: bool):
         logging.debug('Skipping file "{}"...'.format(input_url))
+
+    def get_output_paths(self, input_url: str, action_params: dict, out_dir_path: str) -> list:
+        return []
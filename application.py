@@ -2,13 +2,13 @@ import logging
 import sys
 import json
 import os
+import time
 
-from datetime import datetime
-from traceback import TracebackException
-
-from rules_provider import get_rules_provider_class
+from rules_provider import get_rules_provider_class, get_rules_set_format
 from dispatcher import get_dispatcher_class
 from converter import get_converter_class
+from utils import urls
+from utils.module_import import register_dependency
 
 VERSION = '0.2'
 
@@ -17,6 +17,10 @@ class ConfigurationException(Exception):
     pass
 
 
+class BenchmarkRegressionException(Exception):
+    pass
+
+
 class Application:
 
     def __init__(self, base_dir, args, conf=None):
@@ -24,6 +28,7 @@ class Application:
         self._conf = None
         self._conf_override = conf
         self._base_dir = base_dir
+        self._shutdown_callbacks = []
 
         os.chdir(base_dir)
         self._configure_logger()
@@ -45,16 +50,23 @@ class Application:
         return self._base_dir
 
     def exec(self):
-        command = getattr(self, '_command_{}'.format(self.args.command))
+        command = getattr(self, '_command_{}'.format(self.args.command.replace('-', '_')))
         logging.info('Starting "{}" command...'.format(self.args.command))
         try:
             command()
         except Exception as e:
+            from traceback import TracebackException
             tbe = TracebackException.from_exception(e)
             logging.critical(' '.join(list(tbe.format())))
             raise e
+        finally:
+            self._shutdown()
         logging.info('All done - terminating')
 
+    def _shutdown(self) -> None:
+        while self._shutdown_callbacks:
+            self._shutdown_callbacks.pop()()
+
     def _get_configuration(self) -> dict:
         with open(self.args.conf_path) as c_file:
             return json.load(c_file)
@@ -89,7 +101,28 @@ class Application:
         _is_a_file(['ffmpeg_path', 'ffprobe_path', ])
         _is_a_dir(['temp_dir', 'out_dir', 'log_dir', ])
 
-        return dict([(k, raw_conf[k]) for k in params])
+        conf = dict([(k, raw_conf[k]) for k in params])
+
+        optional_params = {
+            'cache_dir': os.path.join(conf['temp_dir'], 'autoarchive_cache'),
+            'transcode_cache': None,
+            'io_limits': None,
+            'http': None,
+        }
+
+        for k, v in optional_params.items():
+            conf[k] = raw_conf[k] if k in raw_conf else v
+        conf['cache_dir'] = os.path.abspath(conf['cache_dir'])
+        if conf['transcode_cache'] is not None:
+            if type(conf['transcode_cache']) != dict or 'max_size' not in conf['transcode_cache']:
+                raise ConfigurationException(
+                    'Configuration parameter transcode_cache must be an object with at least "max_size" property.')
+        if conf['io_limits'] is not None and type(conf['io_limits']) != list:
+            raise ConfigurationException('Configuration parameter io_limits must be an array.')
+        if conf['http'] is not None and type(conf['http']) != dict:
+            raise ConfigurationException('Configuration parameter http must be an object.')
+
+        return conf
 
     def _configure_logger(self) -> None:
         log_dir = self.conf['log_dir']
@@ -97,49 +130,267 @@ class Application:
         log_level = self.args.log_level
         verbosity = self.args.verbosity
         if log_split:
-            log_file = os.path.join(log_dir, 'autoarchive-{}.log'.format(datetime.today().strftime('%Y%m%d%H%M%S')))
+            log_file = os.path.join(log_dir, 'autoarchive-{}.log'.format(time.strftime('%Y%m%d%H%M%S')))
             file_mode = 'w'
         else:
             log_file = os.path.join(log_dir, 'autoarchive.log')
             file_mode = 'a'
 
         logger = logging.getLogger('')
-        logger.setLevel(logging.NOTSET)
+        levels = [getattr(logging, log_level)]
 
         file = logging.FileHandler(log_file, file_mode)
-        file.setLevel(getattr(logging, log_level))
+        file.setLevel(levels[0])
         file.setFormatter(
             logging.Formatter('%(process)-6d %(asctime)s %(levelname)-8s %(message)s', '%Y-%m-%d %H:%M:%S'))
         logger.addHandler(file)
 
         if verbosity != 'NONE':
             console = logging.StreamHandler()
-            console.setLevel(getattr(logging, verbosity))
+            levels.append(getattr(logging, verbosity))
+            console.setLevel(levels[-1])
             console.setFormatter(logging.Formatter('%(relativeCreated)-10d %(module)-18s %(levelname)s: %(message)s'))
             logger.addHandler(console)
 
+        logger.setLevel(min(levels))
+
         logging.debug('Logger initiated')
 
+    def _get_rules_set_cache(self):
+        if self.args.no_rules_cache:
+            logging.debug('Rules set cache is disabled')
+            return None
+        from utils.rules_cache import RulesSetCache
+        return RulesSetCache(os.path.join(self.conf['cache_dir'], 'rules'), VERSION, get_rules_set_format())
+
+    def _init_dedup(self) -> None:
+        if self.args.dedup_mode is None:
+            return
+        from utils import dedup
+        dedup.dedup_index = dedup.DedupIndex(os.path.join(self.conf['cache_dir'], 'dedup.sqlite3'),
+                                             self.args.dedup_mode)
+        self._shutdown_callbacks.append(dedup.dedup_index.close)
+
+    def _init_transcode_cache(self) -> None:
+        cache_conf = self.conf['transcode_cache']
+        if cache_conf is None:
+            return
+        from utils import transcode_cache
+        try:
+            transcode_cache.transcode_cache = transcode_cache.TranscodeCache(
+                os.path.join(self.conf['cache_dir'], 'transcode'), cache_conf.get('mode', 'store'),
+                cache_conf['max_size']
+            )
+        except ValueError as e:
+            raise ConfigurationException('Configuration parameter transcode_cache is invalid: {}'.format(e)) from e
+        self._shutdown_callbacks.append(transcode_cache.transcode_cache.close)
+
+    def _init_io_shaper(self) -> None:
+        if not self.conf['io_limits']:
+            return
+        from utils import io_shaping
+        try:
+            io_shaping.io_shaper = io_shaping.IoShaper(self.conf['io_limits'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ConfigurationException('Configuration parameter io_limits is invalid: {}'.format(e)) from e
+
+    def _init_http_pool(self) -> None:
+        if self.conf['http'] is None:
+            return
+        from utils import http_source
+        try:
+            http_source.http_pool = http_source.HttpPool(**self.conf['http'])
+        except TypeError as e:
+            raise ConfigurationException('Configuration parameter http is invalid: {}'.format(e)) from e
+        self._shutdown_callbacks.append(http_source.http_pool.close)
+
+    def _init_out_tree(self) -> None:
+        if self.args.no_out_index:
+            logging.debug('Output directory index is disabled')
+            return
+        from utils import out_tree
+        out_tree.out_tree = out_tree.OutputTree()
+
+    def _init_run_results(self) -> None:
+        from utils import run_results
+        db_path = os.path.join(self.conf['log_dir'], 'autoarchive-results-{}-{}.sqlite3'.format(
+            time.strftime('%Y%m%d%H%M%S'), os.getpid()))
+        run_results.run_results = run_results.RunResults(db_path)
+        self._shutdown_callbacks.append(run_results.run_results.close)
+        logging.info('Run results are stored in "{}"'.format(db_path))
+
+    def _init_metadata_prober(self) -> None:
+        from utils import probe
+        probe.metadata_prober = probe.MetadataProber(self.conf['ffprobe_path'])
+
+    def _init_thread_tuner(self) -> None:
+        # Вызывается перед первым импортом действия ffmpeg.convert (см. `utils.module_import`) - запуски без
+        # конвертирования не создают папку состояния в cache_dir
+        from utils import thread_tuning
+        thread_tuning.thread_tuner = thread_tuning.ThreadTuner(os.path.join(self.conf['cache_dir'], 'threads'))
+        self._shutdown_callbacks.append(thread_tuning.thread_tuner.close)
+
+    def _get_input_urls(self) -> list:
+        if self.args.discovery_workers < 1:
+            raise ValueError('Number of discovery workers must be positive')
+        input_urls = list(self.args.input_urls)
+        if self.args.input_list:
+            with open(self.args.input_list, 'r', encoding='utf-8') as f:
+                input_urls.extend([l.strip() for l in f if l.strip()])
+        if not input_urls:
+            raise ValueError('At least one input URL is required')
+        result = []
+        seen = set()
+        for input_url in input_urls:
+            abs_url = input_url if urls.is_url(input_url) else os.path.abspath(input_url)
+            if abs_url not in seen:
+                seen.add(abs_url)
+                result.append(input_url)
+        return result
+
     def _command_run(self):
-        rules_provider = get_rules_provider_class(self.args.rules_provider)()
+        rules_provider = get_rules_provider_class(self.args.rules_provider)(cache=self._get_rules_set_cache())
         rules_set = rules_provider.get_rules(self.args.rules_set)
         if not rules_set:
             raise ValueError('Rules set can\'t be empty')
         if type(rules_set) != dict:
             raise TypeError('Rules set must be a dictionary')
         logging.debug('Rules set ready')
+        self._init_dedup()
+        self._init_transcode_cache()
+        self._init_io_shaper()
+        self._init_http_pool()
+        register_dependency('thread_tuner', self._init_thread_tuner)
+        self._init_metadata_prober()
+        self._init_out_tree()
+        self._init_run_results()
         logging.debug('Starting dispatcher...')
         get_dispatcher_class(self.args.dispatcher)(
-            self.args.input_url, rules_set, self.conf['out_dir'], self.args.dir_depth, self.args.use_in_dir_as_root,
-            self.args.simulate
+            self._get_input_urls(), rules_set, self.conf['out_dir'], self.args.dir_depth, self.args.use_in_dir_as_root,
+            self.args.simulate, self.args.file_order, self.args.group_by_dir, self.args.prune_dirs,
+            self.args.discovery_workers
         ).dispatch()
 
     def _command_version(self):
         sys.stdout.write(VERSION)
 
+    def _command_list(self):
+        from utils.pack import PackReader
+        for name, size in PackReader(self.args.archive).list():
+            sys.stdout.write('{}\t{}\n'.format(size, name))
+
+    def _command_unpack(self):
+        from utils.pack import PackReader
+        out_dir = os.path.abspath(self.args.out_dir) if self.args.out_dir else self.conf['out_dir']
+        reader = PackReader(self.args.archive)
+        if self.args.simulate:
+            logging.warning('--- THIS IS A SIMULATION - NO CHANGES WILL BE MADE ---')
+            for name in self.args.members or [n for n, s in reader.list()]:
+                logging.info('Extracting "{}" to "{}"...'.format(name, out_dir))
+            return
+        reader.extract(out_dir, self.args.members)
+
+    def _command_report(self):
+        from utils import run_results
+        results_path = self.args.results or run_results.get_latest(self.conf['log_dir'])
+        if results_path is None or not os.path.isfile(results_path):
+            raise FileNotFoundError('Run results file was not found')
+        logging.debug('Reading run results from "{}"...'.format(results_path))
+        results = run_results.RunResults(results_path, read_only=True)
+        try:
+            filters = {
+                'outcome': self.args.outcome,
+                'path_pattern': self.args.path_pattern,
+                'action_id': self.args.action_id,
+            }
+            if self.args.out_file:
+                with open(self.args.out_file, 'w', encoding='utf-8', newline='') as f:
+                    count = results.export(f, self.args.export_format, **filters)
+            else:
+                count = results.export(sys.stdout, self.args.export_format, **filters)
+        finally:
+            results.close()
+        logging.info('Exported {} file(s)'.format(count))
+
+    def _command_bench_profile(self):
+        import shutil
+        import tempfile
+        from action import get_action_class
+        from utils import profile_bench, thread_tuning
+        samples = [os.path.abspath(s) for s in self.args.samples or []]
+        profile_bench.get_sample_names(samples)
+        action = get_action_class('ffmpeg.convert')()
+        baselines_path = self.args.baselines or os.path.join(self.conf['cache_dir'], 'bench', 'baselines.json')
+        baselines = profile_bench.load_baselines(baselines_path)
+        threads = self.args.threads or os.cpu_count() or 1
+        action_params = {'profile_vars': dict(self.args.profilevar) if self.args.profilevar else {}}
+        if self.args.remux_if:
+            action_params['remux_if'] = self.args.remux_if
+        regressions = []
+        tmp_dir = tempfile.mkdtemp(prefix='autoarchive_bench_', dir=self.conf['temp_dir'])
+        try:
+            if not samples:
+                samples.append(os.path.join(tmp_dir, 'lavfi_{:g}s.mov'.format(self.args.sample_duration)))
+                profile_bench.generate_sample(self.conf['ffmpeg_path'], samples[0], self.args.sample_duration)
+            out_dir = os.path.join(tmp_dir, 'out')
+            os.mkdir(out_dir)
+            for profile_name in self.args.profiles:
+                action_params['profile'] = profile_name
+                for sample in samples:
+                    sample_name = os.path.basename(sample)
+                    logging.info('Benchmarking profile {} on "{}"...'.format(profile_name, sample_name))
+                    profile, input_metadata, remux = action.render_profile(sample, action_params, threads)
+                    branch = 'remux' if remux else 'transcode'
+                    logging.info('Benchmarking the {} branch of profile {}'.format(branch, profile_name))
+                    duration = thread_tuning.get_duration(input_metadata)
+                    if duration is None:
+                        raise ValueError('Duration of sample "{}" is unknown'.format(sample))
+                    out_paths = [os.path.join(out_dir, o['filename']) for o in profile.outputs]
+                    result = profile_bench.run(
+                        profile_bench.build_command(self.conf['ffmpeg_path'], profile, sample, out_paths),
+                        duration, out_paths
+                    )
+                    for p in out_paths:
+                        os.remove(p)
+                    line = '{}\t{}\t{}\t{}'.format(profile_name, sample_name, branch,
+                                                  profile_bench.format_result(result))
+                    result['branch'] = branch
+                    baseline = baselines.get(profile_name, {}).get(sample_name)
+                    if baseline is None:
+                        line += '\tno baseline'
+                    elif baseline.get('branch', 'transcode') != branch:
+                        # копирование потоков и перекодирование несравнимы - это не регрессия
+                        line += '\tbaseline is for the {} branch'.format(baseline.get('branch', 'transcode'))
+                    else:
+                        deviations = profile_bench.compare(result, baseline, self.args.tolerance)
+                        if deviations:
+                            line += '\tREGRESSION: {}'.format('; '.join(deviations))
+                            regressions.append('{} on "{}": {}'.format(
+                                profile_name, sample_name, '; '.join(deviations)))
+                    sys.stdout.write(line + '\n')
+                    if self.args.save_baselines:
+                        baselines.setdefault(profile_name, {})[sample_name] = result
+        finally:
+            shutil.rmtree(tmp_dir)
+        if self.args.save_baselines:
+            profile_bench.save_baselines(baselines_path, baselines)
+            logging.info('Baselines are saved to "{}"'.format(baselines_path))
+        if regressions:
+            raise BenchmarkRegressionException('Profiles deviate from the baselines:\r\n{}'.format(
+                '\r\n'.join(regressions)))
+
     def _command_convert(self):
+        self._init_dedup()
+        self._init_transcode_cache()
+        self._init_io_shaper()
+        self._init_http_pool()
+        register_dependency('thread_tuner', self._init_thread_tuner)
+        self._init_metadata_prober()
+        self._init_out_tree()
+        self._init_run_results()
         logging.debug('Starting converter...')
         get_converter_class(self.args.converter)(
-            self.args.input_url, self.args.profile, self.args.profilevar, self.conf['out_dir'], self.args.dir_depth,
-            self.args.use_in_dir_as_root, self.args.simulate
+            self._get_input_urls(), self.args.profile, self.args.profilevar, self.conf['out_dir'],
+            self.args.dir_depth, self.args.use_in_dir_as_root, self.args.simulate, self.args.file_order,
+            self.args.group_by_dir, self.args.discovery_workers
         ).convert()
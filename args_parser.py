@@ -1,4 +1,5 @@
 import argparse
+import json
 
 useindirasroot = (
     ('-ir', '--useindirasroot'),
@@ -19,6 +20,86 @@ dirdepth = (
     }
 )
 
+fileorder = (
+    ('-o', '--order'),
+    {
+        'dest': 'file_order',
+        'help': 'file processing order policy: walk (DEFAULT), name, inode, extent, ltfs',
+        'type': str,
+        'default': 'walk'
+    }
+)
+
+ordergroup = (
+    ('-og', '--ordergroup'),
+    {
+        'dest': 'group_by_dir',
+        'help': 'keep files of the same directory together when reordering them',
+        'action': 'store_true'
+    }
+)
+
+dedupmode = (
+    ('-dm', '--dedup'),
+    {
+        'dest': 'dedup_mode',
+        'help': 'reuse results of already processed identical inputs: link (reflink, hardlink or copy of the '
+                'existing output) or manifest (reference to the existing output)',
+        'type': str,
+        'choices': ['link', 'manifest'],
+        'default': None
+    }
+)
+
+nooutindex = (
+    ('-noi', '--nooutindex'),
+    {
+        'dest': 'no_out_index',
+        'help': 'check output files and directories on the file system every time instead of indexing the output '
+                'directory (use it if something else writes to the output directory during the run)',
+        'action': 'store_true'
+    }
+)
+
+inputurls = (
+    ('input_urls',),
+    {
+        'metavar': 'input_url',
+        'help': 'input URL(s)',
+        'type': str,
+        'nargs': '*'
+    }
+)
+
+inputlist = (
+    ('-il', '--inputlist'),
+    {
+        'dest': 'input_list',
+        'help': 'path to a text file with input URLs (one per line) to process in addition to the ones given as '
+                'arguments',
+        'type': str,
+        'default': None
+    }
+)
+
+discoveryworkers = (
+    ('-dw', '--discoveryworkers'),
+    {
+        'dest': 'discovery_workers',
+        'help': 'number of threads listing input directories concurrently (DEFAULT: 8, 1 - list them one by one)',
+        'type': int,
+        'default': 8
+    }
+)
+
+def _convert_profilevar(value: str):
+    splitted_value = value.split('=', 1)
+    if len(splitted_value) == 1:
+        return splitted_value, None
+    else:
+        return splitted_value
+
+
 args_parser = argparse.ArgumentParser()
 args_parser.add_argument(
     '-v', '--verbosity',
@@ -59,9 +140,8 @@ subparsers.required = True
 
 parser_run = subparsers.add_parser('run')
 parser_run.add_argument(
-    'input_url',
-    help='input URL',
-    type=str
+    *inputurls[0],
+    **inputurls[1]
 )
 parser_run.add_argument(
     'rules_set',
@@ -81,6 +161,19 @@ parser_run.add_argument(
     type=str,
     default='json'
 )
+parser_run.add_argument(
+    '-nrc', '--norulescache',
+    dest='no_rules_cache',
+    help='do not use the prepared rules sets cache',
+    action='store_true'
+)
+parser_run.add_argument(
+    '-pr', '--prune',
+    dest='prune_dirs',
+    help='do not descend into directories that can\'t contain files matching the rules set (always done with the '
+         'skip policy)',
+    action='store_true'
+)
 parser_run.add_argument(
     *useindirasroot[0],
     **useindirasroot[1]
@@ -89,14 +182,169 @@ parser_run.add_argument(
     *dirdepth[0],
     **dirdepth[1]
 )
+parser_run.add_argument(
+    *fileorder[0],
+    **fileorder[1]
+)
+parser_run.add_argument(
+    *ordergroup[0],
+    **ordergroup[1]
+)
+parser_run.add_argument(
+    *dedupmode[0],
+    **dedupmode[1]
+)
+parser_run.add_argument(
+    *nooutindex[0],
+    **nooutindex[1]
+)
+parser_run.add_argument(
+    *inputlist[0],
+    **inputlist[1]
+)
+parser_run.add_argument(
+    *discoveryworkers[0],
+    **discoveryworkers[1]
+)
 
 parser_version = subparsers.add_parser('version')
 
+parser_list = subparsers.add_parser('list')
+parser_list.add_argument(
+    'archive',
+    help='path to an archive created by the pack action',
+    type=str
+)
+
+parser_unpack = subparsers.add_parser('unpack')
+parser_unpack.add_argument(
+    'archive',
+    help='path to an archive created by the pack action',
+    type=str
+)
+parser_unpack.add_argument(
+    'members',
+    help='names of files to extract (all files if omitted)',
+    type=str,
+    nargs='*'
+)
+parser_unpack.add_argument(
+    '-od', '--outdir',
+    dest='out_dir',
+    help='output directory (out_dir from configuration if omitted)',
+    type=str,
+    default=None
+)
+
+parser_bench_profile = subparsers.add_parser('bench-profile')
+parser_bench_profile.add_argument(
+    'profiles',
+    help='conversion profiles\' names',
+    type=str,
+    nargs='+'
+)
+parser_bench_profile.add_argument(
+    '-sm', '--sample',
+    dest='samples',
+    help='sample clip (synthetic lavfi clip if omitted)',
+    action='append',
+    type=str
+)
+parser_bench_profile.add_argument(
+    '-sd', '--sampleduration',
+    dest='sample_duration',
+    help='duration of the synthetic sample clip in seconds',
+    type=float,
+    default=10
+)
+parser_bench_profile.add_argument(
+    '-pv', '--profilevar',
+    dest='profilevar',
+    help='profile variables',
+    action='append',
+    type=_convert_profilevar,
+)
+parser_bench_profile.add_argument(
+    '-ri', '--remuxif',
+    dest='remux_if',
+    help='remux_if conditions of the ffmpeg.convert action as JSON',
+    type=json.loads,
+    default=None
+)
+parser_bench_profile.add_argument(
+    '-th', '--threads',
+    help='number of threads passed to profiles (DEFAULT: number of CPUs)',
+    type=int,
+    default=None
+)
+parser_bench_profile.add_argument(
+    '-bl', '--baselines',
+    help='path to the baselines file (cache_dir/bench/baselines.json if omitted)',
+    type=str,
+    default=None
+)
+parser_bench_profile.add_argument(
+    '-sb', '--savebaselines',
+    dest='save_baselines',
+    help='save the results as new baselines',
+    action='store_true'
+)
+parser_bench_profile.add_argument(
+    '-tl', '--tolerance',
+    help='allowed relative deviation from the baselines (DEFAULT: 0.1)',
+    type=float,
+    default=0.1
+)
+
+parser_report = subparsers.add_parser('report')
+parser_report.add_argument(
+    'results',
+    help='path to a run results file (the latest one from log_dir if omitted)',
+    type=str,
+    nargs='?',
+    default=None
+)
+parser_report.add_argument(
+    '-oc', '--outcome',
+    help='show only files with this outcome',
+    type=str,
+    choices=['done', 'no_match', 'error'],
+    default=None
+)
+parser_report.add_argument(
+    '-pp', '--pathpattern',
+    dest='path_pattern',
+    help='show only files with paths matching this pattern (*, ? and [...] wildcards)',
+    type=str,
+    default=None
+)
+parser_report.add_argument(
+    '-a', '--action',
+    dest='action_id',
+    help='show only files processed by this action',
+    type=str,
+    default=None
+)
+parser_report.add_argument(
+    '-f', '--format',
+    dest='export_format',
+    help='output format: csv (DEFAULT) or json (one object per line)',
+    type=str,
+    choices=['csv', 'json'],
+    default='csv'
+)
+parser_report.add_argument(
+    '-of', '--outfile',
+    dest='out_file',
+    help='path to the output file (standard output if omitted)',
+    type=str,
+    default=None
+)
+
 parser_convert = subparsers.add_parser('convert')
 parser_convert.add_argument(
-    'input_url',
-    help='input URL',
-    type=str
+    *inputurls[0],
+    **inputurls[1]
 )
 parser_convert.add_argument(
     'profile',
@@ -109,15 +357,6 @@ parser_convert.add_argument(
     type=str,
     default='basic'
 )
-
-
-def _convert_profilevar(value: str):
-    splitted_value = value.split('=', 1)
-    if len(splitted_value) == 1:
-        return splitted_value, None
-    else:
-        return splitted_value
-
 parser_convert.add_argument(
     '-pv', '--profilevar',
     help='profile variables',
@@ -133,3 +372,27 @@ parser_convert.add_argument(
     *dirdepth[0],
     **dirdepth[1]
 )
+parser_convert.add_argument(
+    *fileorder[0],
+    **fileorder[1]
+)
+parser_convert.add_argument(
+    *ordergroup[0],
+    **ordergroup[1]
+)
+parser_convert.add_argument(
+    *dedupmode[0],
+    **dedupmode[1]
+)
+parser_convert.add_argument(
+    *nooutindex[0],
+    **nooutindex[1]
+)
+parser_convert.add_argument(
+    *inputlist[0],
+    **inputlist[1]
+)
+parser_convert.add_argument(
+    *discoveryworkers[0],
+    **discoveryworkers[1]
+)
@@ -0,0 +1,104 @@
+""" Сравнение пропускной способности действий `copy` и `compress`
+
+Создаёт во временной папке набор файлов, похожий на типичный набор документов (тексты, журналы, XML, файлы проектов,
+уже сжатые документы и изображения), и обрабатывает его действием `copy` и действием `compress` с разными кодеками.
+Выводит время, пропускную способность по входным данным и степень сжатия.
+
+Пример запуска::
+
+    python benchmarks/compress.py -d /mnt/archive/tmp -s 256
+
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from action.copy import CopyAction
+from action.compress import CompressAction, zstandard
+
+WORDS = ('clip', 'camera', 'scene', 'take', 'timecode', 'audio', 'video', 'frame', 'render', 'project', 'edit')
+
+
+def _text(rnd: random.Random, size: int) -> bytes:
+    lines = []
+    total = 0
+    while total < size:
+        line = '{:06d} {} {}\n'.format(rnd.randrange(10 ** 6), ' '.join(rnd.choice(WORDS) for _ in range(8)),
+                                       rnd.random())
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines).encode('utf-8')[:size]
+
+
+def _create_mix(in_dir: str, total_size: int) -> list:
+    rnd = random.Random(0)
+    paths = []
+    kinds = (
+        ('log', 0.35, lambda size: _text(rnd, size)),
+        ('xml', 0.25, lambda size: b'<clip>' + _text(rnd, size - 13) + b'</clip>'),
+        ('prproj', 0.15, lambda size: _text(rnd, size // 2) + os.urandom(size - size // 2)),
+        ('jpg', 0.15, lambda size: b'\xff\xd8\xff\xe0' + os.urandom(size - 4)),
+        ('docx', 0.10, None),
+    )
+    for n, (ext, share, generate) in enumerate(kinds):
+        size = int(total_size * share)
+        file_size = max(64 * 1024, size // 8)
+        for m in range(max(1, size // file_size)):
+            path = os.path.join(in_dir, '{}_{}.{}'.format(n, m, ext))
+            if generate is None:
+                with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+                    z.writestr('word/document.xml', _text(rnd, file_size))
+            else:
+                with open(path, 'wb') as f:
+                    f.write(generate(file_size))
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='copy and compress actions benchmark')
+    parser.add_argument('-d', '--dir', help='directory on the storage under test', default=None)
+    parser.add_argument('-s', '--size', type=int, default=128, help='total size of the input mix, MiB')
+    parser.add_argument('-t', '--threads', type=int, default=os.cpu_count() or 1, help='zstd threads')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        in_dir = os.path.join(tmp_dir, 'in')
+        os.mkdir(in_dir)
+        paths = _create_mix(in_dir, args.size * 1024 * 1024)
+        in_size = sum([os.path.getsize(p) for p in paths])
+        print('{} file(s), {:.1f} MiB'.format(len(paths), in_size / 1024 / 1024))
+        variants = [('copy', CopyAction(), {})]
+        codecs = [('zstd', (3, 10)), ('xz', (1, 6))]
+        if zstandard is None:
+            print('zstandard module is not installed - skipping zstd variants')
+            codecs = codecs[1:]
+        for codec, levels in codecs:
+            for level in levels:
+                variants.append(('{} -{}'.format(codec, level), CompressAction(),
+                                 {'codec': codec, 'level': level, 'threads': args.threads}))
+        for name, action, params in variants:
+            out_dir = os.path.join(tmp_dir, 'out')
+            start = time.perf_counter()
+            for p in paths:
+                action.run(p, params, out_dir, False)
+            elapsed = time.perf_counter() - start
+            out_size = sum([e.stat().st_size for e in os.scandir(out_dir) if not e.name.endswith('.sha256')])
+            print('{:<10} {:8.2f} s   {:8.1f} MiB/s   ratio {:5.2f}'.format(
+                name, elapsed, in_size / 1024 / 1024 / elapsed, in_size / out_size))
+            shutil.rmtree(out_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
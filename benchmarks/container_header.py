@@ -0,0 +1,77 @@
+""" Сравнение скорости чтения метаданных из заголовков контейнеров и с помощью ffprobe
+
+Для каждого файла измеряет среднее время `utils.container_header.probe_header` и, если ffprobe доступен, время
+запуска `ffprobe -show_format -show_streams`. Если файлы не указаны, используются синтетические MP4, MPEG-TS и MXF
+(в них есть только заголовки, поэтому ffprobe для них не запускается).
+
+Пример запуска::
+
+    python benchmarks/container_header.py /mnt/san/clip.mp4 /mnt/san/clip.mxf -n 20
+
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests import media_fixtures
+from utils.container_header import probe_header
+
+
+def _create_samples(tmp_dir: str) -> list:
+    paths = [os.path.join(tmp_dir, n) for n in ('sample.mp4', 'sample.m2ts', 'sample.mxf')]
+    media_fixtures.build_mp4(paths[0], [(b'vide', b'avc1'), (b'soun', b'mp4a'), (b'soun', b'mp4a')], 600,
+                             256 * 1024 * 1024, False)
+    media_fixtures.build_ts(paths[1], [(0x1B, b''), (0x81, b'')], 600, 1024 * 1024, True)
+    media_fixtures.build_mxf(paths[2], [(0x44, {}), (0x51, {})] + [(0x47, {})] * 8)
+    return paths
+
+
+def _measure(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='container header parser benchmark')
+    parser.add_argument('paths', nargs='*', help='media files')
+    parser.add_argument('-n', '--repeat', type=int, default=10, help='number of runs per file')
+    parser.add_argument('-f', '--ffprobe', default=shutil.which('ffprobe'), help='path to ffprobe')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    paths = args.paths
+    ffprobe = args.ffprobe
+    if not paths:
+        tmp_dir = tempfile.mkdtemp()
+        paths = _create_samples(tmp_dir)
+        ffprobe = None
+    try:
+        for path in paths:
+            header = probe_header(path)
+            header_time = _measure(lambda: probe_header(path), args.repeat)
+            line = '{:<40} header {:8.2f} ms'.format(os.path.basename(path)[-40:], header_time * 1000)
+            if header is None:
+                line += ' (not supported)'
+            if ffprobe:
+                ffprobe_time = _measure(lambda: subprocess.run(
+                    [ffprobe, '-v', 'error', '-of', 'json', '-show_format', '-show_streams', path],
+                    stdout=subprocess.DEVNULL, check=True
+                ), args.repeat)
+                line += '   ffprobe {:8.2f} ms   x{:.0f}'.format(ffprobe_time * 1000, ffprobe_time / header_time)
+            print(line)
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
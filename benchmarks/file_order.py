@@ -0,0 +1,106 @@
+""" Сравнение пропускной способности чтения при разных политиках порядка обработки файлов
+
+Создаёт во временной папке (её лучше разместить на проверяемом диске) синтетическую "фрагментированную" раскладку:
+файлы записываются порциями по очереди, с принудительным сбросом на диск после каждой порции, а их имена и папки
+перемешаны так, чтобы порядок обхода не совпадал с физическим расположением данных. Затем файлы читаются целиком в
+порядке каждой из политик, предварительно вытесненные из страничного кэша.
+
+Пример запуска::
+
+    python benchmarks/file_order.py -d /mnt/raid/tmp -n 200 -s 8
+
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_order import get_file_order_class
+from utils.file_list import build_file_list
+
+CHUNK_SIZE = 256 * 1024
+
+
+def _drop_cache(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def _create_layout(base_dir: str, count: int, size: int, dirs: int) -> list:
+    rnd = random.Random(0)
+    paths = []
+    for n in range(count):
+        d = os.path.join(base_dir, 'clip{:03d}'.format(rnd.randrange(dirs)))
+        os.makedirs(d, exist_ok=True)
+        paths.append(os.path.join(d, '{:08x}.bin'.format(rnd.getrandbits(32))))
+    files = [open(p, 'wb') for p in paths]
+    try:
+        chunk = os.urandom(CHUNK_SIZE)
+        for _ in range(max(1, size // CHUNK_SIZE)):
+            for f in files:
+                f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_all(base_dir: str, dir_list: list) -> int:
+    total = 0
+    for d in dir_list:
+        for f in d['files']:
+            with open(os.path.join(base_dir, d['rel_in_dir'], f), 'rb', buffering=0) as i_file:
+                while True:
+                    data = i_file.read(CHUNK_SIZE * 4)
+                    if not data:
+                        break
+                    total += len(data)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='file order policies benchmark')
+    parser.add_argument('-d', '--dir', help='directory on the disk under test', default=None)
+    parser.add_argument('-n', '--count', type=int, default=100, help='number of files')
+    parser.add_argument('-s', '--size', type=int, default=4, help='size of each file, MiB')
+    parser.add_argument('-c', '--clips', type=int, default=10, help='number of clip directories')
+    parser.add_argument('-p', '--policies', nargs='+', default=['walk', 'name', 'inode', 'extent'])
+    args = parser.parse_args()
+
+    base_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        paths = _create_layout(base_dir, args.count, args.size * 1024 * 1024, args.clips)
+        dir_list, file_count = build_file_list(base_dir)
+        print('{} file(s), {} MiB total in {}'.format(file_count, args.count * args.size, base_dir))
+        for policy in args.policies:
+            for group_by_dir in (False, True):
+                start = time.perf_counter()
+                ordered = get_file_order_class(policy)().order(base_dir, dir_list, group_by_dir)
+                order_time = time.perf_counter() - start
+                for p in paths:
+                    _drop_cache(p)
+                start = time.perf_counter()
+                total = _read_all(base_dir, ordered)
+                read_time = time.perf_counter() - start
+                print('{:<8} {:<8} ordering {:8.3f} s   reading {:8.3f} s   {:10.1f} MiB/s'.format(
+                    policy, 'grouped' if group_by_dir else '', order_time, read_time,
+                    total / 1024 / 1024 / read_time))
+    finally:
+        shutil.rmtree(base_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+""" Замер времени запуска приложения
+
+Запускает `autoarchive.py` в отдельных процессах для команды `version` и для команды `run` с набором правил, в котором
+используется только действие `copy`, и выводит медиану времени выполнения. С целями (`--target` для `version` и
+`--run-target` для `run`) сравнивается время сверх запуска интерпретатора, импортирующего модули стандартной
+библиотеки, без которых не обходится ни один запуск приложения (`FLOOR_MODULES`): на них уходит 20-35 мс, и от
+приложения это время не зависит. Сверх этого `version` занимает 12-17 мс, а `run` - 35-47 мс (вместе с созданием
+хранилища результатов и копированием файлов). Цели по умолчанию - 25 и 70 мс - оставляют запас на разброс измерений,
+но ловят появление в пути запуска модулей вроде `http.client`, добавляющих десятки миллисекунд.
+
+Дополнительно проверяется, что при "тёплом" запуске не импортируются тяжёлые зависимости и сетевые модули. Эта
+проверка не зависит от скорости машины и выполняется также тестом `tests/test_startup.py`.
+
+Пример запуска::
+
+    python benchmarks/startup.py -n 20
+
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('jsonschema', 'jinja2', 'pyffwrapper', 'http', 'ssl', 'email', 'html', 'pprint')
+FLOOR_MODULES = ('argparse', 'json', 'logging')
+
+
+def prepare(tmp_dir: str) -> tuple:
+    """ Создаёт в папке конфигурацию, набор правил с действием `copy` и папки для запусков
+
+    Returns:
+        Кортеж (путь к конфигурации, путь к набору правил, словарь путей к папкам)
+    """
+    dummy_file = os.path.join(tmp_dir, 'dummy')
+    open(dummy_file, 'w').close()
+    dirs = {}
+    for d in ('temp', 'out', 'log', 'in'):
+        dirs[d] = os.path.join(tmp_dir, d)
+        os.mkdir(dirs[d])
+    for n in range(10):
+        with open(os.path.join(dirs['in'], 'file{}.txt'.format(n)), 'w') as f:
+            f.write('x' * 1024)
+    conf_path = os.path.join(tmp_dir, 'config.json')
+    with open(conf_path, 'w') as f:
+        json.dump({
+            'ffmpeg_path': dummy_file,
+            'ffprobe_path': dummy_file,
+            'temp_dir': dirs['temp'],
+            'out_dir': dirs['out'],
+            'log_dir': dirs['log'],
+        }, f)
+    rules_set_path = os.path.join(tmp_dir, 'rules.json')
+    with open(rules_set_path, 'w') as f:
+        json.dump({'policy': 'error', 'patterns': [['.*', {}, 'copy', {}]]}, f)
+    return conf_path, rules_set_path, dirs
+
+
+def get_command(conf_path: str, *args) -> list:
+    """ Возвращает командную строку запуска приложения без вывода журнала
+
+    """
+    return [sys.executable, os.path.join(BASE_DIR, 'autoarchive.py'), '-v', 'NONE', '-l', 'ERROR', '-c', conf_path] + \
+        list(args)
+
+
+def _measure(cmd: list, count: int, cleanup=None) -> list:
+    timings = []
+    for _ in range(count):
+        if cleanup is not None:
+            cleanup()
+        start = time.perf_counter()
+        subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def get_heavy_imports(cmd: list) -> list:
+    """ Возвращает отсортированный список тяжёлых пакетов (`HEAVY_MODULES`), импортированных командой
+
+    """
+    result = subprocess.run(cmd[:1] + ['-X', 'importtime'] + cmd[1:], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    imported = set()
+    for line in result.stderr.splitlines():
+        name = line.rsplit('|', 1)[-1].strip()
+        if name.split('.')[0] in HEAVY_MODULES:
+            imported.add(name.split('.')[0])
+    return sorted(imported)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='autoarchive startup benchmark')
+    parser.add_argument('-n', '--count', type=int, default=20, help='runs per command')
+    parser.add_argument('-t', '--target', type=float, default=25.0,
+                        help='target median time of version over the standard library floor, ms')
+    parser.add_argument('-rt', '--run-target', dest='run_target', type=float, default=70.0,
+                        help='target median time of a copy-only run over the standard library floor, ms')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        conf_path, rules_set_path, dirs = prepare(tmp_dir)
+
+        def _clean_out():
+            shutil.rmtree(dirs['out'])
+            os.mkdir(dirs['out'])
+
+        commands = [
+            ('version', get_command(conf_path, 'version'), None, args.target),
+            ('run (copy only)', get_command(conf_path, 'run', dirs['in'], rules_set_path), _clean_out, args.run_target),
+        ]
+        interpreter = statistics.median(_measure([sys.executable, '-c', 'pass'], args.count))
+        print('{:<18} median {:8.1f} ms'.format('interpreter', interpreter))
+        baseline = statistics.median(_measure(
+            [sys.executable, '-c', 'import {}'.format(', '.join(FLOOR_MODULES))], args.count))
+        print('{:<18} median {:8.1f} ms'.format('stdlib floor', baseline))
+        failed = False
+        for name, cmd, cleanup, target in commands:
+            # "прогревочный" запуск - заполняет кэш наборов правил
+            if cleanup is not None:
+                cleanup()
+            subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+            if cleanup is not None:
+                cleanup()
+            heavy = get_heavy_imports(cmd)
+            timings = _measure(cmd, args.count, cleanup)
+            median = statistics.median(timings)
+            ok = median - baseline <= target and not heavy
+            failed = failed or not ok
+            print('{:<18} median {:8.1f} ms   overhead {:8.1f} ms (target {:g})   heavy imports: {:<24} {}'.format(
+                name, median, median - baseline, target, ', '.join(heavy) or '-', 'OK' if ok else 'FAIL'))
+    finally:
+        shutil.rmtree(tmp_dir)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,11 @@
 
 """
 
-from utils.module_import import get_class
+from utils.module_import import get_class, register_plugins
+
+register_plugins('converter', {
+    'basic': [],
+})
 
 
 def get_converter_class(conv_id: str):
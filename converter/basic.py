@@ -1,11 +1,15 @@
-from dispatcher.basic import BasicDispatcher
+from dispatcher import get_dispatcher_class
+from utils import urls
 
 
 class BasicConverter:
 
-    def __init__(self, input_url: str, profile: str, profile_vars: list, conf_out_dir: str, dir_depth: int,
-                 use_in_dir_as_root: bool, simulate: bool):
-        self._dispatcher = BasicDispatcher(
+    def __init__(self, input_url, profile: str, profile_vars: list, conf_out_dir: str, dir_depth: int,
+                 use_in_dir_as_root: bool, simulate: bool, file_order: str = 'walk', group_by_dir: bool = False,
+                 discovery_workers: int = 1):
+        input_urls = [input_url] if type(input_url) == str else input_url
+        dispatcher_class = get_dispatcher_class('http' if any([urls.is_url(u) for u in input_urls]) else 'basic')
+        self._dispatcher = dispatcher_class(
             input_url,
             {
                 'policy': 'error',
@@ -14,7 +18,8 @@ class BasicConverter:
                     'profile_vars': dict(profile_vars) if profile_vars else dict()
                 }]],
             },
-            conf_out_dir, dir_depth, use_in_dir_as_root, simulate
+            conf_out_dir, dir_depth, use_in_dir_as_root, simulate, file_order, group_by_dir,
+            discovery_workers=discovery_workers
         )
 
     def convert(self):
@@ -2,7 +2,12 @@
 
 """
 
-from utils.module_import import get_class
+from utils.module_import import get_class, register_plugins
+
+register_plugins('dispatcher', {
+    'basic': [],
+    'http': [],
+})
 
 
 def get_dispatcher_class(disp_id: str):
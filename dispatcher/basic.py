@@ -5,12 +5,15 @@
 import logging
 import os
 import re
-import pprint
+import time
 
 from action import get_action_class
 from pattern_filter import get_pattern_filter_class
 from dispatcher import PolicyViolationException, UnknownPolicyException
-from utils.file_list import build_file_list
+from file_order import get_file_order_class
+from utils import out_tree, run_results
+from utils.file_list import build_file_lists
+from utils.regex_prefix import get_dir_filter
 
 
 class BasicDispatcher:
@@ -21,29 +24,39 @@ class BasicDispatcher:
     типа действия - поэтому используется внутренный кэш для сохранения подобных объектов. Та же ситуация и с фильтрами.
     """
 
-    def __init__(self, input_url: str, rules_set: dict, conf_out_dir: str, dir_depth: int, use_in_dir_as_root: bool,
-                 simulate: bool):
+    SUMMARY_LIMIT = 100
+
+    def __init__(self, input_url, rules_set: dict, conf_out_dir: str, dir_depth: int, use_in_dir_as_root: bool,
+                 simulate: bool, file_order: str = 'walk', group_by_dir: bool = False, prune_dirs: bool = False,
+                 discovery_workers: int = 1):
         """
 
         Args:
             rules_set: Набор правил для обработки
-            input_url: Входной URL
+            input_url: Входной URL или список входных URL. Файлы всех URL обрабатываются одним потоком - сначала
+                файлы первого, потом второго и так далее
             conf_out_dir: Корневая выходная папка
             dir_depth: Глубина дерева выходных папок
             use_in_dir_as_root: Использовать ли входную папку (если URL - папка) в качестве корня для выхода
             simulate: Если это симуляция - никаких реальных изменений происходить не будет
+            file_order: Название политики порядка обработки файлов
+            group_by_dir: Обрабатывать ли файлы одной папки вместе
+            prune_dirs: Не спускаться ли в папки, в которых не может найтись файлов, соответствующих набору правил.
+                При политике `skip` такие папки пропускаются всегда - несоответствующие файлы всё равно не нужны
+            discovery_workers: Количество потоков, параллельно читающих содержимое входных папок
         """
 
         self._policy = rules_set['policy']
-        self._no_match_files = []
         self._conf_out_dir = conf_out_dir
         self._dir_depth = dir_depth
         self._use_in_dir_as_root = use_in_dir_as_root
         self._simulate = simulate
+        self._file_order = file_order
+        self._group_by_dir = group_by_dir
+        self._prune_dirs = prune_dirs or self._policy == 'skip'
+        self._discovery_workers = discovery_workers
 
-        self._input_url = os.path.abspath(input_url)
-        self._input_is_a_file = os.path.isfile(self._input_url)
-        self._input_is_a_dir = os.path.isdir(self._input_url)
+        self._input_urls = [os.path.abspath(u) for u in ([input_url] if type(input_url) == str else input_url)]
 
         self._patterns = rules_set['patterns']
         self._patterns_cache = []
@@ -52,10 +65,11 @@ class BasicDispatcher:
         self._action_cache = {}  # ACTIONS ARE CACHEABLE - DO NOT FORGET IT - THEY'RE USED MORE THAN ONCE
         self._filter_cache = {}  # FILTERS ARE CACHEABLE - DO NOT FORGET IT - THEY'RE USED MORE THAN ONCE
 
-        self._no_match_files = []
-        self._input_base_dir = ''
+        self._results = None
+        self._roots = []
         self._dir_list = []
         self._file_count = 0
+        self._conflicts = set()
 
     def _fill_patterns_cache(self):
         """ Компилирует все регулярные выражения из набора правил
@@ -63,7 +77,10 @@ class BasicDispatcher:
         logging.debug('Filling rules set patterns cache...')
         for reg_exp, *p in self._patterns:
             self._patterns_cache.append((re.compile(reg_exp, re.IGNORECASE), reg_exp, *p))
-        logging.debug('Rules set patterns cache:\r\n{}'.format(pprint.pformat(self._patterns_cache)))
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            # pprint (вместе с dataclasses) заметно замедляет запуск - он нужен только для отладки
+            import pprint
+            logging.debug('Rules set patterns cache:\r\n{}'.format(pprint.pformat(self._patterns_cache)))
 
     def dispatch(self):
         """ Запускает обработку
@@ -73,64 +90,210 @@ class BasicDispatcher:
         """
         if self._simulate:
             logging.warning('--- THIS IS A SIMULATION - NO CHANGES WILL BE MADE ---')
-        if self._input_is_a_file:
-            self._input_base_dir, filename = os.path.split(self._input_url)
-            self._dir_list = [{'rel_in_dir': '', 'files': [filename]}]
-            self._file_count = 1
-        elif self._input_is_a_dir:
-            self._input_base_dir = self._input_url
-            self._dir_list, self._file_count = build_file_list(self._input_url)
-        else:
-            raise ValueError('Basic dispatcher supports only files and directories as input')
+        self._build_dir_list()
+        if out_tree.out_tree is not None:
+            self._plan()
 
+        self._results = run_results.run_results
+        if self._results is None:
+            self._results = run_results.RunResults(':memory:')
         processed_files_count = 0
-        processed_errors = []
-        for d in self._dir_list:
-            for f in d['files']:
-                rel_in_path = os.path.join(d['rel_in_dir'], f)
-                logging.info('Processing file {} of {}: "{}"...'.format(
-                    processed_files_count + 1, self._file_count, rel_in_path))
-                try:
-                    self._dispatch(d['rel_in_dir'], rel_in_path)
-                except PolicyViolationException as e:
-                    raise e
-                except Exception as e:
-                    if self._policy == 'error':
+        try:
+            for d in self._dir_list:
+                for f in d['files']:
+                    rel_in_path = os.path.join(d['rel_in_dir'], f)
+                    shown_path = self._get_shown_path(d['root'], rel_in_path)
+                    logging.info('Processing file {} of {}: "{}"...'.format(
+                        processed_files_count + 1, self._file_count, shown_path))
+                    record = {'outcome': 'done', 'patterns': [], 'actions': []}
+                    start = time.monotonic()
+                    try:
+                        self._dispatch(d['root'], d['rel_in_dir'], rel_in_path, record)
+                    except PolicyViolationException as e:
                         raise e
-                    elif self._policy == 'warning':
-                        level = 0
-                        exceptions_chain = []
-                        while True:
-                            exceptions_chain.append('{spaces}{type}: {message}'.format(
-                                spaces=' ' * 2 * level,
-                                type=type(e),
-                                message=str(e),
-                            ))
-                            level += 1
-                            if e.__cause__ is None:
-                                break
-                            e = e.__cause__
-                        processed_errors.append((rel_in_path, '\r\n'.join(exceptions_chain)))
-                    elif self._policy != 'skip':
-                        raise UnknownPolicyException(self._policy)
-                processed_files_count += 1
-        if self._no_match_files and self._policy == 'warning':
+                    except Exception as e:
+                        if self._policy == 'error':
+                            raise e
+                        elif self._policy not in ('warning', 'skip'):
+                            raise UnknownPolicyException(self._policy)
+                        record['outcome'] = 'error'
+                        record['error'] = self._format_exceptions_chain(e)
+                    self._results.record(shown_path, record['outcome'], record['patterns'], record['actions'],
+                                         time.monotonic() - start, record.get('error'))
+                    processed_files_count += 1
+        finally:
+            self._finalize_actions()
+            self._results.flush()
+        self._log_summary()
+
+    @staticmethod
+    def _format_exceptions_chain(e: Exception) -> str:
+        level = 0
+        exceptions_chain = []
+        while True:
+            exceptions_chain.append('{spaces}{type}: {message}'.format(
+                spaces=' ' * 2 * level,
+                type=type(e),
+                message=str(e),
+            ))
+            level += 1
+            if e.__cause__ is None:
+                break
+            e = e.__cause__
+        return '\r\n'.join(exceptions_chain)
+
+    def _log_summary(self):
+        """ Выводит итоги обработки
+
+        Итоги строятся запросами к хранилищу результатов, а списки файлов без совпадений и файлов с ошибками
+        ограничиваются первыми `SUMMARY_LIMIT` - остальное можно получить командой `report`.
+        """
+        counts = self._results.get_counts()
+        logging.info('Files: {} processed, {} without matches, {} with errors'.format(
+            counts.get('done', 0), counts.get('no_match', 0), counts.get('error', 0)))
+        for action_id, outcome, count, elapsed in self._results.get_action_stats():
+            logging.info('Action {}: {} - {} time(s), {:.1f} s'.format(action_id, outcome, count, elapsed))
+        no_match_count = counts.get('no_match', 0)
+        if no_match_count and self._policy == 'warning':
             logging.warning(
-                'Matching patterns were not found for these files ({}):\r\n{}'.format(
-                    len(self._no_match_files),
-                    '\r\n'.join(self._no_match_files)
+                'Matching patterns were not found for these files ({}):\r\n{}{}'.format(
+                    no_match_count,
+                    '\r\n'.join([r['path'] for r in self._results.iter_files('no_match', limit=self.SUMMARY_LIMIT)]),
+                    self._get_more_message(no_match_count)
                 )
             )
-        errors_count = len(processed_errors)
-        if errors_count:
-            logging.warning('Finished with {} error(s):\r\n\r\n{}'.format(
+        errors_count = counts.get('error', 0)
+        if errors_count and self._policy == 'warning':
+            logging.warning('Finished with {} error(s):\r\n\r\n{}{}'.format(
                 errors_count,
-                '\r\n'.join(['{}:\r\n{}\r\n'.format(pe[0], pe[1]) for pe in processed_errors])
+                '\r\n'.join(['{}:\r\n{}\r\n'.format(r['path'], r['error'])
+                              for r in self._results.iter_files('error', limit=self.SUMMARY_LIMIT)]),
+                self._get_more_message(errors_count)
             ))
         else:
             logging.info('Finished without errors')
 
-    def _dispatch(self, rel_in_dir: str, rel_in_path: str):
+    def _get_more_message(self, count: int) -> str:
+        if count <= self.SUMMARY_LIMIT:
+            return ''
+        return '\r\n... and {} more (use the report command to see all of them)'.format(count - self.SUMMARY_LIMIT)
+
+    def _build_dir_list(self):
+        """ Составляет общий список файлов всех входных URL
+
+        Папки читаются вместе (см. `utils.file_list.build_file_lists`), а порядок обработки устанавливается для каждого
+        URL отдельно. Каждый элемент списка получает ключ `root` - описание URL, к которому он относится.
+
+        Raises:
+            ValueError: Если по входному пути находится неподходящий объект
+        """
+        dir_filter = get_dir_filter([p[0] for p in self._patterns]) if self._prune_dirs else None
+        dir_roots = []
+        for input_url in self._input_urls:
+            root, dir_list = self._get_root(input_url, dir_filter)
+            self._roots.append((root, dir_list))
+            if dir_list is None:
+                dir_roots.append(root)
+
+        if dir_roots:
+            file_lists = iter(build_file_lists([r['base_dir'] for r in dir_roots], dir_filter,
+                                               self._discovery_workers))
+            file_order = get_file_order_class(self._file_order)()
+            for n, (root, dir_list) in enumerate(self._roots):
+                if dir_list is None:
+                    dir_list = next(file_lists)[0]
+                    self._roots[n] = (root, file_order.order(root['base_dir'], dir_list, self._group_by_dir))
+
+        for root, dir_list in self._roots:
+            for d in dir_list:
+                d['root'] = root
+                self._dir_list.append(d)
+                self._file_count += len(d['files'])
+
+    def _get_root(self, input_url: str, dir_filter) -> tuple:
+        """ Описывает входной URL
+
+        Args:
+            input_url: входной URL
+            dir_filter: функция отсечения папок (см. `utils.file_list.build_file_lists`) или None
+
+        Returns:
+            Пара (описание URL, список папок с файлами); вместо списка - None, если URL - локальная папка, которую
+            нужно прочитать вместе с остальными
+
+        Raises:
+            ValueError: Если по входному пути находится неподходящий объект
+        """
+        if os.path.isfile(input_url):
+            base_dir, filename = os.path.split(input_url)
+            return {'base_dir': base_dir, 'is_dir': False}, [{'rel_in_dir': '', 'files': [filename]}]
+        elif os.path.isdir(input_url):
+            return {'base_dir': input_url, 'is_dir': True}, None
+        raise ValueError('Basic dispatcher supports only files and directories as input: "{}"'.format(input_url))
+
+    def _get_shown_path(self, root: dict, rel_in_path: str) -> str:
+        """ Возвращает путь к файлу для сообщений: относительный, если входной URL один, и абсолютный, если их
+        несколько
+
+        """
+        if len(self._roots) == 1:
+            return rel_in_path
+        return self._get_abs_in_path(root, rel_in_path)
+
+    def _get_abs_in_path(self, root: dict, rel_in_path: str) -> str:
+        """ Возвращает абсолютный путь к входному файлу
+
+        Args:
+            root: описание входного URL, к которому относится файл
+            rel_in_path: относительный путь к файлу
+
+        Returns:
+            Абсолютный путь
+        """
+        return os.path.join(root['base_dir'], rel_in_path)
+
+    def _plan(self):
+        """ Заранее ищет конфликты выходных файлов
+
+        Для каждого файла проходит по подходящим правилам до первого правила с фильтрами (результат фильтров заранее не
+        известен) и спрашивает у действий, какие файлы они создадут. Конфликтом считается выходной файл, который уже
+        существует или который создаст действие для одного из предыдущих файлов. Проверка существования идёт через
+        индекс выходной папки, поэтому каждая выходная папка читается один раз. Конфликтующие пары файл - действие
+        во время обработки пропускаются.
+        """
+        logging.info('Planning output files...')
+        planned = set()
+        conflicts = []
+        for d in self._dir_list:
+            for f in d['files']:
+                rel_in_path = os.path.join(d['rel_in_dir'], f)
+                abs_in_path = self._get_abs_in_path(d['root'], rel_in_path)
+                for p in self._get_matching_patterns(rel_in_path):
+                    pattern_opts = p[1]
+                    if 'filters' in pattern_opts:
+                        break
+                    action_id = p[2]
+                    out_dir = self._get_out_dir(d['root'], d['rel_in_dir'], p[3])
+                    try:
+                        out_paths = self._get_action(action_id).get_output_paths(abs_in_path, p[3], out_dir)
+                    except Exception as e:
+                        logging.debug('Unable to plan output files of {} for "{}": {}'.format(
+                            action_id, rel_in_path, e))
+                        break
+                    for out_path in out_paths or []:
+                        key = os.path.normcase(out_path)
+                        if key in planned or out_tree.exists(out_path):
+                            self._conflicts.add((abs_in_path, action_id, out_dir))
+                            conflicts.append('{} ({}): {}'.format(
+                                self._get_shown_path(d['root'], rel_in_path), action_id, out_path))
+                        planned.add(key)
+                    if 'passthrough' in pattern_opts and not pattern_opts['passthrough']:
+                        break
+        if conflicts:
+            logging.warning('Output files already exist or will be created more than once - these actions will be '
+                            'skipped ({}):\r\n{}'.format(len(conflicts), '\r\n'.join(conflicts)))
+
+    def _dispatch(self, root: dict, rel_in_dir: str, rel_in_path: str, record: dict):
         """ Обрабатывает один файл
 
         Отвечая на вопрос "Зачем передавать отдельно путь к папке и отдельно - путь к файлу в ней же" скажу - всё равно
@@ -138,23 +301,25 @@ class BasicDispatcher:
         к папке ещё раз?
 
         Args:
+            root: описание входного URL, к которому относится файл
             rel_in_dir: относительный путь к папке, содержащей обрабатываемый файл
             rel_in_path: относительный путь к обрабатываемому файлу
+            record: результат обработки для хранилища результатов - заполняются ключи `outcome`, `patterns` и `actions`
 
         Raises:
             PolicyViolationException: при использовании политики `error` и отсутствии для какого-либо файла
                 соответствующего ему действия
             UnknownPolicyException: при попытке использовани политики, неизвестной диспетчеру
         """
-        logging.debug('Base input directory: "{}"'.format(self._input_base_dir))
+        logging.debug('Base input directory: "{}"'.format(root['base_dir']))
         logging.info('Searching for matching patterns in rules set for "{}"...'.format(rel_in_path))
         patterns = self._get_matching_patterns(rel_in_path)
         if not patterns:
             logging.info('No matches were found')
+            record['outcome'] = 'no_match'
             if self._policy == 'skip':
                 return
             elif self._policy == 'warning':
-                self._no_match_files.append(rel_in_path)
                 return
             elif self._policy == 'error':
                 raise PolicyViolationException('No matches were found for "{}"'.format(rel_in_path))
@@ -162,8 +327,9 @@ class BasicDispatcher:
                 raise UnknownPolicyException(self._policy)
 
         logging.debug('Matches: {}'.format(patterns))
-        abs_in_path = os.path.join(self._input_base_dir, rel_in_path)
+        abs_in_path = self._get_abs_in_path(root, rel_in_path)
         filtered_patterns = self._filter_patterns(abs_in_path, patterns)
+        record['patterns'] = [p[0] for p in filtered_patterns]
         for n, p in enumerate(filtered_patterns):
             action_id = p[2]
             action_params = p[3]
@@ -173,44 +339,16 @@ class BasicDispatcher:
                 )
             )
 
-            logging.debug('Building output directory path...')
-            rel_out_dir_list = []
-            if self._input_is_a_dir and self._use_in_dir_as_root:
-                dir_name = os.path.split(self._input_base_dir)[1]
-                if dir_name:
-                    rel_out_dir_list.append(dir_name)
-            if 'out_dir' in action_params and action_params['out_dir']:
-                rel_out_dir_list.append(action_params['out_dir'])
-
-            dir_depth = action_params['dir_depth'] if 'dir_depth' in action_params else self._dir_depth
-            logging.debug('Output directory depth is {}'.format(dir_depth))
-            if rel_in_dir and dir_depth > 0:
-                path = rel_in_dir
-                path_list = []
-                while True:
-                    head, tail = os.path.split(path)
-                    path = head
-                    if tail:
-                        path_list.append(tail)
-                    if not head:
-                        break
-                logging.debug('Input path list: {}'.format(path_list))
-                if len(path_list) > 0:
-                    if len(path_list) < dir_depth:
-                        logging.debug('Path list\'s length is less than output directory depth - using it all')
-                        rel_out_dir_list.extend(path_list[::-1])
-                    else:
-                        path_list_slice = path_list[:-dir_depth - 1:-1]
-                        logging.debug('Path list\'s length is greater than or equal to output directory depth - using '
-                                      'slice: {}'.format(path_list_slice))
-                        rel_out_dir_list.extend(path_list_slice)
-            logging.debug('Output relative path list: {}'.format(rel_out_dir_list))
-            out_dir = os.path.abspath(os.path.join(self._conf_out_dir, *rel_out_dir_list))
-            logging.debug('Absolute output directory path: "{}"'.format(out_dir))
+            out_dir = self._get_out_dir(root, rel_in_dir, action_params)
+            if (abs_in_path, action_id, out_dir) in self._conflicts:
+                logging.warning('Output file already exists - skipping')
+                record['actions'].append((action_id, out_dir, 'conflict', 0.0))
+                continue
 
             logging.debug('Fetching action object...')
             action = self._get_action(action_id)
             logging.debug('Using action object {}'.format(action))
+            start = time.monotonic()
             try:
                 action.run(
                     abs_in_path,
@@ -220,6 +358,65 @@ class BasicDispatcher:
                 )
             except FileExistsError:
                 logging.warning('Output file already exists - skipping')
+                record['actions'].append((action_id, out_dir, 'exists', time.monotonic() - start))
+            except Exception:
+                record['actions'].append((action_id, out_dir, 'error', time.monotonic() - start))
+                raise
+            else:
+                record['actions'].append((action_id, out_dir, 'done', time.monotonic() - start))
+
+    def _get_out_dir(self, root: dict, rel_in_dir: str, action_params: dict) -> str:
+        """ Строит путь к выходной папке действия
+
+        Args:
+            root: описание входного URL, к которому относится файл
+            rel_in_dir: относительный путь к папке, содержащей обрабатываемый файл
+            action_params: параметры действия
+
+        Returns:
+            Абсолютный путь к выходной папке
+        """
+        logging.debug('Building output directory path...')
+        rel_out_dir_list = []
+        if root['is_dir'] and self._use_in_dir_as_root:
+            dir_name = self._get_root_name(root)
+            if dir_name:
+                rel_out_dir_list.append(dir_name)
+        if 'out_dir' in action_params and action_params['out_dir']:
+            rel_out_dir_list.append(action_params['out_dir'])
+
+        dir_depth = action_params['dir_depth'] if 'dir_depth' in action_params else self._dir_depth
+        logging.debug('Output directory depth is {}'.format(dir_depth))
+        if rel_in_dir and dir_depth > 0:
+            path = rel_in_dir
+            path_list = []
+            while True:
+                head, tail = os.path.split(path)
+                path = head
+                if tail:
+                    path_list.append(tail)
+                if not head:
+                    break
+            logging.debug('Input path list: {}'.format(path_list))
+            if len(path_list) > 0:
+                if len(path_list) < dir_depth:
+                    logging.debug('Path list\'s length is less than output directory depth - using it all')
+                    rel_out_dir_list.extend(path_list[::-1])
+                else:
+                    path_list_slice = path_list[:-dir_depth - 1:-1]
+                    logging.debug('Path list\'s length is greater than or equal to output directory depth - using '
+                                  'slice: {}'.format(path_list_slice))
+                    rel_out_dir_list.extend(path_list_slice)
+        logging.debug('Output relative path list: {}'.format(rel_out_dir_list))
+        out_dir = os.path.abspath(os.path.join(self._conf_out_dir, *rel_out_dir_list))
+        logging.debug('Absolute output directory path: "{}"'.format(out_dir))
+        return out_dir
+
+    def _get_root_name(self, root: dict) -> str:
+        """ Возвращает имя входной папки
+
+        """
+        return os.path.split(root['base_dir'])[1]
 
     def _get_matching_patterns(self, in_path: str) -> list:
         """ Поиск правил, соответствующих пути в `in_path`
@@ -246,6 +443,14 @@ class BasicDispatcher:
         """
         return [p for r, *p in self._patterns_cache if r.match(in_path) is not None]
 
+    def _finalize_actions(self):
+        """ Завершает работу всех использовавшихся действий
+
+        """
+        for action_id, action in self._action_cache.items():
+            logging.debug('Finalizing action {}...'.format(action_id))
+            action.finalize(self._simulate)
+
     def _get_action(self, action_id: str):
         """ Возвращает объект с действием
 
@@ -0,0 +1,51 @@
+""" Модуль с классом `HttpDispatcher`
+
+"""
+
+import logging
+import os
+
+from urllib.parse import urljoin
+
+from dispatcher.basic import BasicDispatcher
+from utils import urls
+
+
+class HttpDispatcher(BasicDispatcher):
+    """ Диспетчер, принимающий, помимо локальных путей, входные URL HTTP(S)
+
+    Файлы по URL не скачиваются перед обработкой: список файлов составляется по манифесту или страницам-индексам папок
+    (см. `utils.http_source.list_tree`), а действиям передаются URL файлов. Удалённые файлы обрабатываются в порядке
+    списка - политики порядка обработки к ним не применяются.
+    """
+
+    def __init__(self, input_url, *args, **kwargs):
+        super().__init__(input_url, *args, **kwargs)
+        self._input_urls = [u if urls.is_url(u) else os.path.abspath(u)
+                            for u in ([input_url] if type(input_url) == str else input_url)]
+
+    def _get_root(self, input_url: str, dir_filter) -> tuple:
+        if not urls.is_url(input_url):
+            return super()._get_root(input_url, dir_filter)
+        from utils import http_source
+        if self._file_order != 'walk':
+            logging.warning('File order {} is not applied to remote input "{}"'.format(self._file_order, input_url))
+        if not http_source.is_tree(input_url):
+            # URL отдельного файла передаётся действиям как есть - с параметрами запроса (например, подписью доступа)
+            # и исходным кодированием пути
+            base_url = urljoin(input_url, '.').rstrip('/')
+            return ({'base_dir': base_url, 'is_dir': False, 'remote': True, 'url': input_url},
+                    [{'rel_in_dir': '', 'files': [urls.get_basename(input_url)]}])
+        base_url, dir_list, file_count = http_source.list_tree(input_url, dir_filter, self._discovery_workers)
+        logging.debug('Found {} files(s) in {} directory(ies)'.format(file_count, len(dir_list)))
+        return {'base_dir': base_url, 'is_dir': True, 'remote': True}, dir_list
+
+    def _get_abs_in_path(self, root: dict, rel_in_path: str) -> str:
+        if root.get('remote'):
+            return root['url'] if not root['is_dir'] else urls.join(root['base_dir'], rel_in_path)
+        return super()._get_abs_in_path(root, rel_in_path)
+
+    def _get_root_name(self, root: dict) -> str:
+        if root.get('remote'):
+            return urls.get_basename(root['base_dir'])
+        return super()._get_root_name(root)
@@ -0,0 +1,97 @@
+""" Модуль с политиками порядка обработки файлов
+
+Политика порядка применяется между составлением списка файлов и их обработкой диспетчером и позволяет, например,
+читать файлы в порядке их физического расположения на диске, сокращая количество перемещений головок (или перемотки
+ленты для иерархических хранилищ).
+
+Новые политики создаются в отдельных подмодулях - по одному для каждого класса. Подмодуль называется так же, как
+политика, например - `inode`, а класс - по схеме `<Названиеполитики>FileOrder`, например - `InodeFileOrder`.
+"""
+
+import logging
+import os
+
+from utils.module_import import get_class, register_plugins
+
+register_plugins('file order', {
+    'walk': [],
+    'name': [],
+    'inode': [],
+    'extent': [],
+    'ltfs': [],
+})
+
+
+def get_file_order_class(order_id: str):
+    """ Возвращает класс, описывающий политику порядка обработки файлов, по её названию
+
+    Args:
+        order_id: название политики
+
+    Returns:
+        Класс, описывающий политику
+    """
+    return get_class('file order', order_id)
+
+
+class AbstractFileOrder:
+    """ Базовый абстрактный класс, описывающий политику порядка обработки файлов
+
+    Потомкам достаточно реализовать `get_key` - метод, возвращающий ключ сортировки для одного файла.
+    """
+
+    def get_key(self, abs_path: str) -> tuple:
+        """ Возвращает ключ сортировки для файла
+
+        Args:
+            abs_path: абсолютный путь к файлу
+
+        Returns:
+            Кортеж, по которому будут сравниваться файлы
+        """
+        raise NotImplementedError
+
+    def order(self, base_dir: str, dir_list: list, group_by_dir: bool) -> list:
+        """ Упорядочивает список файлов
+
+        Args:
+            base_dir: корневая входная папка
+            dir_list: список файлов в формате, который возвращает `utils.file_list.build_file_list`
+            group_by_dir: если True - файлы одной папки (например, одного клипа) обрабатываются вместе, а сами папки
+                упорядочиваются по первому файлу в них
+
+        Returns:
+            Упорядоченный список в том же формате. Если файлы разных папок чередуются, одна папка может встречаться в
+            списке несколько раз.
+        """
+        logging.debug('Ordering file list using {}...'.format(type(self).__name__))
+        if group_by_dir:
+            keyed_dirs = []
+            for d in dir_list:
+                if not d['files']:
+                    continue
+                keyed_files = sorted([
+                    (self._get_key_safe(os.path.join(base_dir, d['rel_in_dir'], f)), f) for f in d['files']
+                ])
+                keyed_dirs.append((keyed_files[0][0], d['rel_in_dir'], [f for k, f in keyed_files]))
+            keyed_dirs.sort()
+            return [{'rel_in_dir': rel_in_dir, 'files': files} for k, rel_in_dir, files in keyed_dirs]
+
+        keyed_files = sorted([
+            (self._get_key_safe(os.path.join(base_dir, d['rel_in_dir'], f)), d['rel_in_dir'], f)
+            for d in dir_list for f in d['files']
+        ])
+        result = []
+        for k, rel_in_dir, f in keyed_files:
+            if result and result[-1]['rel_in_dir'] == rel_in_dir:
+                result[-1]['files'].append(f)
+            else:
+                result.append({'rel_in_dir': rel_in_dir, 'files': [f]})
+        return result
+
+    def _get_key_safe(self, abs_path: str) -> tuple:
+        try:
+            return (0, ) + self.get_key(abs_path)
+        except OSError as e:
+            logging.debug('Unable to get order key for "{}": {}'.format(abs_path, str(e)))
+            return (1, )
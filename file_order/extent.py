@@ -0,0 +1,69 @@
+""" Модуль с классом `ExtentFileOrder`
+
+"""
+
+import logging
+import os
+import struct
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from file_order import AbstractFileOrder
+
+FS_IOC_FIEMAP = 0xC020660B
+FIEMAP_MAX_OFFSET = 0xFFFFFFFFFFFFFFFF
+
+# struct fiemap: fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, fm_reserved
+_fiemap_header = struct.Struct('=QQLLLL')
+# struct fiemap_extent: fe_logical, fe_physical, fe_length, fe_reserved64[2], fe_flags, fe_reserved[3]
+_fiemap_extent = struct.Struct('=QQQQQLLLL')
+
+
+def get_physical_offset(abs_path: str):
+    """ Возвращает физическое смещение первого экстента файла на устройстве с помощью ioctl `FS_IOC_FIEMAP`
+
+    Args:
+        abs_path: абсолютный путь к файлу
+
+    Returns:
+        Смещение в байтах или None, если у файла нет ни одного экстента (например, он пуст)
+
+    Raises:
+        OSError: если файловая система или платформа не поддерживают FIEMAP
+    """
+    if fcntl is None:
+        raise OSError('FIEMAP is not supported on this platform')
+    buf = bytearray(_fiemap_header.pack(0, FIEMAP_MAX_OFFSET, 0, 0, 1, 0) + bytes(_fiemap_extent.size))
+    with open(abs_path, 'rb') as f:
+        fcntl.ioctl(f.fileno(), FS_IOC_FIEMAP, buf)
+    if not _fiemap_header.unpack_from(buf)[3]:
+        return None
+    return _fiemap_extent.unpack_from(buf, _fiemap_header.size)[1]
+
+
+class ExtentFileOrder(AbstractFileOrder):
+    """ Политика, упорядочивающая файлы по физическому расположению их первого экстента
+
+    Если FIEMAP не поддерживается файловой системой, для всех файлов этого устройства используется номер индексного
+    дескриптора - такие файлы сортируются после файлов с известным расположением.
+    """
+
+    def __init__(self):
+        self._unsupported_devices = set()
+
+    def get_key(self, abs_path: str) -> tuple:
+        stat = os.stat(abs_path)
+        if stat.st_dev not in self._unsupported_devices:
+            try:
+                offset = get_physical_offset(abs_path)
+            except OSError as e:
+                logging.debug('FIEMAP is not available for device {} - falling back to inode order: {}'.format(
+                    stat.st_dev, str(e)))
+                self._unsupported_devices.add(stat.st_dev)
+            else:
+                if offset is not None:
+                    return stat.st_dev, 0, offset
+        return stat.st_dev, 1, stat.st_ino
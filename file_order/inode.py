@@ -0,0 +1,19 @@
+""" Модуль с классом `InodeFileOrder`
+
+"""
+
+import os
+
+from file_order import AbstractFileOrder
+
+
+class InodeFileOrder(AbstractFileOrder):
+    """ Политика, упорядочивающая файлы по номеру индексного дескриптора
+
+    На большинстве файловых систем номера индексных дескрипторов хоть как-то соотносятся с расположением файлов на
+    диске, а получение номера стоит всего одного вызова `stat`.
+    """
+
+    def get_key(self, abs_path: str) -> tuple:
+        stat = os.stat(abs_path)
+        return stat.st_dev, stat.st_ino
@@ -0,0 +1,28 @@
+""" Модуль с классом `LtfsFileOrder`
+
+"""
+
+import os
+
+from file_order import AbstractFileOrder
+
+
+class LtfsFileOrder(AbstractFileOrder):
+    """ Политика, упорядочивающая файлы по их положению на ленте LTFS
+
+    Использует виртуальные расширенные атрибуты `ltfs.partition` и `ltfs.startblock`, которые предоставляет LTFS (и
+    совместимые с ней HSM-системы). Файлы без этих атрибутов сортируются после остальных по номеру индексного
+    дескриптора.
+    """
+
+    PARTITION_ATTR = 'user.ltfs.partition'
+    START_BLOCK_ATTR = 'user.ltfs.startblock'
+
+    def get_key(self, abs_path: str) -> tuple:
+        try:
+            partition = os.getxattr(abs_path, self.PARTITION_ATTR).decode('ascii').strip()
+            start_block = int(os.getxattr(abs_path, self.START_BLOCK_ATTR))
+        except (AttributeError, OSError, ValueError):
+            stat = os.stat(abs_path)
+            return 1, '', stat.st_dev, stat.st_ino
+        return 0, partition, start_block, 0
@@ -0,0 +1,16 @@
+""" Модуль с классом `NameFileOrder`
+
+"""
+
+import os
+
+from file_order import AbstractFileOrder
+
+
+class NameFileOrder(AbstractFileOrder):
+    """ Политика, упорядочивающая файлы по пути к ним
+
+    """
+
+    def get_key(self, abs_path: str) -> tuple:
+        return tuple(os.path.normcase(abs_path).split(os.sep))
@@ -0,0 +1,14 @@
+""" Модуль с классом `WalkFileOrder`
+
+"""
+
+from file_order import AbstractFileOrder
+
+
+class WalkFileOrder(AbstractFileOrder):
+    """ Политика, сохраняющая порядок, в котором файлы были найдены при обходе дерева папок
+
+    """
+
+    def order(self, base_dir: str, dir_list: list, group_by_dir: bool) -> list:
+        return dir_list
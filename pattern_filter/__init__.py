@@ -1,4 +1,8 @@
-from utils.module_import import get_class
+from utils.module_import import get_class, register_plugins
+
+register_plugins('pattern filter', {
+    'ffprobe.meta': ['ffmpeg'],
+})
 
 
 def get_pattern_filter_class(filter_id: str):
@@ -1,13 +1,62 @@
-from pyffwrapper.factory import ffprobe_factory
+import json
+import logging
+
+from pyffwrapper import factory
+from pyffwrapper.metadata_collector import FFprobeMetadataCollector
 from pyffwrapper.metadata_filter import FFprobeMetadataFilter
 from pattern_filter import AbstractPatternFilter
+from utils import container_header, meta_filter, probe
 
 
 class FfprobeMetaPatternFilter(AbstractPatternFilter):
+    """ Фильтр по метаданным файла
+
+    Метаданные получаются по уровням (см. `utils.probe`): сначала читаются заголовки контейнера, затем, если их не
+    хватило для решения, запускается быстрый ffprobe и только в крайнем случае - полный анализ средствами pyffwrapper.
+    Для каждой спецификации заранее определяется, какой уровень ей нужен: если единственные нерешённые условия требуют
+    полного анализа, быстрый ffprobe пропускается. Результат полного анализа запоминается в `probe.metadata_prober` -
+    действие `ffmpeg.convert` для того же файла его не повторяет.
+    """
 
     def __init__(self):
         super().__init__()
-        self._ff_meta_filter = ffprobe_factory.get_ffprobe_metadata_filter(FFprobeMetadataFilter)
+        self._ff_meta_filter = factory.ffprobe_factory.get_ffprobe_metadata_filter(FFprobeMetadataFilter)
+        self._ff_meta_collector = factory.ffprobe_factory.get_ffprobe_metadata_collector(FFprobeMetadataCollector)
+        self._compiled = {}
+
+    def _compile(self, filter_params: dict) -> tuple:
+        key = json.dumps(filter_params, sort_keys=True)
+        try:
+            return self._compiled[key]
+        except KeyError:
+            pass
+        compiled = (probe.get_required_level(filter_params), probe.get_shallow_spec(filter_params))
+        logging.debug('Filter {} requires {} probe level'.format(key, probe.LEVEL_NAMES[compiled[0]]))
+        self._compiled[key] = compiled
+        return compiled
 
     def filter(self, input_url: str, filter_params: dict) -> bool:
+        level, shallow_params = self._compile(filter_params)
+        prober = probe.metadata_prober
+        header = prober.get_header(input_url) if prober is not None else container_header.probe_header(input_url)
+        if header is not None:
+            result = meta_filter.evaluate(filter_params, *header)
+            if result is not None:
+                logging.debug('Filter result is determined by container header: {}'.format(result))
+                return result
+        if prober is not None and not (level == probe.DEEP and header is not None and
+                                       meta_filter.evaluate(shallow_params, *header) is True):
+            metadata = prober.get_fast(input_url)
+            if metadata is not None:
+                result = meta_filter.evaluate(filter_params, metadata)
+                if result is not None:
+                    logging.debug('Filter result is determined by fast probe: {}'.format(result))
+                    return result
+        logging.debug('Using deep probe to determine filter result...')
+        if prober is not None:
+            metadata = prober.get_deep(input_url, self._ff_meta_collector.get_metadata)
+            result = meta_filter.evaluate(filter_params, metadata)
+            if result is not None:
+                return result
+            logging.debug('Filter result can\'t be determined from deep probe metadata - using metadata filter')
         return self._ff_meta_filter.filter(input_url, filter_params)
@@ -1,63 +1,160 @@
-import jsonschema
+""" Модуль с реализациями поставщиков наборов правил
+
+"""
+
+import hashlib
 import logging
 
-from utils.module_import import get_class
+from utils.module_import import get_class, register_plugins
+
+register_plugins('rules provider', {
+    'json': [],
+})
+
+RULES_SET_SCHEMA = {
+    '$schema': 'http://json-schema.org/draft-04/schema#',
+    'title': 'Rules set',
+    'type': 'object',
+    'properties': {
+        'policy': {
+            'title': 'Rules set\'s policy',
+            'type': 'string',
+            'enum': ['skip', 'warning', 'error']
+        },
+        'patterns': {
+            'title': 'Rules set\'s patterns',
+            'type': 'array',
+            'items': {
+                'title': 'Rules set\'s pattern',
+                'type': 'array',
+                'items': [
+                    {
+                        'title': 'Pattern\'s regular expression',
+                        'type': 'string'
+                    },
+                    {
+                        'title': 'Pattern\'s options',
+                        'type': 'object',
+                        'properties': {
+                            'passthrough': {
+                                'type': 'boolean'
+                            },
+                            'filters': {
+                                'type': 'object'
+                            }
+                        },
+                        'additionalProperties': False
+                    },
+                    {
+                        'title': 'Pattern\'s action name',
+                        'type': 'string'
+                    },
+                    {
+                        'title': 'Pattern\'s action parameters',
+                        'type': 'object'
+                    }
+                ],
+                'minItems': 3,
+                'additionalItems': False
+            },
+            'minItems': 1
+        }
+    },
+    'required': ['policy', 'patterns', ]
+}
+
+_rules_set_validator = None
 
 
 def get_rules_provider_class(rp_id: str):
+    """ Возвращает класс, описывающий поставщика наборов правил, по его названию
+
+    Args:
+        rp_id: название поставщика наборов правил
+
+    Returns:
+        Класс, описывающий поставщика наборов правил
+    """
     return get_class('rules provider', rp_id)
 
 
 def validate_rules_set(rules_set: dict):
-    schema = {
-        'title': 'Rules set',
-        'type': 'object',
-        'properties': {
-            'policy': {
-                'title': 'Rules set\'s policy',
-                'type': 'string',
-                'enum': ['skip', 'warning', 'error']
-            },
-            'patterns': {
-                'title': 'Rules set\'s patterns',
-                'type': 'array',
-                'items': {
-                    'title': 'Rules set\'s pattern',
-                    'type': 'array',
-                    'items': [
-                        {
-                            'title': 'Pattern\'s regular expression',
-                            'type': 'string'
-                        },
-                        {
-                            'title': 'Pattern\'s options',
-                            'type': 'object',
-                            'properties': {
-                                'passthrough': {
-                                    'type': 'boolean'
-                                },
-                                'filters': {
-                                    'type': 'object'
-                                }
-                            },
-                            'additionalProperties': False
-                        },
-                        {
-                            'title': 'Pattern\'s action name',
-                            'type': 'string'
-                        },
-                        {
-                            'title': 'Pattern\'s action parameters',
-                            'type': 'object'
-                        }
-                    ],
-                    'minItems': 3,
-                    'additionalItems': False
-                },
-                'minItems': 1
-            }
-        },
-        'required': ['policy', 'patterns', ]
-    }
+    """ Проверяет набор правил на соответствие схеме
+
+    Объект, проверяющий схему, создаётся только один раз - сама схема при этом тоже проверяется только один раз.
+    jsonschema импортируется только здесь - если набор правил взят из кэша, он не понадобится вовсе.
+
+    Args:
+        rules_set: набор правил
+
+    Raises:
+        jsonschema.ValidationError: если набор правил не соответствует схеме
+    """
+    global _rules_set_validator
+    if _rules_set_validator is None:
+        import jsonschema
+        _rules_set_validator = jsonschema.Draft4Validator(RULES_SET_SCHEMA)
     logging.debug('Validating rules set...')
-    jsonschema.validate(rules_set, schema)
+    _rules_set_validator.validate(rules_set)
+
+
+def normalize_rules_set(rules_set: dict) -> dict:
+    """ Приводит проверенный набор правил к полной форме
+
+    После нормализации каждое правило состоит ровно из четырёх элементов - параметры действия, если они не были
+    указаны, заменяются пустым словарём.
+
+    Args:
+        rules_set: проверенный набор правил
+
+    Returns:
+        Нормализованный набор правил
+    """
+    return {
+        'policy': rules_set['policy'],
+        'patterns': [
+            [reg_exp, pattern_opts, action_id, action_params[0] if action_params else {}]
+            for reg_exp, pattern_opts, action_id, *action_params in rules_set['patterns']
+        ]
+    }
+
+
+def get_rules_set_format() -> str:
+    """ Возвращает отпечаток формата подготовленного набора правил
+
+    Схема и нормализация набора правил описаны в этом модуле, поэтому отпечаток - хэш его кода. Он входит в ключ кэша
+    подготовленных наборов правил (`utils.rules_cache.RulesSetCache`): изменение схемы или нормализации без смены
+    версии приложения тоже приводит к промаху.
+
+    Returns:
+        Отпечаток в шестнадцатеричном виде
+    """
+    with open(__file__, 'rb') as m_file:
+        return hashlib.sha256(m_file.read()).hexdigest()
+
+
+class AbstractRulesProvider:
+    """ Базовый абстрактный класс, описывающий поставщика наборов правил
+
+    Все классы, описывающие поставщиков, должны наследовать этому классу или его потомкам.
+    """
+
+    def __init__(self, cache=None):
+        """
+
+        Args:
+            cache: кэш подготовленных наборов правил (`utils.rules_cache.RulesSetCache`) или None, если кэш не
+                используется
+        """
+        self._cache = cache
+
+    def get_rules(self, rules_set_id: str) -> dict:
+        """ Возвращает проверенный и нормализованный набор правил
+
+        Args:
+            rules_set_id: идентификатор набора правил (например, путь к файлу)
+
+        Returns:
+            Набор правил
+        """
+        raise NotImplementedError
@@ -1,24 +1,38 @@
 import os
 import json
 import logging
-import pprint
 
-from rules_provider import validate_rules_set
+from rules_provider import AbstractRulesProvider, validate_rules_set, normalize_rules_set
 
 
-class JsonRulesProvider:
+class JsonRulesProvider(AbstractRulesProvider):
 
     def get_rules(self, rules_set_path: str) -> dict:
         rules_set_path = os.path.abspath(rules_set_path)
         logging.info('Loading rules set: {}...'.format(rules_set_path))
         try:
-            with open(rules_set_path) as rs_file:
-                rules_set = json.load(rs_file)
+            with open(rules_set_path, 'rb') as rs_file:
+                content = rs_file.read()
         except FileNotFoundError:
             raise FileNotFoundError('Rules set files doesn\'t exist: {}'.format(rules_set_path))
+
+        cache_key = None
+        if self._cache is not None:
+            cache_key = self._cache.get_key(content)
+            rules_set = self._cache.get(cache_key)
+            if rules_set is not None:
+                logging.debug('Using cached rules set')
+                return rules_set
+
+        try:
+            rules_set = json.loads(content.decode('utf-8'))
         except ValueError as e:
             raise ValueError('Rules set file {} is not a valid JSON document: {}'.format(rules_set_path, str(e)))
-        logging.debug('Validating rules set...')
-        logging.debug('Loaded rules set:\r\n{}'.format(pprint.pformat(rules_set)))
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            import pprint
+            logging.debug('Loaded rules set:\r\n{}'.format(pprint.pformat(rules_set)))
         validate_rules_set(rules_set)
+        rules_set = normalize_rules_set(rules_set)
+        if self._cache is not None:
+            self._cache.put(cache_key, rules_set)
         return rules_set
@@ -0,0 +1,107 @@
+""" Синтетические файлы MP4, MPEG-TS и MXF, содержащие только заголовки (без настоящих данных)
+
+"""
+
+import struct
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def _full_box(box_type: bytes, payload: bytes) -> bytes:
+    return _box(box_type, b'\x00\x00\x00\x00' + payload)
+
+
+def build_mp4(path: str, tracks: list, duration: float, mdat_size: int, moov_first: bool = True) -> None:
+    """ Создаёт MP4
+
+    Args:
+        path: путь к файлу
+        tracks: список пар (тип обработчика, код кодека), например - `(b'vide', b'avc1')`
+        duration: длительность в секундах
+        mdat_size: размер данных
+        moov_first: помещать ли `moov` перед `mdat`
+    """
+    traks = b''
+    for handler, fourcc in tracks:
+        if handler == b'vide':
+            entry = _box(fourcc, bytes(6) + struct.pack('>H', 1) + bytes(16) + struct.pack('>HH', 1920, 1080) +
+                         bytes(50))
+        else:
+            entry = _box(fourcc, bytes(6) + struct.pack('>H', 1) + bytes(8) + struct.pack('>HHHHI', 2, 16, 0, 0,
+                                                                                           48000 << 16))
+        traks += _box(b'trak', _full_box(b'tkhd', bytes(80)) + _box(b'mdia', (
+            _full_box(b'mdhd', bytes(20)) +
+            _full_box(b'hdlr', bytes(4) + handler + bytes(13)) +
+            _box(b'minf', _box(b'stbl', _full_box(b'stsd', struct.pack('>I', 1) + entry)))
+        )))
+    moov = _box(b'moov', _full_box(b'mvhd', struct.pack('>IIII', 0, 0, 1000, int(duration * 1000)) + bytes(80)) +
+                traks)
+    mdat = _box(b'mdat', bytes(mdat_size))
+    with open(path, 'wb') as f:
+        f.write(_box(b'ftyp', b'isom\x00\x00\x02\x00isomiso2avc1mp41'))
+        f.write(moov + mdat if moov_first else mdat + moov)
+
+
+def _ts_packet(pid: int, payload: bytes = b'', pusi: bool = False, pcr: int = None) -> bytes:
+    header = struct.pack('>BH', 0x47, (0x4000 if pusi else 0) | pid)
+    if pcr is None:
+        return header + b'\x10' + (payload + b'\xff' * 184)[:184]
+    base, ext = divmod(pcr, 300)
+    adaptation = bytes([7, 0x10]) + struct.pack('>IH', base >> 1, ((base & 1) << 15) | 0x7E00 | ext)
+    return header + b'\x30' + adaptation + (payload + b'\xff' * 184)[:184 - len(adaptation)]
+
+
+def _ts_section(table_id: int, body: bytes) -> bytes:
+    return b'\x00' + struct.pack('>BH', table_id, 0xB000 | (len(body) + 4)) + body + bytes(4)
+
+
+def build_ts(path: str, streams: list, duration: float, packets: int, m2ts: bool = False) -> None:
+    """ Создаёт MPEG-TS
+
+    Args:
+        path: путь к файлу
+        streams: список пар (stream_type, дескрипторы)
+        duration: длительность в секундах (по PCR)
+        packets: количество пакетов
+        m2ts: создавать ли M2TS (192-байтовые пакеты)
+    """
+    pat = _ts_section(0x00, struct.pack('>HBBBHH', 1, 0xC1, 0, 0, 1, 0xE000 | 0x100))
+    es = b''.join([struct.pack('>BHH', stream_type, 0xE000 | (0x1011 + n), 0xF000 | len(descriptors)) + descriptors
+                   for n, (stream_type, descriptors) in enumerate(streams)])
+    pmt = _ts_section(0x02, struct.pack('>HBBBHH', 1, 0xC1, 0, 0, 0xE000 | 0x1011, 0xF000) + es)
+    data = [_ts_packet(0, pat, True), _ts_packet(0x100, pmt, True), _ts_packet(0x1011, pcr=27000000)]
+    data.extend([_ts_packet(0x1011)] * (packets - 4))
+    data.append(_ts_packet(0x1011, pcr=27000000 + int(duration * 27000000)))
+    with open(path, 'wb') as f:
+        for packet in data:
+            f.write((b'\x00' * 4 + packet) if m2ts else packet)
+
+
+_MXF_SET_KEY = b'\x06\x0e\x2b\x34\x02\x53\x01\x01\x0d\x01\x01\x01\x01\x01'
+
+
+def _klv(key: bytes, value: bytes) -> bytes:
+    return key + b'\x83' + len(value).to_bytes(3, 'big') + value
+
+
+def build_mxf(path: str, sets: list, op1a: bool = True, closed: bool = True) -> None:
+    """ Создаёт MXF
+
+    Args:
+        path: путь к файлу
+        sets: список пар (код набора метаданных, словарь локальных тегов и их значений)
+        op1a: использовать ли шаблон OP1a (иначе - OPAtom)
+        closed: закрыт ли и завершён заголовочный раздел
+    """
+    metadata = b''.join([
+        _klv(_MXF_SET_KEY + bytes([code, 0]),
+             b''.join([struct.pack('>HH', tag, len(value)) + value for tag, value in tags.items()]))
+        for code, tags in sets
+    ])
+    op = b'\x06\x0e\x2b\x34\x04\x01\x01\x01\x0d\x01\x02\x01' + (b'\x01\x01\x09\x00' if op1a else b'\x10\x00\x00\x00')
+    partition = struct.pack('>HHIQQQQQIQI', 1, 3, 1, 0, 0, 0, len(metadata), 0, 0, 0, 1) + op + struct.pack('>II', 0, 16)
+    key = b'\x06\x0e\x2b\x34\x02\x05\x01\x01\x0d\x01\x02\x01\x01\x02' + (b'\x04' if closed else b'\x01') + b'\x00'
+    with open(path, 'wb') as f:
+        f.write(_klv(key, partition) + metadata + bytes(4096))
@@ -0,0 +1,94 @@
+import hashlib
+import lzma
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from action import compress
+from action.compress import CompressAction, is_compressed
+
+
+class TestCompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.out_dir = self._path('out')
+        self.data = ''.join(['line {}: some repetitive log text\n'.format(n) for n in range(10000)]).encode('ascii')
+        self.in_path = self._create('a.log', self.data)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _path(self, *names) -> str:
+        return os.path.join(self.tmp_dir.name, *names)
+
+    def _create(self, name: str, data: bytes) -> str:
+        path = self._path(name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _read(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_is_compressed(self):
+        self.assertTrue(is_compressed(self._create('a.MXF', b'')))
+        self.assertTrue(is_compressed(self._create('a.bin', b'PK\x03\x04rest')))
+        self.assertTrue(is_compressed(self._create('b.bin', b'\x00\x00\x00\x18ftypmp42')))
+        self.assertFalse(is_compressed(self.in_path))
+        self.assertFalse(is_compressed(self._create('c.bin', b'')))
+
+    def _check_checksums(self, out_path: str, lines: list) -> None:
+        with open(out_path + '.sha256', 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), ''.join(['{} *{}\n'.format(hashlib.sha256(d).hexdigest(), n) for n, d in lines]))
+
+    def test_xz(self):
+        CompressAction().run(self.in_path, {'codec': 'xz', 'level': 1}, self.out_dir, False)
+        out_path = os.path.join(self.out_dir, 'a.log.xz')
+        compressed = self._read(out_path)
+        self.assertLess(len(compressed), len(self.data))
+        self.assertEqual(lzma.decompress(compressed), self.data)
+        self._check_checksums(out_path, [('a.log', self.data), ('a.log.xz', compressed)])
+
+    def test_zstd(self):
+        if compress.zstandard is None:
+            self.skipTest('zstandard module is not installed')
+        CompressAction().run(self.in_path, {}, self.out_dir, False)
+        out_path = os.path.join(self.out_dir, 'a.log.zst')
+        compressed = self._read(out_path)
+        self.assertEqual(compress.zstandard.ZstdDecompressor().decompressobj().decompress(compressed), self.data)
+        self._check_checksums(out_path, [('a.log', self.data), ('a.log.zst', compressed)])
+
+    def test_zstd_fallback(self):
+        with mock.patch('action.compress.zstandard', None):
+            CompressAction().run(self.in_path, {'codec': 'zstd', 'checksum': False}, self.out_dir, False)
+        self.assertEqual(os.listdir(self.out_dir), ['a.log.xz'])
+        self.assertEqual(lzma.decompress(self._read(os.path.join(self.out_dir, 'a.log.xz'))), self.data)
+
+    def test_skip_compressed(self):
+        data = b'\xff\xd8\xff\xe0' + os.urandom(1000)
+        in_path = self._create('a.jpg', data)
+        action = CompressAction()
+        action.run(in_path, {'codec': 'xz'}, self.out_dir, False)
+        out_path = os.path.join(self.out_dir, 'a.jpg')
+        self.assertEqual(self._read(out_path), data)
+        self._check_checksums(out_path, [('a.jpg', data)])
+        self.assertEqual(action.get_output_paths(in_path, {}, self.out_dir), [out_path, out_path + '.sha256'])
+        action.run(in_path, {'codec': 'xz', 'skip_compressed': False}, self.out_dir, False)
+        self.assertEqual(lzma.decompress(self._read(out_path + '.xz')), data)
+
+    def test_exists(self):
+        action = CompressAction()
+        os.mkdir(self.out_dir)
+        sidecar = self._create(os.path.join('out', 'a.log.xz.sha256'), b'old')
+        with self.assertRaises(FileExistsError):
+            action.run(self.in_path, {'codec': 'xz'}, self.out_dir, False)
+        self.assertEqual(self._read(sidecar), b'old')
+        self.assertEqual(os.listdir(self.out_dir), ['a.log.xz.sha256'])
+        os.remove(sidecar)
+        action.run(self.in_path, {'codec': 'xz'}, self.out_dir, False)
+        with self.assertRaises(FileExistsError):
+            action.run(self.in_path, {'codec': 'xz'}, self.out_dir, False)
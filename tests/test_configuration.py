@@ -79,3 +79,13 @@ class TestConfiguration(unittest.TestCase):
                 BASE_DIR, args_parser.parse_args(['-c', os.path.join('conf_files', 'dummy_file'), 'version']), conf
             )
 
+
+    def test_transcode_cache(self):
+        conf = copy.copy(self.DUMMY_CONF)
+        conf['cache_dir'] = os.path.join(BASE_DIR, 'conf_files', 'nonexistentdir')
+        conf['transcode_cache'] = {'mode': 'copy', 'max_size': 1024}
+        app = Application(
+            BASE_DIR, args_parser.parse_args(['-c', os.path.join('conf_files', 'dummy_file'), 'version']), conf
+        )
+        with self.assertRaises(ConfigurationException):
+            app._init_transcode_cache()
@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+
+from tests import media_fixtures
+from utils import container_header
+from utils.container_header import probe_header
+from utils.meta_filter import evaluate
+
+
+class TestContainerHeader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_mp4(self):
+        for moov_first in (True, False):
+            path = self._path('a.mp4')
+            media_fixtures.build_mp4(path, [(b'vide', b'avc1'), (b'soun', b'mp4a'), (b'soun', b'mp4a')], 10, 25000000,
+                                     moov_first)
+            metadata, tolerances = probe_header(path)
+            self.assertEqual([s['codec_type'] for s in metadata['streams']], ['video', 'audio', 'audio'])
+            self.assertEqual(metadata['streams'][0]['codec_name'], 'h264')
+            self.assertEqual((metadata['streams'][0]['width'], metadata['streams'][0]['height']), (1920, 1080))
+            self.assertEqual(metadata['format']['duration'], '10.000000')
+            self.assertEqual(metadata['format']['bit_rate'], str(os.path.getsize(path) * 8 // 10))
+
+    def test_ts(self):
+        path = self._path('a.ts')
+        media_fixtures.build_ts(path, [(0x1B, b''), (0x81, b''), (0x06, b'\x6a\x00')], 5, 1000)
+        metadata, tolerances = probe_header(path)
+        self.assertEqual([s['codec_type'] for s in metadata['streams']], ['video', 'audio', 'audio'])
+        self.assertEqual(metadata['format']['duration'], '5.000000')
+        self.assertEqual(metadata['format']['bit_rate'], str(int(os.path.getsize(path) * 8 / 5)))
+
+    def test_m2ts(self):
+        path = self._path('a.m2ts')
+        media_fixtures.build_ts(path, [(0x1B, b''), (0x80, b''), (0x90, b'')], 5, 1000, m2ts=True)
+        metadata, tolerances = probe_header(path)
+        self.assertEqual([s.get('codec_name') for s in metadata['streams']],
+                         ['h264', 'pcm_bluray', 'hdmv_pgs_subtitle'])
+        self.assertEqual(metadata['format']['duration'], '5.000000')
+
+    def test_ts_unknown_stream(self):
+        path = self._path('a.ts')
+        media_fixtures.build_ts(path, [(0x1B, b''), (0x06, b'')], 5, 100)
+        self.assertIsNone(probe_header(path))
+
+    def test_ts_long_section(self):
+        # PMT с 40 потоками не помещается в один пакет
+        path = self._path('a.ts')
+        media_fixtures.build_ts(path, [(0x1B, b'')] * 40, 5, 100)
+        self.assertIsNone(probe_header(path))
+        with open(path, 'rb') as f:
+            data = f.read()
+        with self.assertRaises(container_header._UnsupportedException):
+            container_header._get_ts_section(data, True, 188 + 4, 188 * 2)
+
+    def test_mxf(self):
+        path = self._path('a.mxf')
+        audio = {0x3D03: struct.pack('>ii', 48000, 1), 0x3D07: struct.pack('>I', 1)}
+        media_fixtures.build_mxf(path, [(0x2F, {}), (0x44, {}), (0x51, {}), (0x47, audio), (0x47, audio),
+                                        (0x5C, {})])
+        metadata, tolerances = probe_header(path)
+        self.assertEqual([s['codec_type'] for s in metadata['streams']], ['video', 'audio', 'audio', 'data'])
+        self.assertEqual((metadata['streams'][1]['sample_rate'], metadata['streams'][1]['channels']), ('48000', 1))
+        self.assertNotIn('duration', metadata['format'])
+        media_fixtures.build_mxf(path, [(0x51, {})], op1a=False)
+        self.assertIsNone(probe_header(path))
+        media_fixtures.build_mxf(path, [(0x51, {})], closed=False)
+        self.assertIsNone(probe_header(path))
+
+    def test_unknown(self):
+        path = self._path('a.bin')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(4096))
+        self.assertIsNone(probe_header(path))
+        open(path, 'wb').close()
+        self.assertIsNone(probe_header(path))
+
+
+class TestMetaFilter(unittest.TestCase):
+
+    METADATA = {
+        'format': {'bit_rate': '25000000', 'duration': '10.000000'},
+        'streams': [{'codec_type': 'video', 'width': 1920}, {'codec_type': 'audio'}, {'codec_type': 'audio'}],
+    }
+
+    def test_evaluate(self):
+        self.assertTrue(evaluate({'count:v': 1, 'count:a': [['gte', 2], ['lte', 4]]}, self.METADATA))
+        self.assertFalse(evaluate({'count:a': 1, 'stream:v:0': {'field_mode': 1}}, self.METADATA))
+        self.assertIsNone(evaluate({'count:v': 1, 'stream:v:0': {'field_mode': 1}}, self.METADATA))
+        self.assertTrue(evaluate({'format': {'bit_rate': ['gte', 20000000]}}, self.METADATA))
+        self.assertTrue(evaluate({'stream:v:0': {'width': ['in', [1280, 1920]]}}, self.METADATA))
+        self.assertFalse(evaluate({'stream:v:1': {'width': 1920}}, self.METADATA))
+        self.assertIsNone(evaluate({'unknown': 1}, self.METADATA))
+
+    def test_tolerance(self):
+        tolerances = {'format.bit_rate': 0.01}
+        self.assertIsNone(evaluate({'format': {'bit_rate': ['gte', 25100000]}}, self.METADATA, tolerances))
+        self.assertFalse(evaluate({'format': {'bit_rate': ['gte', 26000000]}}, self.METADATA, tolerances))
+
+
+@unittest.skipIf(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None, 'ffmpeg is not available')
+class TestContainerHeaderConformance(unittest.TestCase):
+    """ Сравнение с выводом ffprobe на файлах, созданных ffmpeg
+
+    """
+
+    SAMPLES = {
+        'a.mp4': ['-c:v', 'libx264', '-c:a', 'aac'],
+        'a.mov': ['-c:v', 'libx264', '-c:a', 'pcm_s16le'],
+        'a.ts': ['-c:v', 'mpeg2video', '-c:a', 'mp2'],
+        'a.m2ts': ['-c:v', 'libx264', '-c:a', 'ac3', '-mpegts_m2ts_mode', '1'],
+        'a.mxf': ['-c:v', 'mpeg2video', '-s', '1920x1080', '-r', '25', '-b:v', '50M', '-c:a', 'pcm_s16le', '-ar',
+                  '48000'],
+    }
+
+    def test_conformance(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, params in self.SAMPLES.items():
+                with self.subTest(name=name):
+                    path = os.path.join(tmp_dir, name)
+                    subprocess.run(
+                        ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=duration=5:size=1920x1080:rate=25',
+                         '-f', 'lavfi', '-i', 'sine=duration=5:sample_rate=48000', '-shortest'] + params + [path],
+                        check=True
+                    )
+                    expected = json.loads(subprocess.run(
+                        ['ffprobe', '-v', 'error', '-of', 'json', '-show_format', '-show_streams', path],
+                        check=True, stdout=subprocess.PIPE
+                    ).stdout.decode('utf-8'))
+                    header = probe_header(path)
+                    self.assertIsNotNone(header)
+                    metadata, tolerances = header
+                    self.assertEqual([s['codec_type'] for s in metadata['streams']],
+                                     [s['codec_type'] for s in expected['streams']])
+                    for s, e in zip(metadata['streams'], expected['streams']):
+                        for k, v in s.items():
+                            if k != 'index':
+                                self.assertEqual(v, e.get(k), k)
+                    for k in ('duration', 'bit_rate'):
+                        if k in metadata['format']:
+                            self.assertAlmostEqual(
+                                float(metadata['format'][k]), float(expected['format'][k]),
+                                delta=float(expected['format'][k]) * tolerances['format.{}'.format(k)]
+                            )
@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from utils import dedup, fingerprint
+
+
+class TestDedupIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data = os.urandom(300000)
+        self.in_dir = self._path('in')
+        os.mkdir(self.in_dir)
+        fingerprint._last_fingerprint = None
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _path(self, *names) -> str:
+        return os.path.join(self.tmp_dir.name, *names)
+
+    def _create(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.in_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _get_index(self, mode: str) -> dedup.DedupIndex:
+        index = dedup.DedupIndex(self._path('cache', 'dedup.sqlite3'), mode)
+        self.addCleanup(index.close)
+        return index
+
+    def _process(self, index: dedup.DedupIndex, in_path: str, out_dir: str) -> str:
+        """ Имитирует действие copy с дедупликацией
+
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        out_path = os.path.join(out_dir, os.path.basename(in_path))
+        if not index.reuse(in_path, 'copy', [out_path], False):
+            with open(in_path, 'rb') as s_file, open(out_path, 'wb') as d_file:
+                d_file.write(s_file.read())
+            index.record(in_path, 'copy', [out_path])
+        return out_path
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            dedup.DedupIndex(self._path('dedup.sqlite3'), 'symlink')
+
+    def test_find(self):
+        index = self._get_index('link')
+        a = self._create('a.bin', self.data)
+        b = self._create('b.bin', self.data)
+        c = self._create('c.bin', self.data[:-1] + bytes([self.data[-1] ^ 1]))
+        self.assertIsNone(index.find(a, 'copy'))
+        out_path = self._process(index, a, self._path('out1'))
+        self.assertEqual(index.find(b, 'copy'), [out_path])
+        self.assertIsNone(index.find(b, 'ffmpeg.convert'))
+        # совпадают размер и фрагменты, но не полный хэш
+        self.assertIsNone(index.find(c, 'copy'))
+        os.remove(out_path)
+        self.assertIsNone(index.find(b, 'copy'))
+
+    def test_changed_source(self):
+        index = self._get_index('link')
+        a = self._create('a.bin', self.data)
+        self._process(index, a, self._path('out1'))
+        # байт вне фрагментов: дешёвые отпечатки совпадают, а полный хэш кандидата не сохранён
+        changed = bytearray(self.data)
+        changed[100000] ^= 1
+        b = self._create('b.bin', changed)
+        # источник кандидата переписан тем же содержимым, что и у b, - но выходные файлы получены из старого
+        self._create('a.bin', changed)
+        os.utime(a, (time.time() + 10, time.time() + 10))
+        self.assertIsNone(index.find(b, 'copy'))
+
+    def test_reuse_link(self):
+        index = self._get_index('link')
+        a = self._create('a.bin', self.data)
+        b = self._create('b.bin', self.data)
+        self._process(index, a, self._path('out1'))
+        out_path = self._process(index, b, self._path('out2'))
+        with open(out_path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(os.path.exists(self._path('out2', dedup.MANIFEST_FILENAME)))
+        self.assertEqual(index.find(b, 'copy'), [self._path('out1', 'a.bin')])
+        self.assertEqual(len(index._db.execute('SELECT * FROM processed').fetchall()), 2)
+
+    def test_reuse_manifest(self):
+        index = self._get_index('manifest')
+        a = self._create('a.bin', self.data)
+        b = self._create('b.bin', self.data)
+        first = self._process(index, a, self._path('out1'))
+        for n in range(2):
+            out_path = self._process(index, b, self._path('out2'))
+            self.assertFalse(os.path.exists(out_path))
+        with open(self._path('out2', dedup.MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+            entries = [json.loads(l) for l in f]
+        self.assertEqual(entries, [{'name': 'b.bin', 'ref': first, 'input': b}])
+        self.assertEqual(len(index._db.execute('SELECT * FROM processed').fetchall()), 1)
+
+    def test_simulate(self):
+        index = self._get_index('link')
+        a = self._create('a.bin', self.data)
+        b = self._create('b.bin', self.data)
+        self._process(index, a, self._path('out1'))
+        out_path = self._path('out1', 'b.bin')
+        self.assertTrue(index.reuse(b, 'copy', [out_path], True))
+        self.assertFalse(os.path.exists(out_path))
@@ -0,0 +1,111 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from collections import namedtuple
+
+from unittest import mock
+
+from utils import probe, thread_tuning
+
+Profile = namedtuple('Profile', ['inputs', 'outputs'])
+
+FAST_METADATA = {
+    'format': {'duration': '10.0', 'bit_rate': '20000000'},
+    'streams': [{'codec_type': 'video', 'codec_name': 'h264', 'width': 1920}],
+}
+DEEP_METADATA = {
+    'format': {'duration': '10.0', 'bit_rate': '20000000'},
+    'streams': [{'codec_type': 'video', 'codec_name': 'h264', 'width': 1920, 'field_mode': 0}],
+}
+
+
+@unittest.skipIf(importlib.util.find_spec('pyffwrapper.factory') is None, 'pyffwrapper is not available')
+class TestFfmpegConvertAction(unittest.TestCase):
+
+    def setUp(self):
+        from action.ffmpeg import convert
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.in_path = os.path.join(self.tmp_dir.name, 'a.mxf')
+        open(self.in_path, 'wb').close()
+        self.out_dir = os.path.join(self.tmp_dir.name, 'out')
+        self.prober = probe.MetadataProber('ffprobe')
+        self.tuner = mock.Mock()
+        self.tuner.suggest.return_value = 4
+        self.tuner.estimate.return_value = 100.0
+        patchers = [
+            mock.patch.object(convert, 'factory'),
+            mock.patch.object(convert, 'profile_loader'),
+            mock.patch.object(probe, 'metadata_prober', self.prober),
+            mock.patch.object(self.prober, 'get_fast', return_value=FAST_METADATA),
+            mock.patch.object(thread_tuning, 'thread_tuner', self.tuner),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+        self.get_profile = convert.profile_loader.profile_loader.get_profile
+        self.get_profile.return_value = Profile([{'parameters': ''}], [{'parameters': '-c copy', 'filename': 'a.mp4'}])
+        self.action = convert.FfmpegConvertAction()
+        self.collector = self.action._ffprobe_meta_collector
+        self.collector.get_metadata.return_value = DEEP_METADATA
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, action_params: dict) -> dict:
+        self.action.run(self.in_path, dict(action_params, profile='p'), self.out_dir, False)
+        self.action._ffmpeg_convert.exec.assert_called_once_with(
+            [('', self.in_path)], [('-c copy', os.path.join(self.out_dir, 'a.mp4'))], False)
+        return self.get_profile.call_args[1]['context']
+
+    def test_remux(self):
+        context = self._run({'remux_if': {'stream:v:0': {'codec_name': 'h264'}}})
+        self.assertIs(context['remux'], True)
+        self.assertEqual(context['input'], DEEP_METADATA)
+        # копирование потоков не занимает долю процессоров
+        self.tuner.start_job.assert_not_called()
+        self.tuner.record.assert_not_called()
+        self.tuner.estimate.assert_called_once_with('p', 4, 10.0)
+        self.assertEqual(self.action._remux_count, 1)
+        self.assertGreater(self.action._remux_saved_time, 0)
+
+    def test_transcode(self):
+        context = self._run({'remux_if': {'stream:v:0': {'codec_name': 'hevc'}}})
+        self.assertIs(context['remux'], False)
+        self.tuner.start_job.assert_called_once_with()
+        self.tuner.finish_job.assert_called_once_with(self.tuner.start_job.return_value)
+        self.assertEqual(self.action._remux_count, 0)
+
+    def test_fast_to_deep(self):
+        context = self._run({'probe': 'fast', 'remux_if': {'stream:v:0': {'field_mode': 0}}})
+        self.assertIs(context['remux'], True)
+        # профиль отрисован по быстрым метаданным, полный анализ понадобился только для проверки условий
+        self.assertEqual(context['input'], FAST_METADATA)
+        self.collector.get_metadata.assert_called_once_with(self.in_path)
+        self.tuner.start_job.assert_not_called()
+
+    def test_fast_is_enough(self):
+        context = self._run({'probe': 'fast', 'remux_if': {'stream:v:0': {'codec_name': 'h264'}}})
+        self.assertIs(context['remux'], True)
+        self.collector.get_metadata.assert_not_called()
+
+    def test_undecidable(self):
+        context = self._run({'probe': 'fast', 'remux_if': {'stream:v:0': {'pix_fmt': 'yuv420p'}}})
+        self.assertIs(context['remux'], False)
+        self.collector.get_metadata.assert_called_once_with(self.in_path)
+        self.tuner.start_job.assert_called_once_with()
+        self.assertEqual(self.action._remux_count, 0)
+
+    def test_read_rate(self):
+        from action.ffmpeg import convert
+
+        shaper = mock.Mock()
+        with mock.patch.object(convert.io_shaping, 'io_shaper', shaper):
+            shaper.get_rate.return_value = 1250000
+            self.assertEqual(convert.FfmpegConvertAction._get_input_params('-re', self.in_path, FAST_METADATA),
+                             '-readrate 0.5 -re')
+            # ограничение много меньше битрейта файла не должно превращаться в нулевой (неограниченный) множитель
+            shaper.get_rate.return_value = 10
+            self.assertEqual(convert.FfmpegConvertAction._get_input_params([], self.in_path, FAST_METADATA),
+                             ['-readrate', '0.001'])
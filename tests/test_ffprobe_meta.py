@@ -0,0 +1,55 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from utils import probe
+
+DEEP_METADATA = {
+    'format': {'bit_rate': '50000000'},
+    'streams': [{'codec_type': 'video', 'width': 1920, 'field_mode': 1}],
+}
+
+
+@unittest.skipIf(importlib.util.find_spec('pyffwrapper.factory') is None, 'pyffwrapper is not available')
+class TestFfprobeMetaPatternFilter(unittest.TestCase):
+
+    def setUp(self):
+        from pattern_filter.ffprobe import meta
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'a.mxf')
+        open(self.path, 'wb').close()
+        self.prober = probe.MetadataProber('ffprobe')
+        patchers = [
+            mock.patch.object(meta, 'factory'),
+            mock.patch.object(probe, 'metadata_prober', self.prober),
+            mock.patch.object(self.prober, 'get_header', return_value=None),
+            mock.patch.object(self.prober, 'get_fast', return_value=None),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+        self.filter = meta.FfprobeMetaPatternFilter()
+        self.collector = self.filter._ff_meta_collector
+        self.collector.get_metadata.return_value = DEEP_METADATA
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_deep_probe_is_shared(self):
+        self.assertTrue(self.filter.filter(self.path, {'stream:v:0': {'field_mode': 1}}))
+        self.assertFalse(self.filter.filter(self.path, {'stream:v:0': {'field_mode': 0}}))
+        self.filter._ff_meta_filter.filter.assert_not_called()
+        self.collector.get_metadata.assert_called_once_with(self.path)
+        # ffmpeg.convert получает те же метаданные без повторного анализа
+        other_collect = mock.Mock()
+        self.assertEqual(self.prober.get_deep(self.path, other_collect), DEEP_METADATA)
+        other_collect.assert_not_called()
+
+    def test_undecidable(self):
+        self.filter._ff_meta_filter.filter.return_value = True
+        self.assertTrue(self.filter.filter(self.path, {'stream:v:0': {'pix_fmt': 'yuv422p'}}))
+        self.filter._ff_meta_filter.filter.assert_called_once_with(self.path, {'stream:v:0': {'pix_fmt': 'yuv422p'}})
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from utils import file_link
+
+
+class TestFileLink(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp_dir.name, 'src.bin')
+        self.dst = os.path.join(self.tmp_dir.name, 'dst.bin')
+        with open(self.src, 'wb') as f:
+            f.write(b'data')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read_dst(self) -> bytes:
+        with open(self.dst, 'rb') as f:
+            return f.read()
+
+    def test_fallbacks(self):
+        with mock.patch('utils.file_link.reflink', side_effect=OSError('not supported')):
+            self.assertEqual(file_link.materialize(self.src, self.dst), 'hardlink')
+            self.assertTrue(os.path.samefile(self.src, self.dst))
+            os.remove(self.dst)
+            with mock.patch('os.link', side_effect=OSError('cross-device link')):
+                self.assertEqual(file_link.materialize(self.src, self.dst), 'copy')
+                self.assertFalse(os.path.samefile(self.src, self.dst))
+                self.assertEqual(self._read_dst(), b'data')
+
+    def test_reflink(self):
+        try:
+            method = file_link.materialize(self.src, self.dst)
+        except OSError as e:
+            self.skipTest(str(e))
+        self.assertIn(method, file_link.DEFAULT_METHODS)
+        self.assertEqual(self._read_dst(), b'data')
+
+    def test_failure(self):
+        with mock.patch('utils.file_link.reflink', side_effect=OSError('not supported')):
+            with self.assertRaises(OSError):
+                file_link.materialize(os.path.join(self.tmp_dir.name, 'missing.bin'), self.dst)
+        self.assertFalse(os.path.exists(self.dst))
+
+    def test_exists(self):
+        open(self.dst, 'w').close()
+        with self.assertRaises(FileExistsError):
+            file_link.materialize(self.src, self.dst)
+        self.assertEqual(self._read_dst(), b'')
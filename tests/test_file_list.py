@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from utils.file_list import build_file_list, build_file_lists
+from utils.regex_prefix import get_dir_filter
+
+
+class TestFileList(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _create_tree(self, root: str) -> None:
+        for d in ['a', os.path.join('a', 'b'), os.path.join('a', 'b', 'c'), 'd', os.path.join('d', 'e'), 'f']:
+            os.makedirs(os.path.join(root, d))
+            for n in range(3):
+                open(os.path.join(root, d, '{}.mxf'.format(n)), 'w').close()
+        open(os.path.join(root, 'g.xml'), 'w').close()
+
+    def test_parallel_order(self):
+        roots = [os.path.join(self.tmp_dir.name, r) for r in ('card1', 'card2')]
+        for root in roots:
+            self._create_tree(root)
+        expected = build_file_lists(roots)
+        self.assertEqual(expected[0][1], 19)
+        self.assertEqual(build_file_lists(roots, workers=4), expected)
+
+    def test_parallel_prune(self):
+        self._create_tree(self.tmp_dir.name)
+        dir_filter = get_dir_filter([r'^a.*\.mxf$', r'^d.*\.mxf$'])
+        expected = build_file_list(self.tmp_dir.name, dir_filter)
+        self.assertEqual(build_file_list(self.tmp_dir.name, dir_filter, 4), expected)
+        self.assertNotIn('f', [d['rel_in_dir'] for d in expected[0]])
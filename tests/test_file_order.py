@@ -0,0 +1,38 @@
+import unittest
+
+from file_order import AbstractFileOrder, get_file_order_class
+
+
+class ReversedNameFileOrder(AbstractFileOrder):
+
+    def get_key(self, abs_path: str) -> tuple:
+        return tuple(-ord(c) for c in abs_path[-1])
+
+
+class TestFileOrder(unittest.TestCase):
+
+    DIR_LIST = [
+        {'rel_in_dir': 'a', 'files': ['1', '3']},
+        {'rel_in_dir': 'b', 'files': ['2', '4']},
+    ]
+
+    def test_walk(self):
+        self.assertIs(get_file_order_class('walk')().order('/', self.DIR_LIST, False), self.DIR_LIST)
+
+    def test_interleaved(self):
+        self.assertEqual(ReversedNameFileOrder().order('/', self.DIR_LIST, False), [
+            {'rel_in_dir': 'b', 'files': ['4']},
+            {'rel_in_dir': 'a', 'files': ['3']},
+            {'rel_in_dir': 'b', 'files': ['2']},
+            {'rel_in_dir': 'a', 'files': ['1']},
+        ])
+
+    def test_grouped(self):
+        self.assertEqual(ReversedNameFileOrder().order('/', self.DIR_LIST, True), [
+            {'rel_in_dir': 'b', 'files': ['4', '2']},
+            {'rel_in_dir': 'a', 'files': ['3', '1']},
+        ])
+
+    def test_missing_files(self):
+        dir_list = get_file_order_class('extent')().order('/nonexistent', self.DIR_LIST, False)
+        self.assertEqual(sorted([f for d in dir_list for f in d['files']]), ['1', '2', '3', '4'])
@@ -0,0 +1,56 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from utils import fingerprint
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _create(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_full_hash(self):
+        for size in (0, 100, fingerprint.READ_SIZE * 2 + 1):
+            data = os.urandom(size)
+            self.assertEqual(fingerprint.get_full_hash(self._create('a.bin', data)), hashlib.sha256(data).hexdigest())
+
+    def test_small_file(self):
+        data = os.urandom(fingerprint.SAMPLE_SIZE * fingerprint.SAMPLE_COUNT)
+        fp = fingerprint.Fingerprint(self._create('a.bin', data))
+        self.assertEqual(fp.size, len(data))
+        self.assertEqual(fp.known_full_hash, hashlib.sha256(data).hexdigest())
+        self.assertEqual(fp.sample_hash, fp.known_full_hash)
+
+    def test_large_file(self):
+        data = bytearray(os.urandom(fingerprint.SAMPLE_SIZE * 5))
+        path = self._create('a.bin', data)
+        fp = fingerprint.Fingerprint(path)
+        self.assertIsNone(fp.known_full_hash)
+        self.assertEqual(fp.full_hash, hashlib.sha256(data).hexdigest())
+        self.assertEqual(fp.known_full_hash, fp.full_hash)
+        # изменение вне фрагментов меняет только полный хэш
+        data[fingerprint.SAMPLE_SIZE + 10] ^= 1
+        other = fingerprint.Fingerprint(self._create('b.bin', data))
+        self.assertEqual(other.sample_hash, fp.sample_hash)
+        self.assertNotEqual(other.full_hash, fp.full_hash)
+
+    def test_get_fingerprint(self):
+        path = self._create('a.bin', b'first')
+        fp = fingerprint.get_fingerprint(path)
+        self.assertIs(fingerprint.get_fingerprint(path), fp)
+        # тот же размер, но файл переписан - запомненный отпечаток использовать нельзя
+        with open(path, 'wb') as f:
+            f.write(b'other')
+        os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime + 10))
+        self.assertEqual(fingerprint.get_fingerprint(path).full_hash, hashlib.sha256(b'other').hexdigest())
@@ -0,0 +1,227 @@
+import http.server
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import unittest
+
+from urllib.parse import quote, unquote, urlsplit
+
+from dispatcher.http import HttpDispatcher
+from tests import media_fixtures
+from utils import http_source
+from utils.container_header import probe_header
+from utils.regex_prefix import get_dir_filter
+
+
+class _RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """ Отдаёт файлы из папки `root` с поддержкой запросов диапазонов и индексы папок со ссылками, как у nginx
+
+    """
+
+    protocol_version = 'HTTP/1.1'
+    root = None
+    fail_ranges = False
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, content_type: str, body: bytes, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Accept-Ranges', 'bytes')
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url_path = urlsplit(self.path).path
+        if url_path.startswith('/signed/'):
+            # имитация подписанного URL хранилища объектов
+            if urlsplit(self.path).query != 'sig=a%2Fb':
+                self._send(403, 'text/plain', b'')
+                return
+            url_path = url_path[7:]
+        if url_path.startswith('/redirect/'):
+            self._send(302, 'text/html', b'<a href="/">moved</a>', {'Location': url_path[9:]})
+            return
+        if url_path == '/loop':
+            self._send(301, 'text/html', b'', {'Location': '/loop'})
+            return
+        path = os.path.join(self.root, *[p for p in unquote(url_path).split('/') if p])
+        if os.path.isdir(path):
+            links = ['../', '/', 'http://example.com/', '?C=N;O=D'] + [
+                quote(n) + ('/' if os.path.isdir(os.path.join(path, n)) else '') for n in sorted(os.listdir(path))]
+            body = ''.join(['<a href="{}">{}</a>\n'.format(l, l) for l in links]).encode('utf-8')
+            self._send(200, 'text/html; charset=utf-8', body)
+            return
+        if not os.path.isfile(path):
+            self._send(404, 'text/plain', b'')
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        content_type = 'application/json' if path.endswith('.json') else 'application/octet-stream'
+        range_header = self.headers.get('Range')
+        if range_header is None:
+            self._send(200, content_type, data)
+            return
+        start, end = [int(v) for v in range_header[6:].split('-')]
+        if self.fail_ranges and start:
+            self._send(500, 'text/plain', b'')
+            return
+        end = min(end, len(data) - 1)
+        self._send(206, content_type, data[start:end + 1],
+                   {'Content-Range': 'bytes {}-{}/{}'.format(start, end, len(data))})
+
+    do_HEAD = do_GET
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class TestHttpSource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp_dir.name, 'root')
+        os.mkdir(self.root)
+        handler = type('Handler', (_RangeRequestHandler, ), {'root': self.root})
+        self.server = _Server(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        if http_source.http_pool is not None:
+            http_source.http_pool.close()
+            http_source.http_pool = None
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def _create_tree(self) -> None:
+        for d in ['a', os.path.join('a', 'b'), 'c d']:
+            os.makedirs(os.path.join(self.root, d))
+            for n in range(2):
+                with open(os.path.join(self.root, d, '{} {}.mxf'.format(d[0], n)), 'wb') as f:
+                    f.write(os.urandom(100))
+        open(os.path.join(self.root, 'e.xml'), 'w').close()
+
+    def test_list_tree_index(self):
+        self._create_tree()
+        base_url, dir_list, count = http_source.list_tree(self.base_url + '/')
+        self.assertEqual(base_url, self.base_url)
+        self.assertEqual(count, 7)
+        self.assertEqual(dir_list, [
+            {'rel_in_dir': '', 'files': ['e.xml']},
+            {'rel_in_dir': 'a', 'files': ['a 0.mxf', 'a 1.mxf']},
+            {'rel_in_dir': os.path.join('a', 'b'), 'files': ['a 0.mxf', 'a 1.mxf']},
+            {'rel_in_dir': 'c d', 'files': ['c 0.mxf', 'c 1.mxf']},
+        ])
+        self.assertEqual(http_source.list_tree(self.base_url, workers=4), (base_url, dir_list, count))
+        base_url, dir_list, count = http_source.list_tree(self.base_url, get_dir_filter([r'^c d.*\.mxf$']))
+        self.assertEqual([d['rel_in_dir'] for d in dir_list], ['', 'c d'])
+
+    def test_list_tree_manifest(self):
+        with open(os.path.join(self.root, 'manifest.json'), 'w') as f:
+            json.dump({'files': ['a/1.mxf', {'path': 'a/b/2.mxf', 'size': 10}, '3.xml', 'c/4.mxf']}, f)
+        url = self.base_url + '/manifest.json'
+        self.assertTrue(http_source.is_tree(url))
+        base_url, dir_list, count = http_source.list_tree(url)
+        self.assertEqual(base_url, self.base_url)
+        self.assertEqual(count, 4)
+        self.assertEqual([(d['rel_in_dir'], d['files']) for d in dir_list],
+                         [('a', ['1.mxf']), (os.path.join('a', 'b'), ['2.mxf']), ('', ['3.xml']), ('c', ['4.mxf'])])
+        base_url, dir_list, count = http_source.list_tree(url, get_dir_filter([r'^a.*\.mxf$']))
+        self.assertEqual([d['rel_in_dir'] for d in dir_list], ['a', os.path.join('a', 'b'), ''])
+
+    def test_manifest_invalid_paths(self):
+        with open(os.path.join(self.root, 'manifest.json'), 'w') as f:
+            json.dump(['./a/1.mxf', '../../etc/2.mxf', '/a/3.mxf', 'a//4.mxf', 'a\\5.mxf', 'a/b/..', '', 'a/6.mxf'], f)
+        base_url, dir_list, count = http_source.list_tree(self.base_url + '/manifest.json')
+        self.assertEqual(dir_list, [{'rel_in_dir': 'a', 'files': ['1.mxf', '6.mxf']}])
+
+    def test_redirect(self):
+        with open(os.path.join(self.root, 'a.bin'), 'wb') as f:
+            f.write(b'data')
+        pool = http_source.HttpPool()
+        self.assertEqual(pool.get_size(self.base_url + '/redirect/a.bin'), (4, True))
+        dst = os.path.join(self.tmp_dir.name, 'out.bin')
+        http_source.copy_url(self.base_url + '/redirect/redirect/a.bin', dst, pool)
+        with open(dst, 'rb') as f:
+            self.assertEqual(f.read(), b'data')
+        with self.assertRaises(http_source.HttpException):
+            pool.request(self.base_url + '/loop')
+        with self.assertRaises(http_source.HttpException):
+            pool.request(self.base_url + '/missing')
+        pool.close()
+
+    def test_copy_url_failure(self):
+        with open(os.path.join(self.root, 'a.bin'), 'wb') as f:
+            f.write(os.urandom(300000))
+        self.server.RequestHandlerClass.fail_ranges = True
+        pool = http_source.HttpPool(range_workers=4, chunk_size=65536)
+        dst = os.path.join(self.tmp_dir.name, 'out.bin')
+        with self.assertRaises(http_source.HttpException):
+            http_source.copy_url(self.base_url + '/a.bin', dst, pool)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['root'])
+        pool.close()
+
+    def test_copy_url(self):
+        data = os.urandom(300000)
+        with open(os.path.join(self.root, 'a b.bin'), 'wb') as f:
+            f.write(data)
+        url = http_source.join(self.base_url, 'a b.bin')
+        self.assertFalse(http_source.is_tree(url))
+        self.assertEqual(http_source.get_basename(url), 'a b.bin')
+        for pool in (http_source.HttpPool(range_workers=4, chunk_size=65536), http_source.HttpPool()):
+            dst = os.path.join(self.tmp_dir.name, 'out.bin')
+            http_source.copy_url(url, dst, pool)
+            with open(dst, 'rb') as f:
+                self.assertEqual(f.read(), data)
+            os.remove(dst)
+            pool.close()
+
+    def test_range_reader(self):
+        path = os.path.join(self.root, 'a.mp4')
+        media_fixtures.build_mp4(path, [(b'vide', b'avc1'), (b'soun', b'mp4a')], 10, 1000000, False)
+        with open(path, 'rb') as f:
+            data = f.read()
+        reader = http_source.RangeReader(self.base_url + '/a.mp4')
+        self.assertEqual(len(reader), len(data))
+        for item in (slice(0, 8), slice(65530, 65600), slice(len(data) - 100, None), slice(-10, None)):
+            self.assertEqual(reader[item], data[item])
+        self.assertEqual(reader[70000], data[70000])
+        self.assertEqual(reader.find(b'moov', 1000), data.find(b'moov', 1000))
+        metadata = probe_header(self.base_url + '/a.mp4')
+        self.assertIsNotNone(metadata)
+        self.assertEqual(metadata, probe_header(path))
+
+    def test_dispatcher(self):
+        self._create_tree()
+        out_dir = os.path.join(self.tmp_dir.name, 'out')
+        os.mkdir(out_dir)
+        HttpDispatcher(self.base_url + '/', {'policy': 'skip', 'patterns': [[r'^c d.*\.mxf$', {}, 'copy', {}]]},
+                       out_dir, 1, True, False).dispatch()
+        for n in range(2):
+            with open(os.path.join(self.root, 'c d', 'c {}.mxf'.format(n)), 'rb') as f:
+                with open(os.path.join(out_dir, 'c d', 'c {}.mxf'.format(n)), 'rb') as o:
+                    self.assertEqual(o.read(), f.read())
+        self.assertEqual(os.listdir(out_dir), ['c d'])
+
+    def test_dispatcher_signed_url(self):
+        self._create_tree()
+        out_dir = os.path.join(self.tmp_dir.name, 'out')
+        os.mkdir(out_dir)
+        HttpDispatcher(self.base_url + '/signed/c%20d/c%200.mxf?sig=a%2Fb',
+                       {'policy': 'error', 'patterns': [[r'^c 0\.mxf$', {}, 'copy', {}]]}, out_dir, 0, False, False
+                       ).dispatch()
+        with open(os.path.join(self.root, 'c d', 'c 0.mxf'), 'rb') as f:
+            with open(os.path.join(out_dir, 'c 0.mxf'), 'rb') as o:
+                self.assertEqual(o.read(), f.read())
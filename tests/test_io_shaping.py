@@ -0,0 +1,33 @@
+import os
+import unittest
+
+from utils import io_shaping
+
+
+class TestIoShaping(unittest.TestCase):
+
+    def test_schedule(self):
+        rule = io_shaping._Rule({'path': '/mnt', 'schedule': [
+            {'from': '08:00', 'to': '20:00', 'read_rate': 1},
+            {'from': '22:00', 'to': '02:00', 'write_rate': 2},
+        ]})
+        self.assertEqual(rule.get_limits(12 * 60)['read_rate'], 1)
+        self.assertEqual(rule.get_limits(23 * 60)['write_rate'], 2)
+        self.assertEqual(rule.get_limits(60)['write_rate'], 2)
+        self.assertEqual(rule.get_limits(21 * 60), {})
+
+    def test_longest_prefix(self):
+        shaper = io_shaping.IoShaper([
+            {'path': '/mnt', 'read_rate': 100},
+            {'path': '/mnt/san', 'read_rate': 200},
+        ])
+        self.assertEqual(shaper.get_rate(os.path.join('/mnt', 'san', 'a.mxf'), 'read'), 200)
+        self.assertEqual(shaper.get_rate(os.path.join('/mnt', 'sand', 'a.mxf'), 'read'), 100)
+        self.assertIsNone(shaper.get_rate(os.path.join('/mnt', 'san', 'a.mxf'), 'write'))
+        self.assertFalse(shaper.is_limited('/home'))
+
+    def test_invalid_rule(self):
+        with self.assertRaises(ValueError):
+            io_shaping.IoShaper([{'read_rate': 100}])
+        with self.assertRaises(ValueError):
+            io_shaping.IoShaper([{'path': '/mnt', 'schedule': [{'from': '25:00', 'to': '02:00'}]}])
@@ -0,0 +1,29 @@
+import unittest
+
+from utils import module_import
+from action import get_action_class
+from action.copy import CopyAction
+
+
+class TestModuleImport(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        module_import.register_plugins('action', {'copy': ['test_dependency']})
+        module_import.register_dependency('test_dependency', lambda: self.calls.append('test_dependency'))
+        module_import._initialized_dependencies.discard('test_dependency')
+        module_import._module_cache.pop('action.copy', None)
+        module_import._class_cache.pop(('action', 'copy'), None)
+
+    def tearDown(self):
+        module_import.register_plugins('action', {'copy': []})
+        module_import._dependency_initializers.pop('test_dependency', None)
+
+    def test_get_class(self):
+        self.assertIs(get_action_class('copy'), CopyAction)
+        self.assertIs(get_action_class('copy'), CopyAction)
+        self.assertIn('action.copy', module_import._module_cache)
+        self.assertEqual(self.calls, ['test_dependency'])
+
+    def test_registered_plugins(self):
+        self.assertIn('ffmpeg.convert', module_import.get_registered_plugins('action'))
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from utils import out_tree
+
+
+class TestOutputTree(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tree = out_tree.OutputTree()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_exists(self):
+        path = os.path.join(self.tmp_dir.name, 'a.mxf')
+        open(path, 'wb').close()
+        self.assertTrue(self.tree.exists(path))
+        self.assertFalse(self.tree.exists(os.path.join(self.tmp_dir.name, 'b.mxf')))
+        self.assertFalse(self.tree.exists(os.path.join(self.tmp_dir.name, 'missing', 'a.mxf')))
+
+    def test_add(self):
+        path = os.path.join(self.tmp_dir.name, 'a.mxf')
+        self.assertFalse(self.tree.exists(path))
+        open(path, 'wb').close()
+        self.assertFalse(self.tree.exists(path))
+        self.tree.add(path)
+        self.assertTrue(self.tree.exists(path))
+        self.tree.remove(path)
+        self.assertFalse(self.tree.exists(path))
+
+    def test_makedirs(self):
+        dir_path = os.path.join(self.tmp_dir.name, 'a', 'b', 'c')
+        path = os.path.join(dir_path, 'a.mxf')
+        self.assertFalse(self.tree.exists(path))
+        self.tree.makedirs(dir_path)
+        self.assertTrue(os.path.isdir(dir_path))
+        self.assertTrue(self.tree.exists(dir_path))
+        self.assertFalse(self.tree.exists(path))
+        self.tree.add(path)
+        self.assertTrue(self.tree.exists(path))
+        self.tree.makedirs(dir_path)
+        self.tree.makedirs(os.path.join(self.tmp_dir.name, 'a', 'd'))
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp_dir.name, 'a', 'd')))
+
+    def test_fallback(self):
+        self.assertIsNone(out_tree.out_tree)
+        dir_path = os.path.join(self.tmp_dir.name, 'a', 'b')
+        out_tree.makedirs(dir_path)
+        self.assertTrue(out_tree.exists(dir_path))
+        out_tree.add(os.path.join(dir_path, 'a.mxf'))
+        self.assertFalse(out_tree.exists(os.path.join(dir_path, 'a.mxf')))
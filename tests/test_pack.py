@@ -0,0 +1,73 @@
+import unittest
+import os
+import tempfile
+import shutil
+
+from utils.pack import PackWriter, PackReader, INDEX_SUFFIX, detect_format
+
+
+class TestPack(unittest.TestCase):
+
+    FILES = {
+        'C0001M01.XML': b'<xml/>',
+        'C0001R01.BIM': os.urandom(100000),
+        'empty.ppn': b'',
+    }
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.in_dir = os.path.join(self.tmp_dir, 'in')
+        self.out_dir = os.path.join(self.tmp_dir, 'out')
+        os.mkdir(self.in_dir)
+        os.mkdir(self.out_dir)
+        for name, data in self.FILES.items():
+            with open(os.path.join(self.in_dir, name), 'wb') as f:
+                f.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _pack(self, archive_format: str, index: bool, filename: str = None) -> str:
+        path = os.path.join(self.tmp_dir, filename or 'pack.{}'.format(archive_format))
+        names = sorted(self.FILES)
+        writer = PackWriter(path, archive_format, index)
+        writer.add(os.path.join(self.in_dir, names[0]), names[0])
+        writer.close()
+        writer = PackWriter(path, archive_format, index, append=True)
+        for name in names[1:]:
+            writer.add(os.path.join(self.in_dir, name), name)
+        with self.assertRaises(FileExistsError):
+            writer.add(os.path.join(self.in_dir, names[0]), names[0])
+        writer.close()
+        return path
+
+    def _check(self, path: str):
+        reader = PackReader(path)
+        self.assertEqual(sorted(reader.list()), sorted([(n, len(d)) for n, d in self.FILES.items()]))
+        reader.extract(self.out_dir, ['C0001R01.BIM'])
+        with open(os.path.join(self.out_dir, 'C0001R01.BIM'), 'rb') as f:
+            self.assertEqual(f.read(), self.FILES['C0001R01.BIM'])
+        with self.assertRaises(FileExistsError):
+            reader.extract(self.out_dir, ['C0001R01.BIM'])
+
+    def test_tar_index(self):
+        path = self._pack('tar', True)
+        self.assertTrue(os.path.isfile(path + INDEX_SUFFIX))
+        self._check(path)
+
+    def test_tar(self):
+        path = self._pack('tar', False)
+        self.assertFalse(os.path.isfile(path + INDEX_SUFFIX))
+        self._check(path)
+
+    def test_zip(self):
+        self._check(self._pack('zip', False))
+
+    def test_detect_format(self):
+        for archive_format, filename in (('tar', 'pack.zip'), ('zip', 'pack.tar')):
+            path = self._pack(archive_format, False, filename)
+            self.assertEqual(detect_format(path), archive_format)
+            self._check(path)
+            os.remove(os.path.join(self.out_dir, 'C0001R01.BIM'))
+        with self.assertRaises(ValueError):
+            PackReader(os.path.join(self.in_dir, 'C0001R01.BIM'))
@@ -0,0 +1,48 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+from tests import media_fixtures
+from utils import probe
+
+
+class TestProbe(unittest.TestCase):
+
+    SPEC = {
+        'stream:v:0': {'field_mode': 1, 'width': 1920},
+        'count:a': [['gte', 2], ['lte', 4]],
+        'format': {'bit_rate': ['gte', 20000000]},
+    }
+
+    def test_required_level(self):
+        self.assertEqual(probe.get_required_level({'count:v': 1, 'format': {'bit_rate': ['gte', 1]}}), probe.HEADER)
+        self.assertEqual(probe.get_required_level({'stream:v:0': {'pix_fmt': 'yuv422p'}}), probe.FAST)
+        self.assertEqual(probe.get_required_level(self.SPEC), probe.DEEP)
+
+    def test_shallow_spec(self):
+        self.assertEqual(probe.get_shallow_spec(self.SPEC), {
+            'stream:v:0': {'width': 1920},
+            'count:a': [['gte', 2], ['lte', 4]],
+            'format': {'bit_rate': ['gte', 20000000]},
+        })
+        self.assertEqual(probe.get_shallow_spec({'stream:v:0': {'field_mode': 1}}), {})
+
+    def test_prober(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ffprobe_path = os.path.join(tmp_dir, 'ffprobe')
+            counter_path = os.path.join(tmp_dir, 'counter')
+            with open(ffprobe_path, 'w') as f:
+                f.write('#!{}\nopen({!r}, "a").write("1")\nprint(\'{{"format": {{}}, "streams": []}}\')\n'.format(
+                    sys.executable, counter_path))
+            os.chmod(ffprobe_path, os.stat(ffprobe_path).st_mode | stat.S_IEXEC)
+            media_path = os.path.join(tmp_dir, 'a.mp4')
+            media_fixtures.build_mp4(media_path, [(b'vide', b'avc1')], 10, 1000)
+            prober = probe.MetadataProber(ffprobe_path)
+            self.assertEqual(prober.get_header(media_path)[0]['streams'][0]['codec_type'], 'video')
+            self.assertEqual(prober.get_fast(media_path), {'format': {}, 'streams': []})
+            prober.get_fast(media_path)
+            self.assertEqual(prober.get_deep(media_path, lambda p: {'path': p}), {'path': media_path})
+            with open(counter_path) as f:
+                self.assertEqual(f.read(), '1')
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from collections import namedtuple
+
+from args_parser import args_parser
+from utils import profile_bench
+
+Profile = namedtuple('Profile', ['inputs', 'outputs'])
+
+
+class TestProfileBench(unittest.TestCase):
+
+    def test_build_command(self):
+        profile = Profile([{'parameters': '-ss 1'}], [{'parameters': ['-c:v', 'libx264'], 'filename': 'a.mp4'},
+                                                     {'parameters': '-c:a "pcm_s16le"', 'filename': 'a.wav'}])
+        args = profile_bench.build_command('ffmpeg', profile, 'in.mxf', ['out/a.mp4', 'out/a.wav'])
+        self.assertEqual(args[args.index('-y') + 1:], ['-ss', '1', '-i', 'in.mxf', '-c:v', 'libx264', 'out/a.mp4',
+                                                       '-c:a', 'pcm_s16le', 'out/a.wav'])
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_path = os.path.join(tmp_dir, 'a.mp4')
+            script = 'open({!r}, "wb").write(bytes(125000)); print("frame=249"); print("frame=250")'.format(out_path)
+            result = profile_bench.run([sys.executable, '-c', script], 10, [out_path])
+            self.assertEqual(result['bitrate'], 100000)
+            self.assertGreater(result['fps'], 0)
+            self.assertGreater(result['speed'], 0)
+            if hasattr(os, 'wait4'):
+                self.assertGreater(result['rss'], 0)
+            with self.assertRaises(subprocess.CalledProcessError):
+                profile_bench.run([sys.executable, '-c', 'raise SystemExit(3)'], 10, [])
+
+    def test_compare(self):
+        baseline = {'fps': 100, 'speed': 4, 'cpu': 50, 'rss': 100, 'bitrate': 1000}
+        self.assertEqual(profile_bench.compare({'fps': 120, 'speed': 4.8, 'cpu': 90, 'rss': 95, 'bitrate': 1050},
+                                               baseline, 0.1), [])
+        regressions = profile_bench.compare({'fps': 80, 'speed': 3.2, 'cpu': 50, 'rss': 150, 'bitrate': 800},
+                                            baseline, 0.1)
+        self.assertEqual([r.split(':')[0] for r in regressions], ['bitrate', 'fps', 'rss', 'speed'])
+
+    def test_baselines(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bench', 'baselines.json')
+            self.assertEqual(profile_bench.load_baselines(path), {})
+            profile_bench.save_baselines(path, {'p': {'lavfi_10s.mov': {'speed': 1.5}}})
+            self.assertEqual(profile_bench.load_baselines(path), {'p': {'lavfi_10s.mov': {'speed': 1.5}}})
+
+    def test_sample_names(self):
+        self.assertEqual(profile_bench.get_sample_names([os.path.join('a', 'clip.mxf'), os.path.join('a', 'b.mov')]),
+                         ['clip.mxf', 'b.mov'])
+        with self.assertRaises(ValueError):
+            profile_bench.get_sample_names([os.path.join('a', 'clip.mxf'), os.path.join('b', 'clip.mxf')])
+
+    def test_remux_if_argument(self):
+        args = args_parser.parse_args(['bench-profile', 'p', '-ri', '{"stream:v:0": {"width": 1920}}'])
+        self.assertEqual(args.remux_if, {'stream:v:0': {'width': 1920}})
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+
+from utils.file_list import build_file_list
+from utils.regex_prefix import get_dir_filter, get_literal_prefixes
+
+
+class TestRegexPrefix(unittest.TestCase):
+
+    def test_literal_prefixes(self):
+        self.assertEqual(get_literal_prefixes(r'^__HQ__.*\d{3}_\d{4}_\d{2}\.mp4$'), ['__hq__'])
+        self.assertEqual(get_literal_prefixes(r'(a|B)[cd]x'), ['acx', 'adx', 'bcx', 'bdx'])
+        self.assertEqual(get_literal_prefixes(r'^a|^bc'), ['a', 'bc'])
+        self.assertEqual(get_literal_prefixes(r'(?:a|b)?c'), [''])
+        self.assertEqual(get_literal_prefixes(r'.*\.mp4$'), [''])
+        self.assertEqual(get_literal_prefixes(r'('), [''])
+
+    def test_dir_filter(self):
+        self.assertIsNone(get_dir_filter([r'^__HQ__', r'.*\.mp4$']))
+        dir_filter = get_dir_filter([r'^__HQ__.*\.mp4$', r'^cards{}(a|b){}'.format(os.sep, os.sep).replace('\\', '\\\\')])
+        self.assertTrue(dir_filter('__hq__'))
+        self.assertTrue(dir_filter('__HQ__2017'))
+        self.assertTrue(dir_filter('cards'))
+        self.assertTrue(dir_filter(os.path.join('cards', 'a')))
+        self.assertFalse(dir_filter(os.path.join('cards', 'ab')))
+        self.assertFalse(dir_filter('other'))
+
+    def test_build_file_list(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for d in [os.path.join('__HQ__', 'sub'), os.path.join('other', 'sub')]:
+                os.makedirs(os.path.join(tmp_dir, d))
+                open(os.path.join(tmp_dir, d, 'a.mp4'), 'w').close()
+            dir_list, file_count = build_file_list(tmp_dir, get_dir_filter([r'^__HQ__.*\.mp4$']))
+            self.assertEqual(file_count, 1)
+            self.assertEqual(dir_list, [{'rel_in_dir': os.path.join('__HQ__', 'sub'), 'files': ['a.mp4']}])
@@ -0,0 +1,74 @@
+import unittest
+import os
+import json
+import tempfile
+import shutil
+
+from jsonschema import ValidationError
+
+from rules_provider import get_rules_set_format
+from rules_provider.json import JsonRulesProvider
+from utils.rules_cache import RulesSetCache
+
+BASE_DIR = os.path.dirname(__file__)
+
+
+class TestJsonRulesProvider(unittest.TestCase):
+
+    RULES_SET = {
+        'policy': 'warning',
+        'patterns': [
+            ['^__HQ__.*\\.mp4$', {'passthrough': False}, 'copy', {'dir_depth': 2}],
+            ['.*\\.xml$', {}, 'skip'],
+        ]
+    }
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.rules_set_path = os.path.join(self.tmp_dir, 'rules.json')
+        self._write_rules_set(self.RULES_SET)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write_rules_set(self, rules_set):
+        with open(self.rules_set_path, 'w') as rs_file:
+            json.dump(rules_set, rs_file)
+
+    def test_default_rules_set(self):
+        rules_set = JsonRulesProvider().get_rules(os.path.join(BASE_DIR, '..', 'rules_sets', 'default.json'))
+        self.assertTrue(all([len(p) == 4 for p in rules_set['patterns']]))
+
+    def test_normalization(self):
+        rules_set = JsonRulesProvider().get_rules(self.rules_set_path)
+        self.assertEqual(rules_set['patterns'][1], ['.*\\.xml$', {}, 'skip', {}])
+
+    def test_invalid(self):
+        self._write_rules_set({'policy': 'unknown', 'patterns': []})
+        with self.assertRaises(ValidationError):
+            JsonRulesProvider().get_rules(self.rules_set_path)
+
+    def test_cache(self):
+        provider = JsonRulesProvider(cache=RulesSetCache(self.cache_dir, '1'))
+        cold = provider.get_rules(self.rules_set_path)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.assertEqual(provider.get_rules(self.rules_set_path), cold)
+
+        provider = JsonRulesProvider(cache=RulesSetCache(self.cache_dir, '2'))
+        provider.get_rules(self.rules_set_path)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_cache_format(self):
+        rules_set_format = get_rules_set_format()
+        self.assertEqual(rules_set_format, get_rules_set_format())
+        JsonRulesProvider(cache=RulesSetCache(self.cache_dir, '1', rules_set_format)).get_rules(self.rules_set_path)
+        # при той же версии изменённые схема или нормализация не должны подхватить старую запись
+        JsonRulesProvider(cache=RulesSetCache(self.cache_dir, '1', 'changed')).get_rules(self.rules_set_path)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_cache_invalidation(self):
+        provider = JsonRulesProvider(cache=RulesSetCache(self.cache_dir, '1'))
+        provider.get_rules(self.rules_set_path)
+        self._write_rules_set({'policy': 'skip', 'patterns': [['.*', {}, 'skip', {}]]})
+        self.assertEqual(provider.get_rules(self.rules_set_path)['policy'], 'skip')
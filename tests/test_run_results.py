@@ -0,0 +1,68 @@
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from utils.run_results import RunResults, get_latest
+
+
+class TestRunResults(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'autoarchive-results-20170101000000-1.sqlite3')
+        self.results = RunResults(self.db_path)
+        self.results.COMMIT_EVERY = 2
+        self.results.record('a/1.mxf', 'done', ['^a/'],
+                            [('copy', '/out', 'done', 1.5), ('pack', '/out', 'exists', 0.5)], 2.0)
+        self.results.record('a/2.xml', 'no_match', [], [], 0.1)
+        self.results.record('b/3.mxf', 'error', ['^b/'], [('copy', '/out', 'error', 0.2)], 0.3, 'OSError: boom')
+
+    def tearDown(self):
+        self.results.close()
+        self.tmp_dir.cleanup()
+
+    def test_summary(self):
+        self.assertEqual(self.results.get_counts(), {'done': 1, 'no_match': 1, 'error': 1})
+        self.assertEqual(self.results.get_action_stats(), [('copy', 'done', 1, 1.5), ('copy', 'error', 1, 0.2),
+                                                           ('pack', 'exists', 1, 0.5)])
+
+    def test_filters(self):
+        self.assertEqual([r['path'] for r in self.results.iter_files()], ['a/1.mxf', 'a/2.xml', 'b/3.mxf'])
+        self.assertEqual([r['path'] for r in self.results.iter_files(outcome='error')], ['b/3.mxf'])
+        self.assertEqual([r['path'] for r in self.results.iter_files(path_pattern='*.mxf', limit=1)], ['a/1.mxf'])
+        self.assertEqual([r['path'] for r in self.results.iter_files(action_id='pack')], ['a/1.mxf'])
+
+    def test_actions(self):
+        self.assertEqual([[a['action'] for a in r['actions']] for r in self.results.iter_files()],
+                         [['copy', 'pack'], [], ['copy']])
+
+    def test_read_only(self):
+        self.results.close()
+        with sqlite3.connect(self.db_path) as db:
+            db.execute('PRAGMA journal_mode=DELETE')
+        db.close()
+        self.results = RunResults(self.db_path, read_only=True)
+        self.assertEqual([r['path'] for r in self.results.iter_files(action_id='copy')], ['a/1.mxf', 'b/3.mxf'])
+        # открытие для отчёта не переводит архивную базу в режим WAL
+        self.assertEqual(self.results._db.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+        self.results.record('c/4.mxf', 'done', [], [], 0.1)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.results.flush()
+        self.results._files = []
+
+    def test_export(self):
+        stream = io.StringIO()
+        self.assertEqual(self.results.export(stream, 'json', outcome='error'), 1)
+        row = json.loads(stream.getvalue())
+        self.assertEqual(row['error'], 'OSError: boom')
+        self.assertEqual(row['actions'], [{'action': 'copy', 'out_dir': '/out', 'outcome': 'error', 'elapsed': 0.2}])
+        stream = io.StringIO()
+        self.assertEqual(self.results.export(stream, 'csv'), 3)
+        self.assertEqual(len(stream.getvalue().splitlines()), 4)
+
+    def test_get_latest(self):
+        self.assertTrue(get_latest(self.tmp_dir.name).endswith('20170101000000-1.sqlite3'))
+        self.assertIsNone(get_latest(os.path.join(self.tmp_dir.name, 'missing')))
@@ -0,0 +1,23 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from benchmarks import startup
+
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime requires Python 3.7')
+class TestStartup(unittest.TestCase):
+
+    def test_heavy_imports(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            conf_path, rules_set_path, dirs = startup.prepare(tmp_dir)
+            for args in (['version'], ['run', dirs['in'], rules_set_path]):
+                cmd = startup.get_command(conf_path, *args)
+                # первый запуск заполняет кэш наборов правил
+                subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+                shutil.rmtree(dirs['out'])
+                os.mkdir(dirs['out'])
+                self.assertEqual(startup.get_heavy_imports(cmd), [], args[0])
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utils.thread_tuning import ThreadTuner, get_duration
+
+
+class TestThreadTuner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tuner = ThreadTuner(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tuner.close()
+        self.tmp_dir.cleanup()
+
+    def test_jobs(self):
+        job_id = self.tuner.start_job()
+        self.tuner.start_job()
+        open(os.path.join(self.tmp_dir.name, 'jobs', '999999999-1-1.job'), 'w').close()
+        self.assertEqual(self.tuner.count_jobs(), 2)
+        self.tuner.finish_job(job_id)
+        self.assertEqual(self.tuner.count_jobs(), 1)
+
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_cpu_share(self, _):
+        self.tuner.start_job()
+        self.assertEqual(self.tuner.suggest('p'), 8)
+        self.tuner.start_job()
+        self.assertEqual(self.tuner.suggest('p'), 4)
+
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_model(self, _):
+        self.tuner.start_job()
+        self.tuner.record('p', 8, 2.0)
+        self.tuner.record('p', 4, 1.99)
+        self.tuner.record('p', 2, 1.0)
+        self.assertEqual(self.tuner.suggest('p'), 4)
+        self.assertEqual(self.tuner.get_speeds('p'), {8: 2.0, 4: 1.99, 2: 1.0})
+
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_exploration(self, _):
+        self.tuner.start_job()
+        # первый профиль перестаёт ускоряться после двух потоков, второй ускоряется линейно
+        for speed, expected in ((lambda t: min(t, 2) * 1.0, 2), (lambda t: t * 1.0, 8)):
+            profile_name = 'p{}'.format(expected)
+            suggested = []
+            for n in range(6):
+                threads = self.tuner.suggest(profile_name)
+                suggested.append(threads)
+                self.tuner.record(profile_name, threads, speed(threads))
+            self.assertEqual(suggested[-1], expected)
+        self.assertEqual(sorted(self.tuner.get_speeds('p8')), [4, 8])
+
+    def test_estimate(self):
+        self.tuner.record('p', 4, 2.0)
+        self.assertEqual(self.tuner.estimate('p', 4, 60.0), 30.0)
+        self.assertIsNone(self.tuner.estimate('p', 8, 60.0))
+        self.assertEqual(get_duration({'format': {'duration': '60.000000'}}), 60.0)
+        self.assertIsNone(get_duration({'format': {'duration': 'N/A'}}))
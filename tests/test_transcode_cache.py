@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from utils import fingerprint
+from utils.transcode_cache import TranscodeCache
+
+
+class TestTranscodeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.mkdir(self._path('in'))
+        fingerprint._last_fingerprint = None
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _path(self, *names) -> str:
+        return os.path.join(self.tmp_dir.name, *names)
+
+    def _create(self, path: str, data: bytes) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _get_cache(self, mode: str, max_size: int = 1024 * 1024) -> TranscodeCache:
+        cache = TranscodeCache(self._path('cache'), mode, max_size)
+        self.addCleanup(cache.close)
+        return cache
+
+    def _convert(self, cache: TranscodeCache, in_path: str, out_dir: str, params_key: str = 'params') -> list:
+        """ Имитирует конвертирование с кэшем: выходной файл - перевёрнутое содержимое входного
+
+        """
+        out_paths = [os.path.join(out_dir, os.path.basename(in_path) + '.mov')]
+        os.makedirs(out_dir, exist_ok=True)
+        if not cache.get(in_path, params_key, out_paths, False):
+            with open(in_path, 'rb') as f:
+                self._create(out_paths[0], f.read()[::-1])
+            cache.put(in_path, params_key, out_paths)
+        return out_paths
+
+    def _read(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            TranscodeCache(self._path('cache'), 'copy', 100)
+
+    def test_store(self):
+        cache = self._get_cache('store')
+        a = self._create(self._path('in', 'a.mxf'), b'content')
+        first = self._convert(cache, a, self._path('out1'))
+        os.remove(first[0])
+        b = self._create(self._path('in', 'b.mxf'), b'content')
+        out_paths = [self._path('out2', 'b.mxf.mov')]
+        os.makedirs(self._path('out2'))
+        self.assertFalse(cache.get(b, 'other', out_paths, False))
+        self.assertTrue(cache.get(b, 'params', out_paths, True))
+        self.assertFalse(os.path.exists(out_paths[0]))
+        self.assertTrue(cache.get(b, 'params', out_paths, False))
+        self.assertEqual(self._read(out_paths[0]), b'tnetnoc')
+        c = self._create(self._path('in', 'c.mxf'), b'Content')
+        self.assertFalse(cache.get(c, 'params', [self._path('out2', 'c.mxf.mov')], False))
+
+    def test_pointer(self):
+        cache = self._get_cache('pointer')
+        a = self._create(self._path('in', 'a.mxf'), b'content')
+        first = self._convert(cache, a, self._path('out1'))
+        b = self._create(self._path('in', 'b.mxf'), b'content')
+        out_paths = [self._path('out2', 'b.mxf.mov')]
+        os.makedirs(self._path('out2'))
+        self.assertTrue(cache.get(b, 'params', out_paths, False))
+        self.assertEqual(self._read(out_paths[0]), b'tnetnoc')
+        os.remove(out_paths[0])
+        # выходной файл, на который указывает запись, изменился - запись удаляется
+        self._create(first[0], b'truncated')
+        self.assertFalse(cache.get(b, 'params', out_paths, False))
+        self.assertEqual(cache._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0], 0)
+
+    def test_eviction(self):
+        cache = self._get_cache('store', 250)
+        paths = [self._create(self._path('in', '{}.mxf'.format(n)), bytes([n]) * 100) for n in range(3)]
+        for n, path in enumerate(paths[:2]):
+            self._convert(cache, path, self._path('out{}'.format(n)))
+        # обращение к первой записи делает вытесняемой вторую
+        self._convert(cache, paths[0], self._path('out3'))
+        self._convert(cache, paths[2], self._path('out4'))
+        self.assertEqual(cache._db.execute('SELECT SUM(total_size) FROM entries').fetchone()[0], 200)
+        self.assertEqual(sorted(os.listdir(self._path('cache', 'objects'))), ['1', '3'])
+        out_paths = [self._path('out5', '1.mxf.mov')]
+        os.makedirs(self._path('out5'))
+        self.assertFalse(cache.get(paths[1], 'params', out_paths, False))
@@ -0,0 +1,440 @@
+""" Модуль с функциями чтения метаданных из заголовков контейнеров без запуска ffprobe
+
+Поддерживаются MP4/MOV (атомы `moov`), MXF OP1a (наборы метаданных заголовочного раздела) и MPEG-TS/M2TS (таблицы
+PAT/PMT и PCR в начале и в конце файла). Файл отображается в память, читаются только заголовки - поэтому метаданные
+получаются на порядок быстрее, чем от ffprobe, но только те, которые можно определить без разбора потоков. Файлы,
+доступные по HTTP, читаются запросами диапазонов (`utils.http_source.RangeReader`).
+
+Результат имеет ту же структуру, что и вывод `ffprobe -show_format -show_streams`: словарь с ключами `format` и
+`streams`. Значения, которые не удалось определить, в нём просто отсутствуют. Часть значений (длительность и битрейт
+контейнера) ffprobe вычисляет немного иначе - допустимые относительные погрешности для них возвращаются вместе
+с метаданными.
+"""
+
+import logging
+import mmap
+import struct
+
+from utils import urls
+
+FORMAT_NAMES = {
+    'mov': 'mov,mp4,m4a,3gp,3g2,mj2',
+    'mpegts': 'mpegts',
+    'mxf': 'mxf',
+}
+
+TOLERANCES = {
+    'mov': {'format.duration': 0.01, 'format.bit_rate': 0.01},
+    'mpegts': {'format.duration': 0.02, 'format.bit_rate': 0.02},
+    'mxf': {},
+}
+
+TS_SCAN_SIZE = 2 * 1024 * 1024
+MXF_RUN_IN_SIZE = 65536
+
+
+class _UnsupportedException(Exception):
+    pass
+
+
+def _unpack_from(fmt: str, data, offset: int) -> tuple:
+    if isinstance(data, (mmap.mmap, bytes)):
+        return struct.unpack_from(fmt, data, offset)
+    return struct.unpack(fmt, data[offset:offset + struct.calcsize(fmt)])
+
+
+def probe_header(path: str):
+    """ Читает метаданные из заголовков контейнера
+
+    Args:
+        path: путь к файлу
+
+    Returns:
+        Пара (метаданные, словарь допустимых относительных погрешностей значений вида `format.bit_rate`) или None, если
+        формат контейнера не поддерживается или в заголовках встретилось что-то, что нельзя однозначно истолковать
+    """
+    errors = (_UnsupportedException, struct.error, IndexError, ValueError)
+    try:
+        if urls.is_url(path):
+            from utils import http_source
+            errors += (http_source.HttpException, )
+            return _probe_data(http_source.RangeReader(path))
+        with open(path, 'rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return None
+            return _probe_data(data)
+    except errors as e:
+        logging.debug('Container header of "{}" can\'t be interpreted: {}'.format(path, e))
+    return None
+
+
+def _probe_data(data):
+    try:
+        for format_id, probe in (('mov', _probe_mov), ('mpegts', _probe_ts), ('mxf', _probe_mxf)):
+            streams, format_data = probe(data)
+            if streams is None:
+                continue
+            format_data.update({
+                'format_name': FORMAT_NAMES[format_id],
+                'nb_streams': len(streams),
+                'size': str(len(data)),
+            })
+            if 'duration' in format_data:
+                duration = format_data['duration']
+                format_data['duration'] = '{:.6f}'.format(duration)
+                format_data['bit_rate'] = str(int(len(data) * 8 / duration))
+            for n, s in enumerate(streams):
+                s['index'] = n
+            return {'format': format_data, 'streams': streams}, TOLERANCES[format_id]
+    finally:
+        data.close()
+    return None
+
+
+# ---- MP4/MOV ----
+
+_MOV_TOP_LEVEL_BOXES = (b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot', b'uuid', b'junk')
+
+_MOV_HANDLERS = {
+    b'vide': 'video',
+    b'soun': 'audio',
+    b'sbtl': 'subtitle',
+    b'subt': 'subtitle',
+    b'text': 'subtitle',
+    b'tmcd': 'data',
+}
+
+_MOV_CODECS = {
+    b'avc1': 'h264',
+    b'avc3': 'h264',
+    b'hvc1': 'hevc',
+    b'hev1': 'hevc',
+    b'apch': 'prores',
+    b'apcn': 'prores',
+    b'apcs': 'prores',
+    b'apco': 'prores',
+    b'ap4h': 'prores',
+    b'ac-3': 'ac3',
+    b'ec-3': 'eac3',
+    b'tmcd': 'tmcd',
+}
+
+
+def _iter_boxes(data, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = _unpack_from('>I4s', data, pos)
+        header_size = 8
+        if size == 1:
+            size = _unpack_from('>Q', data, pos + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size or pos + size > end:
+            raise _UnsupportedException('Box {} is truncated'.format(box_type))
+        yield box_type, pos + header_size, pos + size
+        pos += size
+
+
+def _find_box(data, start: int, end: int, path: tuple):
+    for box_type, box_start, box_end in _iter_boxes(data, start, end):
+        if box_type == path[0]:
+            return (box_start, box_end) if len(path) == 1 else _find_box(data, box_start, box_end, path[1:])
+    return None
+
+
+def _probe_mov(data) -> tuple:
+    if len(data) < 8 or data[4:8] not in _MOV_TOP_LEVEL_BOXES:
+        return None, None
+    moov = _find_box(data, 0, len(data), (b'moov',))
+    if moov is None:
+        raise _UnsupportedException('moov box is not found')
+    format_data = {}
+    streams = []
+    for box_type, start, end in _iter_boxes(data, *moov):
+        if box_type == b'mvex':
+            raise _UnsupportedException('Fragmented files are not supported')
+        elif box_type == b'mvhd':
+            if data[start] == 1:
+                time_scale, duration = _unpack_from('>IQ', data, start + 20)
+            else:
+                time_scale, duration = _unpack_from('>II', data, start + 12)
+            if time_scale and duration and duration not in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                format_data['duration'] = duration / time_scale
+        elif box_type == b'trak':
+            streams.append(_probe_mov_track(data, start, end))
+    return streams, format_data
+
+
+def _probe_mov_track(data, start: int, end: int) -> dict:
+    tref = _find_box(data, start, end, (b'tref', ))
+    if tref is not None and _find_box(data, tref[0], tref[1], (b'chap', )) is not None:
+        raise _UnsupportedException('Chapter tracks are not supported')
+    hdlr = _find_box(data, start, end, (b'mdia', b'hdlr'))
+    if hdlr is None:
+        raise _UnsupportedException('Track has no handler')
+    handler = data[hdlr[0] + 8:hdlr[0] + 12]
+    if handler not in _MOV_HANDLERS:
+        raise _UnsupportedException('Unknown track handler {}'.format(handler))
+    stream = {'codec_type': _MOV_HANDLERS[handler]}
+    stsd = _find_box(data, start, end, (b'mdia', b'minf', b'stbl', b'stsd'))
+    if stsd is not None and _unpack_from('>I', data, stsd[0] + 4)[0]:
+        entry = stsd[0] + 8
+        codec_tag = data[entry + 4:entry + 8]
+        stream['codec_tag_string'] = codec_tag.decode('latin-1')
+        if codec_tag in _MOV_CODECS:
+            stream['codec_name'] = _MOV_CODECS[codec_tag]
+        if stream['codec_type'] == 'video':
+            stream['width'], stream['height'] = _unpack_from('>HH', data, entry + 32)
+    return stream
+
+
+# ---- MPEG-TS/M2TS ----
+
+_TS_STREAM_TYPES = {
+    0x01: ('video', 'mpeg1video'),
+    0x02: ('video', 'mpeg2video'),
+    0x03: ('audio', None),
+    0x04: ('audio', None),
+    0x0F: ('audio', 'aac'),
+    0x10: ('video', 'mpeg4'),
+    0x11: ('audio', 'aac_latm'),
+    0x1B: ('video', 'h264'),
+    0x24: ('video', 'hevc'),
+    0x81: ('audio', 'ac3'),
+    0x87: ('audio', 'eac3'),
+    0xEA: ('video', 'vc1'),
+}
+
+_TS_HDMV_STREAM_TYPES = {
+    0x80: ('audio', 'pcm_bluray'),
+    0x81: ('audio', 'ac3'),
+    0x82: ('audio', 'dts'),
+    0x83: ('audio', 'truehd'),
+    0x84: ('audio', 'eac3'),
+    0x85: ('audio', 'dts'),
+    0x86: ('audio', 'dts'),
+    0x90: ('subtitle', 'hdmv_pgs_subtitle'),
+    0x92: ('subtitle', 'hdmv_text_subtitle'),
+    0xA1: ('audio', 'eac3'),
+    0xA2: ('audio', 'dts'),
+}
+
+_TS_PRIVATE_DESCRIPTORS = {
+    0x56: ('subtitle', 'dvb_teletext'),
+    0x59: ('subtitle', 'dvb_subtitle'),
+    0x6A: ('audio', 'ac3'),
+    0x7A: ('audio', 'eac3'),
+}
+
+
+def _iter_ts_packets(data, packet_size: int, offset: int, start: int, end: int, backwards: bool = False):
+    first = start + (offset - start) % packet_size
+    positions = range(first, min(end, len(data)) - 188 + 1, packet_size)
+    for p in reversed(positions) if backwards else positions:
+        if data[p] != 0x47:
+            continue
+        pid = ((data[p + 1] & 0x1F) << 8) | data[p + 2]
+        payload = p + 4
+        pcr = None
+        if data[p + 3] & 0x20:
+            af_length = data[p + 4]
+            if af_length and data[p + 5] & 0x10:
+                b = data[p + 6:p + 12]
+                pcr = ((b[0] << 25) | (b[1] << 17) | (b[2] << 9) | (b[3] << 1) | (b[4] >> 7)) * 300 + \
+                    (((b[4] & 1) << 8) | b[5])
+            payload += 1 + af_length
+        yield pid, bool(data[p + 1] & 0x40), payload, p + 188, pcr
+
+
+def _get_ts_section(data, pusi: bool, payload: int, payload_end: int):
+    if not pusi:
+        return None
+    section = payload + 1 + data[payload]
+    if section + 3 > payload_end:
+        raise _UnsupportedException('Section header runs past the packet payload')
+    section_length = ((data[section + 1] & 0x0F) << 8) | data[section + 2]
+    end = section + 3 + section_length
+    # сборка секций, продолжающихся в следующих пакетах, не поддерживается - иначе разбирались бы чужие данные
+    if end > payload_end:
+        raise _UnsupportedException('Section runs past the packet payload')
+    return data[section], section, end - 4
+
+
+def _iter_ts_descriptors(data, start: int, end: int):
+    while start + 2 <= end:
+        yield data[start], start + 2, start + 2 + data[start + 1]
+        start += 2 + data[start + 1]
+
+
+def _probe_ts(data) -> tuple:
+    for packet_size, offset in ((188, 0), (192, 4), (204, 0)):
+        if len(data) >= packet_size * 5 and all([data[offset + n * packet_size] == 0x47 for n in range(5)]):
+            break
+    else:
+        return None, None
+    hdmv = packet_size == 192
+    pmt_pids = None
+    pmts = {}
+    pcr_pid = None
+    for pid, pusi, payload, payload_end, pcr in _iter_ts_packets(data, packet_size, offset, offset, TS_SCAN_SIZE):
+        if pid == 0 and pmt_pids is None:
+            section = _get_ts_section(data, pusi, payload, payload_end)
+            if section is None or section[0] != 0x00:
+                continue
+            pmt_pids = []
+            for e in range(section[1] + 8, section[2], 4):
+                program_number, program_pid = _unpack_from('>HH', data, e)
+                if program_number:
+                    pmt_pids.append(program_pid & 0x1FFF)
+        elif pmt_pids is not None and pid in pmt_pids and pid not in pmts:
+            section = _get_ts_section(data, pusi, payload, payload_end)
+            if section is None or section[0] != 0x02:
+                continue
+            pmts[pid] = section
+            if pcr_pid is None:
+                pcr_pid = _unpack_from('>H', data, section[1] + 8)[0] & 0x1FFF
+        if pmt_pids is not None and len(pmts) == len(pmt_pids):
+            break
+    else:
+        raise _UnsupportedException('PAT or PMT is not found')
+
+    streams = []
+    es_pids = set()
+    for pmt_pid in pmt_pids:
+        table_id, start, end = pmts[pmt_pid]
+        program_info_length = _unpack_from('>H', data, start + 10)[0] & 0x0FFF
+        for tag, d_start, d_end in _iter_ts_descriptors(data, start + 12, start + 12 + program_info_length):
+            if tag == 0x05 and data[d_start:d_start + 4] == b'HDMV':
+                hdmv = True
+        e = start + 12 + program_info_length
+        while e + 5 <= end:
+            stream_type = data[e]
+            es_pid = _unpack_from('>H', data, e + 1)[0] & 0x1FFF
+            es_info_length = _unpack_from('>H', data, e + 3)[0] & 0x0FFF
+            descriptors = list(_iter_ts_descriptors(data, e + 5, e + 5 + es_info_length))
+            e += 5 + es_info_length
+            if es_pid in es_pids:
+                continue
+            es_pids.add(es_pid)
+            if hdmv and stream_type in _TS_HDMV_STREAM_TYPES:
+                codec_type, codec_name = _TS_HDMV_STREAM_TYPES[stream_type]
+            elif stream_type in _TS_STREAM_TYPES:
+                codec_type, codec_name = _TS_STREAM_TYPES[stream_type]
+            elif stream_type == 0x06:
+                private = [_TS_PRIVATE_DESCRIPTORS[tag] for tag, d_s, d_e in descriptors
+                           if tag in _TS_PRIVATE_DESCRIPTORS]
+                if not private:
+                    raise _UnsupportedException('Unknown private stream in PID {}'.format(es_pid))
+                codec_type, codec_name = private[0]
+            else:
+                raise _UnsupportedException('Unknown stream type 0x{:02x} in PID {}'.format(stream_type, es_pid))
+            stream = {'codec_type': codec_type, 'id': '0x{:x}'.format(es_pid)}
+            if codec_name is not None:
+                stream['codec_name'] = codec_name
+            streams.append(stream)
+
+    format_data = {}
+    first_pcr = _find_ts_pcr(data, packet_size, offset, offset, TS_SCAN_SIZE, pcr_pid, False)
+    last_pcr = _find_ts_pcr(data, packet_size, offset, max(offset, len(data) - TS_SCAN_SIZE), len(data), pcr_pid,
+                            True)
+    if first_pcr is not None and last_pcr is not None:
+        if last_pcr < first_pcr:
+            last_pcr += (1 << 33) * 300
+        duration = (last_pcr - first_pcr) / 27000000
+        if duration > 0:
+            format_data['duration'] = duration
+    return streams, format_data
+
+
+def _find_ts_pcr(data, packet_size: int, offset: int, start: int, end: int, pcr_pid: int, last: bool):
+    for pid, pusi, payload, payload_end, pcr in _iter_ts_packets(data, packet_size, offset, start, end, last):
+        if pid == pcr_pid and pcr is not None:
+            return pcr
+    return None
+
+
+# ---- MXF ----
+
+_MXF_HEADER_PARTITION_KEY = b'\x06\x0e\x2b\x34\x02\x05\x01\x01\x0d\x01\x02\x01\x01\x02'
+_MXF_SET_KEY = b'\x06\x0e\x2b\x34\x02\x53\x01\x01\x0d\x01\x01\x01\x01\x01'
+_MXF_OP_KEY = b'\x06\x0e\x2b\x34\x04\x01\x01'
+_MXF_OP_KEY_TAIL = b'\x0d\x01\x02\x01\x01\x01'
+
+_MXF_DESCRIPTORS = {
+    0x27: 'video',
+    0x28: 'video',
+    0x29: 'video',
+    0x51: 'video',
+    0x42: 'audio',
+    0x47: 'audio',
+    0x48: 'audio',
+    0x43: 'data',
+    0x5B: 'data',
+    0x5C: 'data',
+}
+
+_MXF_STRUCTURAL_SETS = frozenset([
+    0x0F, 0x10, 0x11, 0x14, 0x18, 0x23, 0x2E, 0x2F, 0x30, 0x32, 0x33, 0x36, 0x37, 0x39, 0x3A, 0x3B, 0x3F, 0x41, 0x44,
+    0x45, 0x4A,
+])
+
+
+def _read_ber_length(data, pos: int) -> tuple:
+    length = data[pos]
+    if length < 0x80:
+        return length, pos + 1
+    size = length & 0x7F
+    return int.from_bytes(data[pos + 1:pos + 1 + size], 'big'), pos + 1 + size
+
+
+def _iter_klv(data, start: int, end: int):
+    pos = start
+    while pos + 17 <= end:
+        key = data[pos:pos + 16]
+        length, value = _read_ber_length(data, pos + 16)
+        yield key, value, value + length
+        pos = value + length
+
+
+def _probe_mxf(data) -> tuple:
+    partition = data.find(_MXF_HEADER_PARTITION_KEY, 0, MXF_RUN_IN_SIZE)
+    if partition < 0:
+        return None, None
+    status = data[partition + 14]
+    if status not in (0x03, 0x04):
+        raise _UnsupportedException('Header partition is incomplete')
+    length, value = _read_ber_length(data, partition + 16)
+    header_byte_count = _unpack_from('>Q', data, value + 32)[0]
+    op = data[value + 64:value + 80]
+    if op[:7] != _MXF_OP_KEY or op[8:14] != _MXF_OP_KEY_TAIL:
+        raise _UnsupportedException('Only OP1a files are supported')
+    metadata_start = value + length
+    streams = []
+    for key, start, end in _iter_klv(data, metadata_start, metadata_start + header_byte_count):
+        if key[:14] != _MXF_SET_KEY:
+            continue
+        set_type = key[14]
+        if set_type in _MXF_DESCRIPTORS:
+            stream = {'codec_type': _MXF_DESCRIPTORS[set_type]}
+            if stream['codec_type'] == 'audio':
+                for tag, t_start, t_end in _iter_local_tags(data, start, end):
+                    if tag == 0x3D03:
+                        num, den = _unpack_from('>ii', data, t_start)
+                        if den:
+                            stream['sample_rate'] = str(num // den)
+                    elif tag == 0x3D07:
+                        stream['channels'] = _unpack_from('>I', data, t_start)[0]
+            streams.append(stream)
+        elif set_type not in _MXF_STRUCTURAL_SETS:
+            raise _UnsupportedException('Unknown metadata set 0x{:02x}'.format(set_type))
+    return streams, {}
+
+
+def _iter_local_tags(data, start: int, end: int):
+    while start + 4 <= end:
+        tag, length = _unpack_from('>HH', data, start)
+        yield tag, start + 4, start + 4 + length
+        start += 4 + length
@@ -0,0 +1,199 @@
+""" Модуль с классом `DedupIndex` - индексом уже обработанного содержимого
+
+Действия, поддерживающие дедупликацию, перед выполнением работы спрашивают у индекса, не обрабатывалось ли уже такое же
+содержимое тем же самым способом (в этом или в одном из предыдущих запусков), и если обрабатывалось - вместо
+повторной работы делают уже полученный результат доступным в новом месте.
+
+Экземпляр индекса, если дедупликация включена, хранится в `dedup_index`.
+"""
+
+import json
+import logging
+import os
+
+from utils import out_tree
+from utils.fingerprint import get_fingerprint, get_full_hash
+from utils.file_link import materialize
+
+MODES = ('link', 'manifest')
+MANIFEST_FILENAME = 'autoarchive_dedup.jsonl'
+
+dedup_index = None
+
+
+class DedupIndex:
+    """ Индекс обработанного содержимого, хранящийся в базе SQLite
+
+    Поиск ведётся по дешёвому отпечатку (размер и хэш фрагментов) - полный хэш входного файла и найденных кандидатов
+    вычисляется только при совпадении дешёвых отпечатков.
+
+    Найденный результат переносится в новое место в зависимости от режима:
+
+    - `link` - ссылкой reflink, жёсткой ссылкой или, если ни то, ни другое невозможно, копированием
+    - `manifest` - в выходной папке в файл `autoarchive_dedup.jsonl` дописывается ссылка на уже существующий результат
+    """
+
+    COMMIT_EVERY = 100
+
+    def __init__(self, db_path: str, mode: str):
+        """
+
+        Args:
+            db_path: путь к файлу базы данных
+            mode: режим переноса результата - `link` или `manifest`
+        """
+        import sqlite3
+
+        if mode not in MODES:
+            raise ValueError('Unknown deduplication mode: {}'.format(mode))
+        self._mode = mode
+        self._uncommitted = 0
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        logging.debug('Opening deduplication index "{}"...'.format(db_path))
+        self._db = sqlite3.connect(db_path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS processed ('
+            'id INTEGER PRIMARY KEY, size INTEGER NOT NULL, sample_hash TEXT NOT NULL, full_hash TEXT, '
+            'path TEXT NOT NULL, action_key TEXT NOT NULL, outputs TEXT NOT NULL, mtime_ns INTEGER)'
+        )
+        if 'mtime_ns' not in [c[1] for c in self._db.execute('PRAGMA table_info(processed)')]:
+            self._db.execute('ALTER TABLE processed ADD COLUMN mtime_ns INTEGER')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS processed_fingerprint ON processed (size, sample_hash, action_key)'
+        )
+        self._db.commit()
+        self._manifests = {}
+
+    def find(self, input_url: str, action_key: str):
+        """ Ищет результат обработки такого же содержимого тем же способом
+
+        Args:
+            input_url: путь к входному файлу
+            action_key: строка, однозначно описывающая выполняемую обработку
+
+        Полный хэш кандидата, если он не был сохранён, вычисляется по его входному файлу - только если размер и время
+        изменения этого файла с момента обработки не изменились (иначе его содержимое может уже не соответствовать
+        выходным файлам).
+
+        Returns:
+            Список путей к выходным файлам найденного результата или None, если ничего не найдено
+        """
+        fingerprint = get_fingerprint(input_url)
+        candidates = self._db.execute(
+            'SELECT id, full_hash, path, outputs, mtime_ns FROM processed '
+            'WHERE size = ? AND sample_hash = ? AND action_key = ?',
+            (fingerprint.size, fingerprint.sample_hash, action_key)
+        ).fetchall()
+        for row_id, full_hash, path, outputs, mtime_ns in candidates:
+            outputs = json.loads(outputs)
+            if not all([os.path.isfile(o) for o in outputs]):
+                continue
+            if full_hash is None:
+                try:
+                    stat = os.stat(path)
+                    if stat.st_size != fingerprint.size or stat.st_mtime_ns != mtime_ns:
+                        logging.debug('Unable to verify deduplication candidate "{}" - its source has changed'.format(
+                            path))
+                        continue
+                    full_hash = fingerprint.full_hash if path == input_url else get_full_hash(path)
+                except OSError:
+                    logging.debug('Unable to verify deduplication candidate "{}" - its source is gone'.format(path))
+                    continue
+                self._db.execute('UPDATE processed SET full_hash = ? WHERE id = ?', (full_hash, row_id))
+                self._uncommitted += 1
+            if full_hash == fingerprint.full_hash:
+                logging.debug('Duplicate of "{}" found: {}'.format(path, outputs))
+                return outputs
+        return None
+
+    def reuse(self, input_url: str, action_key: str, out_paths: list, simulate: bool) -> bool:
+        """ Переносит в `out_paths` результат обработки такого же содержимого, если он есть
+
+        Args:
+            input_url: путь к входному файлу
+            action_key: строка, однозначно описывающая выполняемую обработку
+            out_paths: пути к выходным файлам, которые должны появиться в результате обработки
+            simulate: флаг симуляции
+
+        Returns:
+            True, если результат был найден и повторная обработка не нужна
+        """
+        if self._mode == 'manifest' and all([self._is_referenced(p, input_url) for p in out_paths]):
+            logging.info('Input is already referenced in the deduplication manifest - skipping')
+            return True
+        outputs = self.find(input_url, action_key)
+        if outputs is None or len(outputs) != len(out_paths):
+            return False
+        for src, dst in zip(outputs, out_paths):
+            if self._mode == 'link':
+                logging.info('Input is a duplicate - linking "{}" to "{}"...'.format(src, dst))
+                if not simulate:
+                    method = materialize(src, dst)
+                    out_tree.add(dst)
+                    logging.debug('Materialized using {}'.format(method))
+            else:
+                manifest_path = os.path.join(os.path.dirname(dst), MANIFEST_FILENAME)
+                logging.info('Input is a duplicate - referencing "{}" in "{}"...'.format(src, manifest_path))
+                if not simulate:
+                    with open(manifest_path, 'a', encoding='utf-8') as m_file:
+                        m_file.write(json.dumps({'name': os.path.basename(dst), 'ref': src, 'input': input_url}))
+                        m_file.write('\n')
+                    out_tree.add(manifest_path)
+                    self._get_manifest(manifest_path).add((os.path.basename(dst), input_url))
+        # В режиме manifest новых выходных файлов не появляется - записывать в индекс нечего
+        if not simulate and self._mode == 'link':
+            self.record(input_url, action_key, out_paths)
+        return True
+
+    def _get_manifest(self, manifest_path: str) -> set:
+        """ Возвращает множество пар (имя выходного файла, входной файл), на которые уже есть ссылки в манифесте
+
+        """
+        references = self._manifests.get(manifest_path)
+        if references is None:
+            references = set()
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as m_file:
+                    for line in m_file:
+                        if line.strip():
+                            entry = json.loads(line)
+                            references.add((entry['name'], entry['input']))
+            except FileNotFoundError:
+                pass
+            self._manifests[manifest_path] = references
+        return references
+
+    def _is_referenced(self, out_path: str, input_url: str) -> bool:
+        manifest_path = os.path.join(os.path.dirname(out_path), MANIFEST_FILENAME)
+        if not out_tree.exists(manifest_path):
+            return False
+        return (os.path.basename(out_path), input_url) in self._get_manifest(manifest_path)
+
+    def record(self, input_url: str, action_key: str, out_paths: list) -> None:
+        """ Сохраняет в индексе результат обработки
+
+        Args:
+            input_url: путь к входному файлу
+            action_key: строка, однозначно описывающая выполненную обработку
+            out_paths: пути к полученным выходным файлам
+        """
+        fingerprint = get_fingerprint(input_url)
+        self._db.execute(
+            'INSERT INTO processed (size, sample_hash, full_hash, path, action_key, outputs, mtime_ns) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (fingerprint.size, fingerprint.sample_hash, fingerprint.known_full_hash, input_url, action_key,
+             json.dumps(out_paths), fingerprint.mtime_ns)
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def close(self) -> None:
+        """ Сохраняет все изменения и закрывает базу данных
+
+        """
+        self._db.commit()
+        self._db.close()
@@ -0,0 +1,76 @@
+""" Функции для быстрого "копирования" уже существующих файлов
+
+"""
+
+import logging
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FICLONE = 0x40049409
+
+DEFAULT_METHODS = ('reflink', 'hardlink', 'copy')
+
+
+def reflink(src: str, dst: str) -> None:
+    """ Создаёт копию файла, разделяющую с оригиналом блоки данных (ioctl `FICLONE` - btrfs, XFS и т.п.)
+
+    Args:
+        src: путь к исходному файлу
+        dst: путь к создаваемому файлу
+
+    Raises:
+        OSError: если платформа или файловая система не поддерживают операцию
+    """
+    if fcntl is None:
+        raise OSError('Reflinks are not supported on this platform')
+    with open(src, 'rb') as s_file:
+        with open(dst, 'xb') as d_file:
+            try:
+                fcntl.ioctl(d_file.fileno(), FICLONE, s_file.fileno())
+            except OSError:
+                d_file.close()
+                os.remove(dst)
+                raise
+
+
+def materialize(src: str, dst: str, methods: tuple = DEFAULT_METHODS) -> str:
+    """ Делает содержимое файла `src` доступным по пути `dst` первым сработавшим способом
+
+    Args:
+        src: путь к существующему файлу
+        dst: путь, по которому должен появиться файл
+        methods: способы в порядке предпочтения - `reflink`, `hardlink`, `copy`
+
+    Returns:
+        Название использованного способа
+
+    Raises:
+        FileExistsError: если `dst` уже существует
+        OSError: если ни один из способов не сработал
+    """
+    if os.path.lexists(dst):
+        raise FileExistsError('Output file "{}" already exists'.format(dst))
+    error = None
+    for method in methods:
+        try:
+            if method == 'reflink':
+                reflink(src, dst)
+            elif method == 'hardlink':
+                os.link(src, dst)
+            elif method == 'copy':
+                shutil.copy2(src, dst)
+            else:
+                raise ValueError('Unknown materialization method: {}'.format(method))
+        except FileExistsError:
+            raise
+        except OSError as e:
+            logging.debug('Unable to {} "{}" to "{}": {}'.format(method, src, dst, str(e)))
+            error = e
+        else:
+            return method
+    raise error
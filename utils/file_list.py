@@ -1,14 +1,101 @@
 import logging
 import os
 
+from concurrent.futures import ThreadPoolExecutor
 
-def build_file_list(input_path: str) -> tuple:
-    logging.debug('Building file list...')
+
+def build_file_list(input_path: str, dir_filter=None, workers: int = 1) -> tuple:
+    return build_file_lists([input_path], dir_filter, workers)[0]
+
+
+def build_file_lists(input_paths: list, dir_filter=None, workers: int = 1) -> list:
+    """ Составляет списки файлов для нескольких входных папок
+
+    При `workers` больше 1 содержимое папок читается параллельно в пуле потоков - на сетевых хранилищах обход
+    упирается в задержку каждого обращения к серверу, а не в пропускную способность. Порядок папок и файлов в
+    результате совпадает с порядком `os.walk`.
+
+    Args:
+        input_paths: пути к входным папкам
+        dir_filter: функция, получающая относительный путь к папке и возвращающая False, если в неё не нужно спускаться
+        workers: количество потоков
+
+    Returns:
+        Список пар (список папок с файлами, количество файлов) - по одной для каждой входной папки
+    """
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            scans = [executor.submit(_scan, executor, input_path, '', dir_filter) for input_path in input_paths]
+            return [_collect(input_path, scan) for input_path, scan in zip(input_paths, scans)]
+    return [_walk(input_path, dir_filter) for input_path in input_paths]
+
+
+def _walk(input_path: str, dir_filter) -> tuple:
+    logging.debug('Building file list for "{}"...'.format(input_path))
     dir_list = []
     file_count = 0
+    pruned_count = 0
     for path, dirs, files in os.walk(input_path):
+        rel_in_dir = path[len(input_path) + 1:]
         if len(files):
-            dir_list.append({'rel_in_dir': path[len(input_path) + 1:], 'files': files})
+            dir_list.append({'rel_in_dir': rel_in_dir, 'files': files})
             file_count += len(files)
-    logging.debug('Found {} files(s) in {} directory(ies)'.format(file_count, len(dir_list)))
+        if dir_filter is not None:
+            dirs_count = len(dirs)
+            dirs[:] = [d for d in dirs if dir_filter(os.path.join(rel_in_dir, d))]
+            pruned_count += dirs_count - len(dirs)
+    _log_result(file_count, dir_list, pruned_count)
     return dir_list, file_count
+
+
+def _scan(executor, input_path: str, rel_in_dir: str, dir_filter) -> tuple:
+    """ Читает содержимое одной папки и сразу ставит в очередь чтение вложенных
+
+    Как и `os.walk`, не спускается по символическим ссылкам на папки и пропускает папки, которые не удалось прочитать.
+
+    Returns:
+        Кортеж (относительный путь к папке, файлы, задачи чтения вложенных папок, количество отсечённых папок)
+    """
+    dirs = []
+    files = []
+    try:
+        with os.scandir(os.path.join(input_path, rel_in_dir) if rel_in_dir else input_path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.name)
+                elif not entry.is_symlink():
+                    dirs.append(entry.name)
+    except OSError as e:
+        logging.debug('Can\'t list directory: {}'.format(e))
+    rel_dirs = [os.path.join(rel_in_dir, d) for d in dirs]
+    if dir_filter is not None:
+        rel_dirs = [d for d in rel_dirs if dir_filter(d)]
+    children = [executor.submit(_scan, executor, input_path, d, dir_filter) for d in rel_dirs]
+    return rel_in_dir, files, children, len(dirs) - len(rel_dirs)
+
+
+def _collect(input_path: str, scan) -> tuple:
+    logging.debug('Building file list for "{}"...'.format(input_path))
+    dir_list = []
+    file_count = 0
+    pruned_count = 0
+    stack = [scan]
+    while stack:
+        rel_in_dir, files, children, pruned = stack.pop().result()
+        if len(files):
+            dir_list.append({'rel_in_dir': rel_in_dir, 'files': files})
+            file_count += len(files)
+        pruned_count += pruned
+        stack.extend(reversed(children))
+    _log_result(file_count, dir_list, pruned_count)
+    return dir_list, file_count
+
+
+def _log_result(file_count: int, dir_list: list, pruned_count: int) -> None:
+    logging.debug('Found {} files(s) in {} directory(ies)'.format(file_count, len(dir_list)))
+    if pruned_count:
+        logging.debug('Pruned {} directory(ies) that can\'t contain matching files'.format(pruned_count))
@@ -0,0 +1,110 @@
+""" Функции для вычисления "отпечатков" содержимого файлов
+
+Дешёвый отпечаток - размер файла и хэш нескольких фрагментов из его начала, середины и конца. Для небольших файлов
+фрагменты покрывают файл целиком, поэтому дешёвый отпечаток совпадает с полным. Полный хэш нужно вычислять только тогда,
+когда дешёвые отпечатки двух файлов совпали.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_COUNT = 3
+READ_SIZE = 1024 * 1024
+
+
+def get_sample_fingerprint(path: str) -> tuple:
+    """ Вычисляет дешёвый отпечаток файла
+
+    Args:
+        path: путь к файлу
+
+    Returns:
+        Кортеж из размера файла, хэша фрагментов и признака того, что хэш фрагментов является полным хэшем
+    """
+    size = os.path.getsize(path)
+    if size <= SAMPLE_SIZE * SAMPLE_COUNT:
+        return size, get_full_hash(path), True
+    h = hashlib.sha256()
+    step = (size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+    with open(path, 'rb') as f:
+        for n in range(SAMPLE_COUNT):
+            f.seek(n * step)
+            h.update(f.read(SAMPLE_SIZE))
+    return size, h.hexdigest(), False
+
+
+def get_full_hash(path: str) -> str:
+    """ Вычисляет хэш всего содержимого файла
+
+    Args:
+        path: путь к файлу
+
+    Returns:
+        Хэш в шестнадцатеричном виде
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(READ_SIZE)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+
+class Fingerprint:
+    """ Отпечаток содержимого файла
+
+    Дешёвый отпечаток вычисляется сразу, полный хэш - только при первом обращении к нему.
+    """
+
+    def __init__(self, path: str, stat=None):
+        self.path = path
+        self.mtime_ns = (stat or os.stat(path)).st_mtime_ns
+        self.size, self.sample_hash, is_full = get_sample_fingerprint(path)
+        self._full_hash = self.sample_hash if is_full else None
+
+    @property
+    def known_full_hash(self):
+        """ Полный хэш, если он уже вычислен, иначе - None
+
+        """
+        return self._full_hash
+
+    @property
+    def full_hash(self) -> str:
+        if self._full_hash is None:
+            logging.debug('Calculating full hash of "{}"...'.format(self.path))
+            self._full_hash = get_full_hash(self.path)
+        return self._full_hash
+
+
+_last_fingerprint = None
+_last_fingerprint_lock = threading.Lock()
+
+
+def get_fingerprint(path: str) -> Fingerprint:
+    """ Возвращает отпечаток файла
+
+    Отпечаток последнего файла запоминается - индексам, которые обращаются к одному и тому же файлу друг за другом, не
+    приходится читать его повторно. Запомненный отпечаток используется, только если размер и время изменения файла
+    остались прежними.
+
+    Args:
+        path: путь к файлу
+
+    Returns:
+        Отпечаток
+    """
+    global _last_fingerprint
+    stat = os.stat(path)
+    with _last_fingerprint_lock:
+        fingerprint = _last_fingerprint
+        if fingerprint is None or (fingerprint.path, fingerprint.size, fingerprint.mtime_ns) != (
+                path, stat.st_size, stat.st_mtime_ns):
+            fingerprint = Fingerprint(path, stat)
+            _last_fingerprint = fingerprint
+        return fingerprint
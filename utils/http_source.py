@@ -0,0 +1,452 @@
+""" Модуль для работы с входными файлами, доступными по HTTP(S)
+
+Файлы не скачиваются целиком перед обработкой:
+
+- дерево файлов получается из манифеста (JSON) или из страниц-индексов папок (как у nginx, Apache или
+  `python -m http.server`)
+- заголовки контейнеров читаются запросами диапазонов (`RangeReader`)
+- ffmpeg получает URL напрямую
+- копирование выполняется параллельными запросами диапазонов
+
+Все запросы идут через пул постоянных (keep-alive) соединений `HttpPool`. Экземпляр пула, если он настроен, хранится в
+`http_pool`; функции модуля без него создают пул с параметрами по умолчанию.
+"""
+
+import http.client
+import json
+import logging
+import os
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import unquote, urljoin, urlsplit
+
+from utils import io_shaping
+from utils.urls import get_basename, is_url, join
+
+CHUNK_SIZE = 1024 * 1024
+BLOCK_SIZE = 64 * 1024
+BLOCK_CACHE_SIZE = 64
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+http_pool = None
+_default_pool_lock = threading.Lock()
+
+
+class HttpException(RuntimeError):
+    """ Запускается, если сервер ответил ошибкой
+
+    """
+    pass
+
+
+class HttpPool:
+    """ Пул постоянных соединений с HTTP(S) серверами
+
+    Соединения к каждому серверу хранятся в отдельном списке свободных; соединение, на котором произошла ошибка,
+    закрывается и не возвращается в пул.
+    """
+
+    def __init__(self, connections: int = 8, range_workers: int = 4, chunk_size: int = 8 * 1024 * 1024,
+                 timeout: float = 60):
+        """
+
+        Args:
+            connections: наибольшее количество свободных соединений к одному серверу
+            range_workers: количество параллельных запросов диапазонов при копировании одного файла
+            chunk_size: размер диапазона при копировании
+            timeout: время ожидания ответа сервера в секундах
+        """
+        self._max_idle = connections
+        self.range_workers = range_workers
+        self.chunk_size = chunk_size
+        self._timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _get_connection(self, scheme: str, netloc: str):
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(netloc, timeout=self._timeout)
+
+    def _release_connection(self, scheme: str, netloc: str, connection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self._max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, url: str, method: str = 'GET', headers: dict = None, stream=None) -> tuple:
+        """ Выполняет запрос
+
+        Перенаправления (не больше `MAX_REDIRECTS`) выполняются; остальные ответы, кроме 200 и 206, считаются ошибкой.
+
+        Args:
+            url: URL
+            method: метод
+            headers: заголовки запроса
+            stream: файловый объект, в который пишется тело ответа; если не задан - тело возвращается
+
+        Returns:
+            Кортеж (код ответа, заголовки ответа, тело ответа или None, если оно записано в `stream`)
+
+        Raises:
+            HttpException: если сервер ответил ошибкой или перенаправлений слишком много
+        """
+        for redirect in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._request(url, method, headers, stream)
+            if status in (200, 206):
+                return status, response_headers, body
+            location = response_headers.get('Location')
+            if status not in REDIRECT_STATUSES or not location:
+                raise HttpException('{} {} - {}'.format(method, url, status))
+            logging.debug('Redirected from {} to {}'.format(url, location))
+            url = urljoin(url, location)
+            if status == 303 and method != 'HEAD':
+                method = 'GET'
+        raise HttpException('{} {} - too many redirects'.format(method, url))
+
+    def _request(self, url: str, method: str, headers: dict, stream) -> tuple:
+        parts = urlsplit(url)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        for attempt in (0, 1):
+            connection = self._get_connection(parts.scheme, parts.netloc)
+            try:
+                connection.request(method, target, headers=headers or {})
+                response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Сервер закрыл постоянное соединение, пока оно было свободно - повторяем запрос на новом
+                connection.close()
+                if attempt:
+                    raise
+            except Exception:
+                connection.close()
+                raise
+        try:
+            if stream is None or response.status not in (200, 206):
+                body = response.read()
+            else:
+                body = None
+                while True:
+                    data = response.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    stream.write(data)
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._release_connection(parts.scheme, parts.netloc, connection)
+        return response.status, response.headers, body
+
+    def get_size(self, url: str) -> tuple:
+        """ Определяет размер файла и поддержку запросов диапазонов запросом HEAD
+
+        Args:
+            url: URL файла
+
+        Returns:
+            Пара (размер или None, если сервер его не сообщил; поддерживает ли сервер запросы диапазонов)
+        """
+        status, headers, body = self.request(url, 'HEAD')
+        length = headers.get('Content-Length')
+        return (int(length) if length is not None else None), headers.get('Accept-Ranges', '').lower() == 'bytes'
+
+    def read_range(self, url: str, start: int, end: int) -> bytes:
+        """ Читает диапазон байт файла
+
+        Args:
+            url: URL файла
+            start: первый байт
+            end: байт, следующий за последним
+
+        Returns:
+            Прочитанные байты
+        """
+        status, headers, body = self.request(url, headers={'Range': 'bytes={}-{}'.format(start, end - 1)})
+        if status != 206:
+            return body[start:end]
+        return body
+
+    def close(self) -> None:
+        """ Закрывает все свободные соединения
+
+        """
+        with self._lock:
+            for idle in self._idle.values():
+                for connection in idle:
+                    connection.close()
+            self._idle = {}
+
+
+def get_pool() -> HttpPool:
+    """ Возвращает настроенный пул соединений или создаёт пул с параметрами по умолчанию
+
+    """
+    global http_pool
+    with _default_pool_lock:
+        if http_pool is None:
+            http_pool = HttpPool()
+        return http_pool
+
+
+class RangeReader:
+    """ Файл, доступный по HTTP, с побайтовым доступом как к `bytes` (`len`, индексы, срезы и `find`)
+
+    Данные читаются запросами диапазонов блоками по `BLOCK_SIZE`; последние прочитанные блоки кэшируются. Подходит
+    для разбора заголовков контейнеров без загрузки всего файла.
+    """
+
+    def __init__(self, url: str, pool: HttpPool = None):
+        self._url = url
+        self._pool = pool or get_pool()
+        size, ranges = self._pool.get_size(url)
+        if size is None or not ranges:
+            raise HttpException('Server doesn\'t support range requests for {}'.format(url))
+        self._size = size
+        self._blocks = OrderedDict()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _get_block(self, n: int) -> bytes:
+        block = self._blocks.get(n)
+        if block is None:
+            start = n * BLOCK_SIZE
+            block = self._pool.read_range(self._url, start, min(self._size, start + BLOCK_SIZE))
+            self._blocks[n] = block
+            while len(self._blocks) > BLOCK_CACHE_SIZE:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(n)
+        return block
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self._size)
+            if step != 1:
+                raise ValueError('Only contiguous slices are supported')
+            if start >= stop:
+                return b''
+            return b''.join([
+                self._get_block(n)[max(start - n * BLOCK_SIZE, 0):stop - n * BLOCK_SIZE]
+                for n in range(start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE + 1)
+            ])
+        if item < 0:
+            item += self._size
+        if not 0 <= item < self._size:
+            raise IndexError('RangeReader index out of range')
+        return self._get_block(item // BLOCK_SIZE)[item % BLOCK_SIZE]
+
+    def find(self, sub: bytes, start: int = 0, end: int = None) -> int:
+        pos = self[start:end].find(sub)
+        return pos + start if pos >= 0 else -1
+
+    def close(self) -> None:
+        self._blocks.clear()
+
+
+class _IndexParser(HTMLParser):
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+
+def _list_index(pool: HttpPool, dir_url: str) -> tuple:
+    """ Читает страницу-индекс папки
+
+    Учитываются только ссылки на содержимое самой папки: ссылки на родительские папки, на другие серверы, с
+    параметрами запроса и якорями пропускаются.
+
+    Returns:
+        Пара (имена папок, имена файлов)
+    """
+    status, headers, body = pool.request(dir_url)
+    parser = _IndexParser()
+    parser.feed(body.decode(headers.get_content_charset() or 'utf-8', 'replace'))
+    dirs = []
+    files = []
+    for href in parser.links:
+        url = urljoin(dir_url, href)
+        if '?' in href or '#' in href or not url.startswith(dir_url) or url == dir_url:
+            continue
+        name = unquote(url[len(dir_url):])
+        if name.endswith('/') and '/' not in name[:-1]:
+            dirs.append(name[:-1])
+        elif '/' not in name and name not in files:
+            files.append(name)
+    return dirs, files
+
+
+def _parse_manifest(data) -> list:
+    """ Возвращает нормализованные относительные пути из манифеста
+
+    Пути с разделителем `\\`, абсолютные, с пустыми частями или с `..` пропускаются - иначе выходной путь мог бы
+    оказаться за пределами выходной папки.
+    """
+    files = data['files'] if isinstance(data, dict) else data
+    result = []
+    for f in files:
+        path = f['path'] if isinstance(f, dict) else f
+        parts = [p for p in path.split('/') if p != '.']
+        if '\\' in path or path.startswith('/') or not parts or '' in parts or '..' in parts:
+            logging.warning('Skipping invalid manifest path: "{}"'.format(path))
+            continue
+        result.append('/'.join(parts))
+    return result
+
+
+def _is_allowed(allowed: dict, rel_dir: str, dir_filter) -> bool:
+    """ Проверяет, не отсечена ли папка или одна из её родительских папок, запоминая результаты в `allowed`
+
+    """
+    if rel_dir not in allowed:
+        allowed[rel_dir] = _is_allowed(allowed, os.path.dirname(rel_dir), dir_filter) and (
+            dir_filter is None or dir_filter(rel_dir))
+    return allowed[rel_dir]
+
+
+def is_tree(url: str, pool: HttpPool = None) -> bool:
+    """ Проверяет, указывает ли URL на папку (страницу-индекс) или манифест, а не на отдельный файл
+
+    URL, оканчивающиеся на `/` или `.json`, считаются деревом без запроса к серверу, остальные - по типу содержимого
+    из ответа на запрос HEAD. Поэтому отдельный файл HTML или JSON можно обработать, только указав его в манифесте или
+    через индекс папки.
+    """
+    if url.endswith(('/', '.json')):
+        return True
+    status, headers, body = (pool or get_pool()).request(url, 'HEAD')
+    return headers.get_content_type() in ('text/html', 'application/json')
+
+
+def list_tree(url: str, dir_filter=None, workers: int = 1, pool: HttpPool = None) -> tuple:
+    """ Составляет список файлов удалённой папки
+
+    Если по URL отдаётся JSON, он считается манифестом - списком относительных путей к файлам (строк или объектов с
+    ключом `path`) либо объектом с таким списком в ключе `files`. Иначе URL считается страницей-индексом папки, и
+    вложенные папки обходятся по ссылкам (при `workers` больше 1 - параллельно).
+
+    Args:
+        url: URL манифеста или папки
+        dir_filter: функция, получающая относительный путь к папке и возвращающая False, если в неё не нужно спускаться
+        workers: количество потоков для обхода папок
+        pool: пул соединений
+
+    Returns:
+        Кортеж (URL корневой папки, список в формате `utils.file_list.build_file_list`, количество файлов)
+    """
+    pool = pool or get_pool()
+    status, headers, body = pool.request(url)
+    if headers.get_content_type() == 'application/json' or url.endswith('.json'):
+        logging.debug('Reading manifest "{}"...'.format(url))
+        base_url = url.rsplit('/', 1)[0]
+        dir_list = []
+        dir_index = {}
+        allowed = {'': True}
+        for path in _parse_manifest(json.loads(body.decode('utf-8'))):
+            rel_in_dir, name = path.rpartition('/')[::2]
+            rel_in_dir = rel_in_dir.replace('/', os.sep)
+            if not _is_allowed(allowed, rel_in_dir, dir_filter):
+                continue
+            if rel_in_dir not in dir_index:
+                dir_index[rel_in_dir] = {'rel_in_dir': rel_in_dir, 'files': []}
+                dir_list.append(dir_index[rel_in_dir])
+            dir_index[rel_in_dir]['files'].append(name)
+        return base_url, dir_list, sum([len(d['files']) for d in dir_list])
+
+    base_url = url if url.endswith('/') else url + '/'
+
+    def _scan(executor, rel_in_dir: str):
+        dirs, files = _list_index(pool, join(base_url, rel_in_dir) + '/' if rel_in_dir else base_url)
+        rel_dirs = [os.path.join(rel_in_dir, d) for d in dirs]
+        if dir_filter is not None:
+            rel_dirs = [d for d in rel_dirs if dir_filter(d)]
+        if executor is None:
+            return rel_in_dir, files, [(None, d) for d in rel_dirs]
+        return rel_in_dir, files, [executor.submit(_scan, executor, d) for d in rel_dirs]
+
+    logging.debug('Reading directory index "{}"...'.format(base_url))
+    dir_list = []
+    file_count = 0
+    executor = ThreadPoolExecutor(workers) if workers > 1 else None
+    try:
+        stack = [executor.submit(_scan, executor, '') if executor is not None else (None, '')]
+        while stack:
+            item = stack.pop()
+            rel_in_dir, files, children = item.result() if executor is not None else _scan(None, item[1])
+            if files:
+                dir_list.append({'rel_in_dir': rel_in_dir, 'files': files})
+                file_count += len(files)
+            stack.extend(reversed(children))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return base_url.rstrip('/'), dir_list, file_count
+
+
+def copy_url(url: str, dst: str, pool: HttpPool = None) -> None:
+    """ Копирует файл, доступный по HTTP, параллельными запросами диапазонов
+
+    Если сервер не поддерживает запросы диапазонов или файл меньше одного диапазона, файл копируется одним запросом.
+    Ограничения `io_limits` для выходного пути учитываются. Файл пишется под временным именем и переименовывается
+    только после успешного копирования, поэтому при ошибке недописанный файл не остаётся.
+
+    Args:
+        url: URL файла
+        dst: путь к выходному файлу
+        pool: пул соединений
+    """
+    pool = pool or get_pool()
+    size, ranges = pool.get_size(url)
+    tmp_path = dst + '.part'
+    try:
+        if size is None or not ranges or size <= pool.chunk_size or pool.range_workers < 2:
+            with io_shaping.open_file(tmp_path, 'wb') as d_file:
+                pool.request(url, stream=d_file)
+        else:
+            _copy_ranges(pool, url, tmp_path, size)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_ranges(pool: HttpPool, url: str, path: str, size: int) -> None:
+    logging.debug('Copying {} byte(s) in {} byte ranges...'.format(size, pool.chunk_size))
+    with open(path, 'wb') as d_file:
+        d_file.truncate(size)
+
+    def _copy_range(start: int) -> None:
+        end = min(size, start + pool.chunk_size)
+        with io_shaping.open_file(path, 'r+b') as d_file:
+            d_file.seek(start)
+            pool.request(url, headers={'Range': 'bytes={}-{}'.format(start, end - 1)}, stream=d_file)
+            if d_file.tell() != end:
+                raise HttpException('Incomplete range {}-{} of {}'.format(start, end - 1, url))
+
+    with ThreadPoolExecutor(pool.range_workers) as executor:
+        for future in [executor.submit(_copy_range, s) for s in range(0, size, pool.chunk_size)]:
+            future.result()
+
@@ -0,0 +1,282 @@
+""" Модуль с классами для ограничения нагрузки на хранилища
+
+Ограничения (пропускная способность чтения и записи в байтах в секунду, количество операций ввода-вывода в секунду)
+задаются для путей - как правило, точек монтирования - в параметре конфигурации `io_limits`::
+
+    "io_limits": [
+      {
+        "path": "/mnt/san",
+        "schedule": [
+          {"from": "08:00", "to": "20:00", "read_rate": 50000000, "write_rate": 20000000, "iops": 200}
+        ]
+      },
+      {
+        "path": "/mnt/archive",
+        "write_rate": 100000000
+      }
+    ]
+
+Если у правила есть расписание, ограничения действуют только в указанные промежутки времени (промежуток может
+переходить через полночь), в остальное время - никаких ограничений нет. Если расписания нет - ограничения правила
+действуют всегда. Для файла используется правило с самым длинным подходящим путём.
+
+Ограничения реализованы "корзинами маркеров", общими для всех потоков процесса. Экземпляр `IoShaper`, если ограничения
+заданы, хранится в `io_shaper`.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+
+from datetime import datetime
+
+LIMITS = ('read_rate', 'write_rate', 'iops')
+CHUNK_SIZE = 1024 * 1024
+SCHEDULE_CHECK_INTERVAL = 10
+
+io_shaper = None
+
+
+class TokenBucket:
+    """ Потокобезопасная "корзина маркеров"
+
+    Маркеры пополняются со скоростью `rate` в секунду, корзина вмещает не более секундного запаса. Запрос, которому не
+    хватило маркеров, всё равно выполняется, но уходит "в долг" - вызывающий поток засыпает на время, за которое долг
+    будет погашен. Поэтому запросы любого размера не блокируют друг друга дольше необходимого.
+    """
+
+    def __init__(self, rate: float):
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = rate
+        self._timestamp = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._rate, self._tokens + (now - self._timestamp) * self._rate)
+        self._timestamp = now
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = rate
+            self._tokens = min(self._tokens, rate)
+
+    def consume(self, amount: float) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _parse_time(value: str) -> int:
+    hours, minutes = value.split(':')
+    result = int(hours) * 60 + int(minutes)
+    if not 0 <= result <= 24 * 60:
+        raise ValueError('Invalid time of day: {}'.format(value))
+    return result
+
+
+class _Rule:
+
+    def __init__(self, rule: dict):
+        if 'path' not in rule:
+            raise ValueError('I/O limits rule must have a "path" property')
+        self.path = os.path.normcase(os.path.abspath(rule['path']))
+        if 'schedule' in rule:
+            self.schedule = [
+                (_parse_time(w['from']), _parse_time(w['to']), dict([(k, w.get(k)) for k in LIMITS]))
+                for w in rule['schedule']
+            ]
+        else:
+            self.schedule = [(0, 24 * 60, dict([(k, rule.get(k)) for k in LIMITS]))]
+        self.buckets = {}
+        self.checked_at = None
+
+    def get_limits(self, minute_of_day: int) -> dict:
+        for start, end, limits in self.schedule:
+            if start <= end and start <= minute_of_day < end or \
+                    start > end and (minute_of_day >= start or minute_of_day < end):
+                return limits
+        return {}
+
+    def update(self) -> None:
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < SCHEDULE_CHECK_INTERVAL:
+            return
+        self.checked_at = now
+        current = datetime.now()
+        limits = self.get_limits(current.hour * 60 + current.minute)
+        for k in LIMITS:
+            rate = limits.get(k)
+            if not rate:
+                if self.buckets.pop(k, None) is not None:
+                    logging.info('I/O limit {} for "{}" is lifted'.format(k, self.path))
+            elif k not in self.buckets:
+                logging.info('I/O limit {} for "{}" is set to {}'.format(k, self.path, rate))
+                self.buckets[k] = TokenBucket(rate)
+            elif self.buckets[k].rate != rate:
+                logging.info('I/O limit {} for "{}" is changed to {}'.format(k, self.path, rate))
+                self.buckets[k].set_rate(rate)
+
+
+class IoShaper:
+    """ Класс, ограничивающий нагрузку на хранилища
+
+    """
+
+    def __init__(self, limits: list):
+        """
+
+        Args:
+            limits: список правил из параметра конфигурации `io_limits`
+
+        Raises:
+            ValueError: если правила описаны неверно
+        """
+        self._rules = sorted([_Rule(r) for r in limits], key=lambda r: len(r.path), reverse=True)
+        self._lock = threading.Lock()
+
+    def _get_buckets(self, path: str) -> dict:
+        """ Возвращает действующие сейчас ограничения для пути
+
+        Возвращается копия, снятая под блокировкой: обновление расписания в другом потоке может удалить ограничение
+        из правила, пока вызывающий поток с ним работает.
+        """
+        path = os.path.normcase(os.path.abspath(path))
+        for rule in self._rules:
+            if path == rule.path or path.startswith(rule.path.rstrip(os.sep) + os.sep):
+                with self._lock:
+                    rule.update()
+                    return dict(rule.buckets)
+        return {}
+
+    def is_limited(self, path: str) -> bool:
+        """ Проверяет, действуют ли сейчас для пути какие-нибудь ограничения
+
+        Args:
+            path: путь к файлу
+
+        Returns:
+            True, если действуют
+        """
+        return bool(self._get_buckets(path))
+
+    def get_rate(self, path: str, direction: str):
+        """ Возвращает действующее сейчас ограничение пропускной способности для пути
+
+        Args:
+            path: путь к файлу
+            direction: `read` или `write`
+
+        Returns:
+            Байт в секунду или None, если ограничения нет
+        """
+        bucket = self._get_buckets(path).get('{}_rate'.format(direction))
+        return None if bucket is None else bucket.rate
+
+    def throttle(self, path: str, direction: str, amount: int) -> None:
+        """ Учитывает операцию ввода-вывода и, если нужно, приостанавливает вызывающий поток
+
+        Args:
+            path: путь к файлу
+            direction: `read` или `write`
+            amount: количество прочитанных или записанных байт
+        """
+        buckets = self._get_buckets(path)
+        bucket = buckets.get('iops')
+        if bucket is not None:
+            bucket.consume(1)
+        bucket = buckets.get('{}_rate'.format(direction))
+        if bucket is not None and amount:
+            bucket.consume(amount)
+
+
+class ShapedFile:
+    """ Обёртка над файловым объектом, учитывающая ограничения при чтении и записи
+
+    """
+
+    def __init__(self, file, path: str, shaper: IoShaper):
+        self._file = file
+        self._path = path
+        self._shaper = shaper
+
+    def read(self, *args) -> bytes:
+        data = self._file.read(*args)
+        self._shaper.throttle(self._path, 'read', len(data))
+        return data
+
+    def write(self, data) -> int:
+        result = self._file.write(data)
+        self._shaper.throttle(self._path, 'write', len(data))
+        return result
+
+    def __getattr__(self, item):
+        return getattr(self._file, item)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return self._file.__exit__(*args)
+
+
+def open_file(path: str, mode: str = 'rb', **kwargs):
+    """ Открывает файл с учётом ограничений
+
+    Если ограничения не заданы или не относятся к пути, возвращается обычный файловый объект.
+
+    Args:
+        path: путь к файлу
+        mode: режим открытия
+
+    Returns:
+        Файловый объект
+    """
+    f = open(path, mode, **kwargs)
+    if io_shaper is not None and io_shaper.is_limited(path):
+        return ShapedFile(f, path, io_shaper)
+    return f
+
+
+def throttle(path: str, direction: str, amount: int) -> None:
+    """ Учитывает операцию ввода-вывода, выполненную в обход `open_file`
+
+    Args:
+        path: путь к файлу
+        direction: `read` или `write`
+        amount: количество прочитанных или записанных байт
+    """
+    if io_shaper is not None:
+        io_shaper.throttle(path, direction, amount)
+
+
+def copy_file(src: str, dst: str) -> None:
+    """ Копирует файл (вместе с правами доступа) с учётом ограничений
+
+    Если ограничения не действуют ни для исходного, ни для выходного пути, используется `shutil.copy`.
+
+    Args:
+        src: путь к исходному файлу
+        dst: путь к выходному файлу
+    """
+    if io_shaper is None or not (io_shaper.is_limited(src) or io_shaper.is_limited(dst)):
+        shutil.copy(src, dst)
+        return
+    logging.debug('Copying with I/O limits...')
+    with open_file(src, 'rb') as s_file, open_file(dst, 'wb') as d_file:
+        while True:
+            data = s_file.read(CHUNK_SIZE)
+            if not data:
+                break
+            d_file.write(data)
+    shutil.copymode(src, dst)
@@ -0,0 +1,129 @@
+""" Модуль с функцией проверки метаданных по спецификации фильтра `ffprobe.meta`
+
+Спецификация - словарь, ключи которого:
+
+- `format` - условия на свойства контейнера
+- `count:<тип>` - условие на количество потоков типа `v` (видео), `a` (аудио), `s` (субтитры), `d` (данные) или `t`
+  (вложения)
+- `stream:<тип>:<номер>` - условия на свойства потока с номером среди потоков своего типа
+
+Условие - значение (проверка на равенство), пара `[операция, значение]` или список таких пар (должны выполняться
+все). Операции: `eq`, `ne`, `gt`, `gte`, `lt`, `lte`, `in`.
+
+Проверка трёхзначная: если метаданных не хватает, чтобы вынести решение, возвращается None - в этом случае нужно
+обратиться к ffprobe.
+"""
+
+import operator
+
+OPERATIONS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'in': lambda a, b: a in b,
+}
+
+STREAM_TYPES = {
+    'v': 'video',
+    'a': 'audio',
+    's': 'subtitle',
+    'd': 'data',
+    't': 'attachment',
+}
+
+
+def _get_conditions(condition) -> list:
+    if type(condition) == list and condition:
+        if type(condition[0]) == list:
+            return condition
+        if len(condition) == 2 and condition[0] in OPERATIONS:
+            return [condition]
+    return [['eq', condition]]
+
+
+def _compare(op: str, actual, expected, tolerance: float):
+    """ Проверяет одно условие
+
+    Returns:
+        True, False или None, если значение отличается от заданного не больше, чем на погрешность, и результат
+        проверки поэтому не определён
+    """
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool) and isinstance(actual, str):
+        try:
+            actual = float(actual)
+        except ValueError:
+            return None
+    elif op == 'in' and isinstance(actual, str) and expected and \
+            all([isinstance(e, (int, float)) and not isinstance(e, bool) for e in expected]):
+        try:
+            actual = float(actual)
+        except ValueError:
+            return None
+    if tolerance and isinstance(actual, (int, float)):
+        values = expected if op == 'in' else [expected]
+        if any([isinstance(v, (int, float)) and abs(actual - v) <= abs(v) * tolerance for v in values]):
+            return None
+    return OPERATIONS[op](actual, expected)
+
+
+def _check_fields(conditions: dict, data: dict, tolerances: dict, prefix: str):
+    result = True
+    for field, condition in conditions.items():
+        if field not in data:
+            result = None
+            continue
+        for op, expected in _get_conditions(condition):
+            if op not in OPERATIONS:
+                result = None
+                continue
+            checked = _compare(op, data[field], expected, tolerances.get('{}.{}'.format(prefix, field), 0))
+            if checked is False:
+                return False
+            if checked is None:
+                result = None
+    return result
+
+
+def evaluate(spec: dict, metadata: dict, tolerances: dict = None):
+    """ Проверяет метаданные по спецификации фильтра
+
+    Args:
+        spec: спецификация фильтра
+        metadata: метаданные в формате вывода `ffprobe -show_format -show_streams`; если список потоков в них есть,
+            он должен быть полным
+        tolerances: допустимые относительные погрешности значений, например - `{'format.bit_rate': 0.01}`
+
+    Returns:
+        True, если метаданные соответствуют спецификации, False - если нет, None - если решить нельзя (в том числе
+        если в спецификации есть неизвестные ключи или операции)
+    """
+    tolerances = tolerances or {}
+    result = True
+    for key, conditions in spec.items():
+        parts = key.split(':')
+        if parts[0] == 'format' and len(parts) == 1:
+            checked = _check_fields(conditions, metadata.get('format', {}), tolerances, 'format')
+        elif (parts[0] == 'count' and len(parts) == 2 or parts[0] == 'stream' and len(parts) in (2, 3)) and \
+                parts[1] in STREAM_TYPES:
+            if 'streams' not in metadata:
+                checked = None
+            else:
+                streams = [s for s in metadata['streams'] if s.get('codec_type') == STREAM_TYPES[parts[1]]]
+                if parts[0] == 'count':
+                    checked = _check_fields({'count': conditions}, {'count': len(streams)}, {}, 'count')
+                else:
+                    index = int(parts[2]) if len(parts) == 3 else 0
+                    if index >= len(streams):
+                        checked = False
+                    else:
+                        checked = _check_fields(conditions, streams[index], tolerances, 'stream')
+        else:
+            checked = None
+        if checked is False:
+            return False
+        if checked is None:
+            result = None
+    return result
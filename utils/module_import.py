@@ -1,8 +1,74 @@
+""" Модуль с реестром подключаемых модулей (действий, фильтров, диспетчеров, конвертеров, поставщиков наборов правил)
+
+Классы подключаемых модулей находятся по соглашению об именовании (см. `get_class`), а результат поиска кэшируется -
+импорт модуля и поиск класса выполняются один раз за всё время работы приложения.
+
+Тяжёлые зависимости (например, pyffwrapper и Jinja2) не импортируются при старте. Пакет с подключаемыми модулями
+регистрирует для каждого из них список необходимых зависимостей (`register_plugins`), а точка входа приложения
+регистрирует функции их инициализации (`register_dependency`). Инициализация зависимости выполняется непосредственно
+перед первым импортом модуля, которому она нужна.
+"""
+
 import logging
 import importlib
 
 
 _module_cache = {}
+_class_cache = {}
+_plugin_requirements = {}
+_dependency_initializers = {}
+_initialized_dependencies = set()
+
+
+def register_plugins(module_type: str, plugins: dict) -> None:
+    """ Регистрирует подключаемые модули и их зависимости
+
+    Args:
+        module_type: тип подключаемых модулей, например - `action`
+        plugins: словарь, в котором ключ - название модуля, а значение - список названий необходимых ему зависимостей
+    """
+    for module_id, requires in plugins.items():
+        _plugin_requirements[(module_type, module_id.lower())] = tuple(requires)
+
+
+def get_registered_plugins(module_type: str) -> list:
+    """ Возвращает отсортированный список названий зарегистрированных подключаемых модулей заданного типа
+
+    Args:
+        module_type: тип подключаемых модулей
+
+    Returns:
+        Список названий
+    """
+    return sorted([m_id for m_type, m_id in _plugin_requirements if m_type == module_type])
+
+
+def register_dependency(dependency: str, initializer) -> None:
+    """ Регистрирует функцию инициализации зависимости
+
+    Args:
+        dependency: название зависимости, например - `ffmpeg`
+        initializer: функция без аргументов, которая импортирует и настраивает зависимость
+    """
+    _dependency_initializers[dependency] = initializer
+
+
+def init_dependency(dependency: str) -> None:
+    """ Инициализирует зависимость, если это ещё не было сделано
+
+    Args:
+        dependency: название зависимости
+    """
+    if dependency in _initialized_dependencies:
+        return
+    try:
+        initializer = _dependency_initializers[dependency]
+    except KeyError:
+        logging.debug('Dependency {} has no registered initializer'.format(dependency))
+    else:
+        logging.debug('Initializing dependency {}...'.format(dependency))
+        initializer()
+    _initialized_dependencies.add(dependency)
 
 
 def get_module(module_type: str, module_id: str):
@@ -13,15 +79,25 @@ def get_module(module_type: str, module_id: str):
         logging.debug('Module cache hit')
     except KeyError:
         logging.debug('Module cache miss - importing {}...'.format(module_name))
+        for dependency in _plugin_requirements.get((module_type, module_id.lower()), ()):
+            init_dependency(dependency)
         module = importlib.import_module(module_name)
+        _module_cache[module_name] = module
     return module
 
 
 def get_class(module_type: str, module_id: str):
+    key = (module_type, module_id.lower())
+    try:
+        return _class_cache[key]
+    except KeyError:
+        pass
     module = get_module(module_type, module_id)
     class_name = '{}{}'.format(
         ''.join([v.capitalize() for v in module_id.split('.')]),
         ''.join([v.capitalize() for v in module_type.split(' ')])
     )
     logging.debug('Trying to get {} class {}...'.format(module_type, class_name))
-    return getattr(module, class_name)
+    cls = getattr(module, class_name)
+    _class_cache[key] = cls
+    return cls
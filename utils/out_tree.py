@@ -0,0 +1,155 @@
+""" Модуль с классом `OutputTree` - индексом содержимого выходной папки
+
+На сетевых хранилищах каждая проверка существования файла и каждый `os.makedirs` - отдельное обращение к серверу.
+Индекс читает содержимое каждой выходной папки один раз (`os.scandir` при первом обращении к ней), а дальше отвечает на
+вопросы о существовании файлов и папок из памяти и учитывает всё, что создаётся во время работы.
+
+Индекс предполагает, что во время работы в выходную папку не пишет никто другой. Экземпляр, если индекс включен,
+хранится в `out_tree`; функции модуля без него обращаются к файловой системе напрямую.
+"""
+
+import logging
+import os
+import threading
+
+out_tree = None
+
+
+class OutputTree:
+    """ Индекс содержимого выходной папки
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirs = {}
+
+    def _get_entries(self, dir_path: str):
+        """ Возвращает множество имён в папке или None, если папки нет
+
+        """
+        try:
+            return self._dirs[dir_path]
+        except KeyError:
+            pass
+        try:
+            with os.scandir(dir_path) as it:
+                entries = set([os.path.normcase(e.name) for e in it])
+            logging.debug('Output directory "{}" is indexed: {} entry(ies)'.format(dir_path, len(entries)))
+        except (FileNotFoundError, NotADirectoryError):
+            entries = None
+        self._dirs[dir_path] = entries
+        return entries
+
+    @staticmethod
+    def _split(path: str) -> tuple:
+        dir_path, name = os.path.split(os.path.normcase(os.path.abspath(path)))
+        return dir_path, name
+
+    def exists(self, path: str) -> bool:
+        """ Проверяет, существует ли файл или папка
+
+        Args:
+            path: путь
+
+        Returns:
+            True, если существует
+        """
+        dir_path, name = self._split(path)
+        if not name:
+            return os.path.exists(path)
+        with self._lock:
+            entries = self._get_entries(dir_path)
+            return entries is not None and name in entries
+
+    def add(self, path: str) -> None:
+        """ Учитывает созданный файл
+
+        Args:
+            path: путь к файлу
+        """
+        dir_path, name = self._split(path)
+        with self._lock:
+            entries = self._get_entries(dir_path)
+            if entries is not None:
+                entries.add(name)
+
+    def remove(self, path: str) -> None:
+        """ Учитывает удалённый файл
+
+        Args:
+            path: путь к файлу
+        """
+        dir_path, name = self._split(path)
+        with self._lock:
+            entries = self._dirs.get(dir_path)
+            if entries is not None:
+                entries.discard(name)
+
+    def makedirs(self, path: str) -> None:
+        """ Создаёт папку вместе со всеми недостающими родительскими, если её ещё нет
+
+        Args:
+            path: путь к папке
+        """
+        path = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            missing = []
+            current = path
+            while True:
+                parent, name = os.path.split(current)
+                if not name:
+                    break
+                entries = self._get_entries(parent)
+                if entries is not None and name in entries:
+                    if current in self._dirs and self._dirs[current] is None:
+                        del self._dirs[current]
+                    break
+                missing.append((parent, name, current))
+                current = parent
+            if not missing:
+                return
+            logging.debug('Creating output directory "{}"...'.format(path))
+            os.makedirs(path, exist_ok=True)
+            for parent, name, current in reversed(missing):
+                if self._dirs.get(parent) is None:
+                    self._dirs[parent] = set()
+                self._dirs[parent].add(name)
+                if self._dirs.get(current) is None:
+                    self._dirs[current] = set()
+
+
+def exists(path: str) -> bool:
+    """ Проверяет, существует ли выходной файл - по индексу, если он включен
+
+    Args:
+        path: путь
+
+    Returns:
+        True, если существует
+    """
+    if out_tree is None:
+        return os.path.exists(path)
+    return out_tree.exists(path)
+
+
+def add(path: str) -> None:
+    """ Учитывает созданный выходной файл в индексе, если он включен
+
+    Args:
+        path: путь к файлу
+    """
+    if out_tree is not None:
+        out_tree.add(path)
+
+
+def makedirs(path: str) -> None:
+    """ Создаёт выходную папку, если её ещё нет - по индексу, если он включен
+
+    Args:
+        path: путь к папке
+    """
+    if out_tree is None:
+        os.makedirs(path, exist_ok=True)
+    else:
+        out_tree.makedirs(path)
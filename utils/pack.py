@@ -0,0 +1,231 @@
+""" Модуль с классами для упаковки множества небольших файлов в один архив и их последующего извлечения
+
+Поддерживаются архивы tar (без сжатия - поэтому данные каждого файла лежат в архиве одним непрерывным участком) и zip
+(без сжатия). Для tar рядом с архивом может сохраняться индекс - JSON-файл с именем `<архив>.index.json`, в котором для
+каждого файла записаны смещение его данных и размер. Индекс позволяет извлекать отдельные файлы, не читая архив
+целиком. У zip роль индекса играет его центральный каталог.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tarfile
+import zipfile
+
+from utils import io_shaping
+
+BUFFER_SIZE = 8 * 1024 * 1024
+INDEX_SUFFIX = '.index.json'
+FORMATS = ('tar', 'zip')
+
+
+def get_format(path: str) -> str:
+    """ Определяет формат архива по расширению имени файла
+
+    Args:
+        path: путь к архиву
+
+    Returns:
+        `zip` для файлов с расширением `.zip`, иначе - `tar`
+    """
+    return 'zip' if os.path.splitext(path)[1].lower() == '.zip' else 'tar'
+
+
+def detect_format(path: str) -> str:
+    """ Определяет формат существующего архива по его содержимому
+
+    Args:
+        path: путь к архиву
+
+    Returns:
+        `tar` или `zip`
+
+    Raises:
+        ValueError: если файл не является архивом tar без сжатия или zip
+    """
+    # tar проверяется первым: zipfile.is_zipfile ищет конец центрального каталога в последних байтах файла и может
+    # принять за zip tar-архив, последний файл в котором - zip
+    try:
+        with tarfile.open(path, 'r:'):
+            return 'tar'
+    except tarfile.TarError:
+        pass
+    if zipfile.is_zipfile(path):
+        return 'zip'
+    raise ValueError('Unknown archive format: "{}"'.format(path))
+
+
+class PackWriter:
+    """ Класс для последовательной записи файлов в архив
+
+    Архив записывается строго последовательно, через буфер большого размера.
+    """
+
+    def __init__(self, path: str, archive_format: str, index: bool, append: bool = False):
+        """
+
+        Args:
+            path: путь к архиву
+            archive_format: формат архива - `tar` или `zip`
+            index: сохранять ли индекс (только для tar)
+            append: дописывать ли файлы в конец существующего архива, созданного `PackWriter`
+
+        Raises:
+            FileExistsError: если создаётся новый архив, а файл с таким именем уже существует
+        """
+        if archive_format not in FORMATS:
+            raise ValueError('Unknown archive format: {}'.format(archive_format))
+        self._path = path
+        self._format = archive_format
+        self._index = {} if index and archive_format == 'tar' else None
+        self._file = open(path, 'r+b' if append else 'xb', buffering=BUFFER_SIZE)
+        mode = 'a' if append else 'w'
+        if archive_format == 'tar':
+            self._archive = tarfile.open(fileobj=self._file, mode=mode, format=tarfile.PAX_FORMAT)
+            members = self._archive.getmembers() if append else []
+            self._names = set([m.name for m in members])
+            if self._index is not None:
+                self._index = dict([(m.name, [m.offset_data, m.size]) for m in members if m.isfile()])
+        else:
+            self._archive = zipfile.ZipFile(self._file, mode=mode, compression=zipfile.ZIP_STORED, allowZip64=True)
+            self._names = set(self._archive.namelist())
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def add(self, src_path: str, name: str) -> None:
+        """ Добавляет файл в архив
+
+        Args:
+            src_path: путь к добавляемому файлу
+            name: имя файла в архиве
+
+        Raises:
+            FileExistsError: если файл с таким именем уже есть в архиве
+        """
+        if name in self._names:
+            raise FileExistsError('File "{}" already exists in archive "{}"'.format(name, self._path))
+        start = self._file.tell()
+        with io_shaping.open_file(src_path, 'rb', buffering=BUFFER_SIZE) as src_file:
+            if self._format == 'tar':
+                tar_info = self._archive.gettarinfo(arcname=name, fileobj=src_file)
+                # дробное время изменения потребовало бы отдельного расширенного заголовка PAX для каждого файла
+                tar_info.mtime = int(tar_info.mtime)
+                self._archive.addfile(tar_info, src_file)
+                if self._index is not None:
+                    # при записи tarfile не заполняет offset_data - данные файла заканчиваются текущим блоком
+                    blocks = (tar_info.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE
+                    self._index[name] = [self._archive.offset - blocks * tarfile.BLOCKSIZE, tar_info.size]
+            else:
+                zip_info = zipfile.ZipInfo.from_file(src_path, name)
+                with self._archive.open(zip_info, 'w', force_zip64=True) as dst_file:
+                    shutil.copyfileobj(src_file, dst_file, BUFFER_SIZE)
+        io_shaping.throttle(self._path, 'write', self._file.tell() - start)
+        self._names.add(name)
+
+    def close(self) -> None:
+        """ Завершает запись архива и сохраняет индекс
+
+        """
+        self._archive.close()
+        self._file.close()
+        if self._index is not None:
+            index_path = self._path + INDEX_SUFFIX
+            with open(index_path + '.tmp', 'w', encoding='utf-8') as i_file:
+                json.dump({'format': self._format, 'members': self._index}, i_file)
+            os.replace(index_path + '.tmp', index_path)
+        logging.debug('Archive "{}" closed: {} file(s)'.format(self._path, len(self._names)))
+
+
+class PackReader:
+    """ Класс для чтения архивов, созданных `PackWriter`
+
+    """
+
+    def __init__(self, path: str):
+        """
+
+        Args:
+            path: путь к архиву
+        """
+        self._path = path
+        self._index = None
+        try:
+            with open(path + INDEX_SUFFIX, encoding='utf-8') as i_file:
+                index = json.load(i_file)
+        except FileNotFoundError:
+            index = None
+        # имя архива может не соответствовать формату, заданному параметром действия, поэтому формат определяется по
+        # индексу или содержимому
+        self._format = index['format'] if index is not None else detect_format(path)
+        if self._format == 'tar':
+            if index is not None:
+                self._index = index['members']
+            else:
+                logging.debug('Archive "{}" has no index - it will be read sequentially'.format(path))
+
+    def list(self) -> list:
+        """ Возвращает список файлов в архиве
+
+        Returns:
+            Список кортежей из имени и размера файла
+        """
+        if self._index is not None:
+            return [(name, size) for name, (offset, size) in self._index.items()]
+        if self._format == 'tar':
+            with tarfile.open(self._path, 'r:') as archive:
+                return [(m.name, m.size) for m in archive if m.isfile()]
+        with zipfile.ZipFile(self._path) as archive:
+            return [(i.filename, i.file_size) for i in archive.infolist()]
+
+    def extract(self, out_dir: str, names: list = None) -> list:
+        """ Извлекает файлы из архива
+
+        Args:
+            out_dir: папка, в которую будут извлечены файлы
+            names: имена извлекаемых файлов; если не указаны - извлекаются все
+
+        Returns:
+            Список путей к извлечённым файлам
+
+        Raises:
+            KeyError: если какого-то из файлов нет в архиве
+            FileExistsError: если выходной файл уже существует
+        """
+        names = [n for n, s in self.list()] if not names else names
+        result = []
+        if self._format == 'tar' and self._index is not None:
+            with open(self._path, 'rb') as archive:
+                for name in names:
+                    offset, size = self._index[name]
+                    archive.seek(offset)
+                    result.append(self._write(out_dir, name, archive, size))
+        elif self._format == 'tar':
+            with tarfile.open(self._path, 'r:') as archive:
+                for name in names:
+                    member = archive.getmember(name)
+                    result.append(self._write(out_dir, name, archive.extractfile(member), member.size))
+        else:
+            with zipfile.ZipFile(self._path) as archive:
+                for name in names:
+                    with archive.open(name) as src_file:
+                        result.append(self._write(out_dir, name, src_file, archive.getinfo(name).file_size))
+        return result
+
+    @staticmethod
+    def _write(out_dir: str, name: str, src_file, size: int) -> str:
+        out_path = os.path.join(out_dir, os.path.basename(name))
+        logging.info('Extracting "{}" to "{}"...'.format(name, out_path))
+        with open(out_path, 'xb') as dst_file:
+            while size > 0:
+                data = src_file.read(min(size, BUFFER_SIZE))
+                if not data:
+                    raise EOFError('Unexpected end of archive data for "{}"'.format(name))
+                dst_file.write(data)
+                size -= len(data)
+        return out_path
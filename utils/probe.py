@@ -0,0 +1,175 @@
+""" Модуль с классом `MetadataProber` - многоуровневым получением метаданных файлов
+
+Уровни, от дешёвого к дорогому:
+
+- `HEADER` - чтение заголовков контейнера (`utils.container_header`), без запуска внешних программ; для файлов,
+  доступных по HTTP, - запросами диапазонов
+- `FAST` - ffprobe с маленькими `probesize` и `analyzeduration`: свойства контейнера и потоков без анализа кадров
+- `DEEP` - полный анализ средствами pyffwrapper, в том числе покадровый (например, для определения `field_mode`)
+
+Результаты всех уровней кэшируются для нескольких последних файлов - ими пользуются и фильтры всех подходящих правил, и
+действие `ffmpeg.convert`. Экземпляр, если он создан, хранится в `metadata_prober`.
+"""
+
+import json
+import logging
+import os
+
+from collections import OrderedDict
+
+from utils import container_header, urls
+
+HEADER, FAST, DEEP = 0, 1, 2
+LEVEL_NAMES = ('header', 'fast', 'deep')
+
+HEADER_FIELDS = {
+    'format': frozenset(['format_name', 'nb_streams', 'size', 'duration', 'bit_rate']),
+    'stream': frozenset(['index', 'codec_type', 'codec_name', 'codec_tag_string', 'id', 'width', 'height',
+                         'channels', 'sample_rate']),
+}
+DEEP_FIELDS = frozenset(['field_mode'])
+
+FAST_PROBE_PARAMS = ('-probesize', '1048576', '-analyzeduration', '500000')
+CACHE_SIZE = 8
+
+metadata_prober = None
+
+
+def _iter_fields(spec: dict):
+    for key, conditions in spec.items():
+        kind = key.split(':')[0]
+        if kind == 'count':
+            yield kind, key, None
+        elif type(conditions) == dict:
+            for field in conditions:
+                yield kind, key, field
+        else:
+            yield kind, key, None
+
+
+def get_required_level(spec: dict) -> int:
+    """ Определяет уровень, метаданных которого заведомо достаточно для проверки спецификации фильтра `ffprobe.meta`
+
+    Args:
+        spec: спецификация фильтра
+
+    Returns:
+        `HEADER`, `FAST` или `DEEP`
+    """
+    level = HEADER
+    for kind, key, field in _iter_fields(spec):
+        if field in DEEP_FIELDS or kind not in ('count', 'format', 'stream'):
+            return DEEP
+        if kind != 'count' and field not in HEADER_FIELDS[kind]:
+            level = FAST
+    return level
+
+
+def get_shallow_spec(spec: dict) -> dict:
+    """ Возвращает спецификацию без условий, для проверки которых нужен уровень `DEEP`
+
+    Args:
+        spec: спецификация фильтра
+
+    Returns:
+        Спецификация
+    """
+    result = {}
+    for key, conditions in spec.items():
+        kind = key.split(':')[0]
+        if kind not in ('count', 'format', 'stream'):
+            continue
+        if kind != 'count' and type(conditions) == dict:
+            conditions = dict([(f, c) for f, c in conditions.items() if f not in DEEP_FIELDS])
+            if not conditions:
+                continue
+        result[key] = conditions
+    return result
+
+
+class MetadataProber:
+    """ Класс, получающий и кэширующий метаданные файлов разных уровней
+
+    """
+
+    def __init__(self, ffprobe_path: str):
+        """
+
+        Args:
+            ffprobe_path: путь к исполняемому файлу ffprobe
+        """
+        self._ffprobe_path = ffprobe_path
+        self._cache = OrderedDict()
+
+    def _get_entry(self, path: str) -> dict:
+        if urls.is_url(path):
+            # У удалённого файла нет stat - записи кэша определяются только URL
+            key = path
+            stat = None
+        else:
+            key = os.path.abspath(path)
+            st = os.stat(path)
+            stat = (st.st_size, st.st_mtime)
+        entry = self._cache.get(key)
+        if entry is None or entry['stat'] != stat:
+            entry = {'stat': stat, 'levels': {}}
+            self._cache[key] = entry
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return entry['levels']
+
+    def get_header(self, path: str):
+        """ Возвращает метаданные уровня `HEADER`
+
+        Args:
+            path: путь к файлу
+
+        Returns:
+            Пара (метаданные, допустимые погрешности) или None, если формат контейнера не поддерживается
+        """
+        levels = self._get_entry(path)
+        if HEADER not in levels:
+            levels[HEADER] = container_header.probe_header(path)
+        return levels[HEADER]
+
+    def get_fast(self, path: str):
+        """ Возвращает метаданные уровня `FAST`
+
+        Args:
+            path: путь к файлу
+
+        Returns:
+            Метаданные или None, если ffprobe завершился с ошибкой
+        """
+        levels = self._get_entry(path)
+        if FAST not in levels:
+            logging.debug('Running fast ffprobe for "{}"...'.format(path))
+            import subprocess
+            process = subprocess.run(
+                [self._ffprobe_path, '-v', 'error', '-of', 'json', '-show_format', '-show_streams'] +
+                list(FAST_PROBE_PARAMS) + [path],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            if process.returncode:
+                logging.debug('Fast ffprobe failed: {}'.format(process.stderr.decode('utf-8', 'replace').strip()))
+                levels[FAST] = None
+            else:
+                levels[FAST] = json.loads(process.stdout.decode('utf-8'))
+        return levels[FAST]
+
+    def get_deep(self, path: str, collect):
+        """ Возвращает метаданные уровня `DEEP`
+
+        Args:
+            path: путь к файлу
+            collect: функция, собирающая метаданные (например, `FFprobeMetadataCollector.get_metadata`)
+
+        Returns:
+            Метаданные
+        """
+        levels = self._get_entry(path)
+        if DEEP not in levels:
+            levels[DEEP] = collect(path)
+        return levels[DEEP]
@@ -0,0 +1,208 @@
+""" Модуль с функциями для измерения производительности профилей конвертирования
+
+Профиль отрисовывается так же, как это делает действие `ffmpeg.convert`, а ffmpeg запускается напрямую, чтобы
+получить ресурсы, израсходованные именно этим процессом: процессорное время и пиковый объём памяти (`os.wait4`, только
+для Unix - на остальных системах эти показатели не измеряются). Результаты сравниваются с сохранёнными ранее базовыми
+значениями - так ухудшения профилей обнаруживаются до того, как они попадут в работу.
+"""
+
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+SAMPLE_VIDEO = 'testsrc2=size=1920x1080:rate=25'
+SAMPLE_AUDIO = 'sine=frequency=1000:sample_rate=48000'
+SAMPLE_PARAMS = ('-c:v', 'mpeg2video', '-pix_fmt', 'yuv422p', '-b:v', '50M', '-flags', '+ildct+ilme', '-top', '1',
+                 '-c:a', 'pcm_s24le', '-ac', '2')
+
+METRICS = ('fps', 'speed', 'cpu', 'rss', 'bitrate')
+# Сравниваемые с базовыми показатели: True - рост это улучшение, False - ухудшение, None - отклонением считается
+# изменение в любую сторону (изменившийся битрейт - изменившийся результат профиля). Загрузка процессоров зависит от
+# машины и остальной нагрузки на неё, поэтому не сравнивается
+HIGHER_IS_BETTER = {'fps': True, 'speed': True, 'rss': False, 'bitrate': None}
+
+
+def generate_sample(ffmpeg_path: str, path: str, duration: float) -> None:
+    """ Создаёт синтетический клип из тестовых источников `lavfi`
+
+    Args:
+        ffmpeg_path: путь к исполняемому файлу ffmpeg
+        path: путь к создаваемому файлу
+        duration: длительность в секундах
+    """
+    logging.info('Generating {:.0f} s sample "{}"...'.format(duration, path))
+    subprocess.run(
+        [ffmpeg_path, '-v', 'error', '-y', '-f', 'lavfi', '-i', SAMPLE_VIDEO, '-f', 'lavfi', '-i', SAMPLE_AUDIO,
+         '-t', str(duration)] + list(SAMPLE_PARAMS) + [path],
+        check=True, stdin=subprocess.DEVNULL
+    )
+
+
+def _split_params(params) -> list:
+    if type(params) == str:
+        return shlex.split(params, posix=os.name != 'nt')
+    return list(params)
+
+
+def build_command(ffmpeg_path: str, profile, input_url: str, out_paths: list) -> list:
+    """ Строит командную строку ffmpeg для отрисованного профиля
+
+    Args:
+        ffmpeg_path: путь к исполняемому файлу ffmpeg
+        profile: отрисованный профиль конвертирования
+        input_url: путь к входному файлу
+        out_paths: пути к выходным файлам
+
+    Returns:
+        Список аргументов
+    """
+    args = [ffmpeg_path, '-hide_banner', '-nostats', '-v', 'error', '-progress', 'pipe:1', '-y']
+    args += _split_params(profile.inputs[0]['parameters']) + ['-i', input_url]
+    for o, p in zip(profile.outputs, out_paths):
+        args += _split_params(o['parameters']) + [p]
+    return args
+
+
+def run(args: list, duration: float, out_paths: list) -> dict:
+    """ Запускает ffmpeg и измеряет показатели
+
+    Args:
+        args: командная строка
+        duration: длительность входного файла в секундах
+        out_paths: пути к выходным файлам
+
+    Returns:
+        Словарь с показателями из `METRICS`: `fps` - кадров в секунду, `speed` - множитель реального времени, `cpu` -
+        загрузка процессоров в процентах от всех имеющихся, `rss` - пиковый объём памяти в байтах, `bitrate` - общий
+        битрейт выходных файлов в бит/с. Неизмеренные показатели - None
+    """
+    logging.debug('Running: {}'.format(args))
+    start = time.monotonic()
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.stdout.read()
+    process.stdout.close()
+    usage = None
+    if hasattr(os, 'wait4'):
+        pid, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    else:
+        process.wait()
+    elapsed = time.monotonic() - start
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, output=output)
+
+    frames = None
+    for line in output.decode('utf-8', 'replace').splitlines():
+        if line.startswith('frame='):
+            try:
+                frames = int(line[6:])
+            except ValueError:
+                pass
+    out_size = sum([os.path.getsize(p) for p in out_paths])
+    result = {
+        'fps': frames / elapsed if frames else None,
+        'speed': duration / elapsed,
+        'cpu': None,
+        'rss': None,
+        'bitrate': out_size * 8 / duration,
+    }
+    if usage is not None:
+        result['cpu'] = (usage.ru_utime + usage.ru_stime) / elapsed / (os.cpu_count() or 1) * 100
+        result['rss'] = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """ Сравнивает показатели с базовыми
+
+    Args:
+        result: измеренные показатели
+        baseline: базовые показатели
+        tolerance: допустимое относительное отклонение (например, 0.1 - 10%)
+
+    Returns:
+        Список описаний отклонений, выходящих за допустимые пределы
+    """
+    regressions = []
+    for metric, higher_is_better in sorted(HIGHER_IS_BETTER.items()):
+        value = result.get(metric)
+        base = baseline.get(metric)
+        if value is None or not base:
+            continue
+        change = (value - base) / base
+        if higher_is_better is None:
+            failed = abs(change) > tolerance
+        elif higher_is_better:
+            failed = change < -tolerance
+        else:
+            failed = change > tolerance
+        if failed:
+            regressions.append('{}: {:.4g} -> {:.4g} ({:+.1f}%)'.format(metric, base, value, change * 100))
+    return regressions
+
+
+def get_sample_names(samples: list) -> list:
+    """ Возвращает имена образцов - ключи базовых показателей
+
+    Базовые показатели хранятся по именам файлов образцов, а не по путям - так они остаются пригодными на других машинах
+    и для синтетического клипа во временной папке.
+
+    Args:
+        samples: пути к образцам
+
+    Returns:
+        Список имён в том же порядке
+
+    Raises:
+        ValueError: если имена образцов повторяются
+    """
+    names = [os.path.basename(s) for s in samples]
+    if len(set(names)) != len(names):
+        raise ValueError('Sample file names must be unique: {}'.format(', '.join(samples)))
+    return names
+
+
+def load_baselines(path: str) -> dict:
+    """ Загружает базовые показатели
+
+    Args:
+        path: путь к файлу
+
+    Returns:
+        Словарь вида {профиль: {образец: показатели}}
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(path: str, baselines: dict) -> None:
+    """ Сохраняет базовые показатели
+
+    Args:
+        path: путь к файлу
+        baselines: словарь вида {профиль: {образец: показатели}}
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def format_result(result: dict) -> str:
+    """ Форматирует показатели для вывода
+
+    """
+    parts = []
+    for metric, template, scale in (('fps', '{:.1f} fps', 1), ('speed', '{:.2f}x', 1), ('cpu', 'CPU {:.0f}%', 1),
+                                    ('rss', 'RSS {:.0f} MiB', 1 / 1048576), ('bitrate', '{:.2f} Mbit/s', 1e-6)):
+        if result.get(metric) is not None:
+            parts.append(template.format(result[metric] * scale))
+    return ', '.join(parts)
@@ -0,0 +1,99 @@
+""" Модуль с функциями анализа литеральных префиксов регулярных выражений
+
+Используется для отсечения при обходе входной папки подпапок, в которых не может найтись ни одного файла,
+соответствующего набору правил: если относительный путь к папке не согласуется ни с одним из префиксов регулярных
+выражений, спускаться в неё не нужно.
+"""
+
+import logging
+import os
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+MAX_PREFIXES = 64
+
+_ZERO_WIDTH_AT = (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING)
+
+
+def _get_prefixes(items) -> list:
+    """ Возвращает литеральные префиксы последовательности разобранных элементов регулярного выражения
+
+    Returns:
+        Список пар (префикс, признак того, что последовательность полностью состоит из литералов и префикс может быть
+        продолжен следующими элементами)
+    """
+    result = [('', True)]
+    for op, av in items:
+        if op == sre_constants.AT and av in _ZERO_WIDTH_AT:
+            continue
+        if op == sre_constants.LITERAL:
+            alternatives = [(chr(av), True)]
+        elif op == sre_constants.SUBPATTERN:
+            alternatives = _get_prefixes(av[-1])
+        elif op == sre_constants.BRANCH:
+            alternatives = [a for branch in av[1] for a in _get_prefixes(branch)]
+        elif op == sre_constants.IN and all([i_op == sre_constants.LITERAL for i_op, i_av in av]):
+            alternatives = [(chr(i_av), True) for i_op, i_av in av]
+        else:
+            alternatives = None
+        open_count = len([p for p, is_open in result if is_open])
+        if alternatives is None or len(result) + open_count * (len(alternatives) - 1) > MAX_PREFIXES:
+            return [(p, False) for p, is_open in result]
+        result = [(p, False) for p, is_open in result if not is_open] + \
+                 [(p + a, a_open) for p, is_open in result if is_open for a, a_open in alternatives]
+        if not any([is_open for p, is_open in result]):
+            break
+    return result
+
+
+def get_literal_prefixes(reg_exp: str) -> list:
+    """ Возвращает литеральные префиксы регулярного выражения в нижнем регистре
+
+    Любая строка, соответствующая выражению (при поиске с начала строки), начинается с одного из префиксов. Например,
+    для `^__HQ__.*\\.mp4$` это `['__hq__']`, для `(a|b)c` - `['ac', 'bc']`.
+
+    Args:
+        reg_exp: регулярное выражение
+
+    Returns:
+        Список префиксов; пустая строка в нём означает, что префикс выделить не удалось
+    """
+    try:
+        parsed = sre_parse.parse(reg_exp)
+    except Exception as e:
+        logging.debug('Regular expression "{}" can\'t be analyzed: {}'.format(reg_exp, e))
+        return ['']
+    return sorted(set([p.lower() for p, is_open in _get_prefixes(list(parsed))]))
+
+
+def get_dir_filter(reg_exps: list):
+    """ Возвращает функцию, проверяющую, может ли в папке найтись файл, соответствующий хотя бы одному выражению
+
+    Args:
+        reg_exps: список регулярных выражений, применяемых к относительным путям файлов
+
+    Returns:
+        Функция, принимающая относительный путь к папке и возвращающая True, если в неё нужно спускаться, или None,
+        если хотя бы у одного выражения нет литерального префикса и отсечение невозможно
+    """
+    prefixes = set()
+    for reg_exp in reg_exps:
+        reg_exp_prefixes = get_literal_prefixes(reg_exp)
+        if '' in reg_exp_prefixes:
+            logging.debug('Regular expression "{}" has no literal prefix - directories will not be pruned'.format(
+                reg_exp))
+            return None
+        prefixes.update(reg_exp_prefixes)
+    prefixes = tuple(sorted(prefixes))
+    logging.debug('Literal prefixes of rules set patterns: {}'.format(prefixes))
+
+    def dir_filter(rel_dir: str) -> bool:
+        rel_dir = rel_dir.lower() + os.sep
+        return any([rel_dir.startswith(p) or p.startswith(rel_dir) for p in prefixes])
+
+    return dir_filter
@@ -0,0 +1,106 @@
+""" Модуль с классом `RulesSetCache`
+
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+
+class RulesSetCache:
+    """ Кэш проверенных и нормализованных наборов правил
+
+    Каждая запись хранится в отдельном файле и адресуется хэшем содержимого исходного документа с набором правил,
+    версии приложения и отпечатка формата набора правил - любое изменение документа, обновление приложения или
+    изменение схемы и нормализации набора правил просто приводит к промаху. При "тёплом"
+    запуске набор правил загружается напрямую, без разбора JSON и повторной проверки по схеме.
+    """
+
+    FILE_PREFIX = 'rules-'
+    FILE_SUFFIX = '.pickle'
+
+    def __init__(self, cache_dir: str, version: str, rules_set_format: str = ''):
+        """
+
+        Args:
+            cache_dir: папка для хранения кэша, создаётся при первой записи
+            version: версия приложения
+            rules_set_format: отпечаток схемы и нормализации набора правил (`rules_provider.get_rules_set_format`)
+        """
+        self._cache_dir = cache_dir
+        self._version = version
+        self._rules_set_format = rules_set_format
+
+    def get_key(self, content: bytes) -> str:
+        """ Вычисляет ключ записи кэша
+
+        Args:
+            content: содержимое документа с набором правил
+
+        Returns:
+            Ключ записи
+        """
+        h = hashlib.sha256(content)
+        h.update(b'\0')
+        h.update(self._version.encode('utf-8'))
+        h.update(b'\0')
+        h.update(self._rules_set_format.encode('utf-8'))
+        return h.hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, '{}{}{}'.format(self.FILE_PREFIX, key, self.FILE_SUFFIX))
+
+    def get(self, key: str):
+        """ Возвращает набор правил из кэша
+
+        Повреждённая запись считается промахом.
+
+        Args:
+            key: ключ записи
+
+        Returns:
+            Набор правил или None, если записи нет
+        """
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as c_file:
+                entry = pickle.load(c_file)
+        except FileNotFoundError:
+            logging.debug('Rules set cache miss: {}'.format(key))
+            return None
+        except Exception as e:
+            logging.warning('Rules set cache entry "{}" is broken and will be ignored: {}'.format(path, str(e)))
+            return None
+        if type(entry) != dict or entry.get('version') != self._version or entry.get('key') != key:
+            logging.debug('Rules set cache entry "{}" is stale'.format(path))
+            return None
+        logging.debug('Rules set cache hit: {}'.format(key))
+        return entry['rules_set']
+
+    def put(self, key: str, rules_set: dict) -> None:
+        """ Сохраняет набор правил в кэш
+
+        Запись производится во временный файл, который затем атомарно переименовывается - параллельно запущенные
+        экземпляры приложения никогда не увидят недописанную запись. Ошибки записи не считаются критическими.
+
+        Args:
+            key: ключ записи
+            rules_set: проверенный и нормализованный набор правил
+        """
+        path = self._get_path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as c_file:
+                pickle.dump({'version': self._version, 'key': key, 'rules_set': rules_set}, c_file,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning('Unable to save rules set cache entry "{}": {}'.format(path, str(e)))
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        else:
+            logging.debug('Rules set cache entry saved: {}'.format(path))
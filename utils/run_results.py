@@ -0,0 +1,221 @@
+""" Модуль с классом `RunResults` - хранилищем результатов обработки файлов
+
+Результат каждого файла (исход, подошедшие правила, выполненные действия и их длительность, цепочка исключений)
+записывается в базу SQLite - по одной на каждый запуск, в папке `log_dir`. Записи накапливаются в памяти только до
+очередной транзакции, поэтому количество обработанных файлов на расход памяти не влияет. Итоги запуска строятся
+запросами к базе, а подробности можно получить командой `report`.
+
+Экземпляр хранилища текущего запуска, если он создан, хранится в `run_results`.
+"""
+
+import csv
+import glob
+import itertools
+import json
+import logging
+import os
+
+OUTCOMES = ('done', 'no_match', 'error')
+ACTION_OUTCOMES = ('done', 'exists', 'conflict', 'error')
+FILENAME_PATTERN = 'autoarchive-results-*.sqlite3'
+REPORT_COLUMNS = ('path', 'outcome', 'patterns', 'actions', 'elapsed', 'error')
+
+run_results = None
+
+
+def get_latest(log_dir: str):
+    """ Возвращает путь к хранилищу последнего запуска
+
+    Args:
+        log_dir: папка с журналами
+
+    Returns:
+        Путь или None, если хранилищ в папке нет
+    """
+    paths = sorted(glob.glob(os.path.join(log_dir, FILENAME_PATTERN)))
+    return paths[-1] if paths else None
+
+
+class RunResults:
+    """ Хранилище результатов обработки файлов одного запуска
+
+    """
+
+    COMMIT_EVERY = 1000
+
+    def __init__(self, db_path: str, read_only: bool = False):
+        """
+
+        Args:
+            db_path: путь к файлу базы данных (`:memory:` - хранить в памяти)
+            read_only: открыть существующую базу только для чтения - режим журнала и схема не меняются, поэтому
+                записывать результаты нельзя
+        """
+        import sqlite3
+
+        logging.debug('Opening run results store "{}"...'.format(db_path))
+        if read_only:
+            from urllib.parse import quote
+            uri = 'file:{}?mode=ro'.format(quote(os.path.abspath(db_path).replace(os.sep, '/')))
+            self._db = sqlite3.connect(uri, uri=True)
+        else:
+            self._db = sqlite3.connect(db_path)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=OFF')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'id INTEGER PRIMARY KEY, path TEXT NOT NULL, outcome TEXT NOT NULL, patterns TEXT NOT NULL, '
+                'elapsed REAL NOT NULL, error TEXT)'
+            )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS actions ('
+                'file_id INTEGER NOT NULL, action_id TEXT NOT NULL, out_dir TEXT NOT NULL, outcome TEXT NOT NULL, '
+                'elapsed REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS files_outcome ON files (outcome)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS actions_file_id ON actions (file_id)')
+            self._db.commit()
+        self._next_id = (self._db.execute('SELECT MAX(id) FROM files').fetchone()[0] or 0) + 1
+        self._files = []
+        self._actions = []
+
+    def record(self, path: str, outcome: str, patterns: list, actions: list, elapsed: float,
+               error: str = None) -> None:
+        """ Записывает результат обработки файла
+
+        Args:
+            path: путь к файлу
+            outcome: исход - `done`, `no_match` или `error`
+            patterns: регулярные выражения подошедших правил
+            actions: список кортежей (название действия, выходная папка, исход, длительность в секундах); исход
+                действия - `done`, `exists` (выходной файл уже существует), `conflict` (действие пропущено из-за
+                найденного заранее конфликта) или `error`
+            elapsed: длительность обработки файла в секундах
+            error: цепочка исключений, если исход - `error`
+        """
+        file_id = self._next_id
+        self._next_id += 1
+        self._files.append((file_id, path, outcome, json.dumps(patterns), elapsed, error))
+        self._actions.extend([(file_id,) + tuple(a) for a in actions])
+        if len(self._files) >= self.COMMIT_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Записывает накопленные результаты одной транзакцией
+
+        """
+        if not self._files:
+            return
+        with self._db:
+            self._db.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)', self._files)
+            self._db.executemany('INSERT INTO actions VALUES (?, ?, ?, ?, ?)', self._actions)
+        self._files = []
+        self._actions = []
+
+    def get_counts(self) -> dict:
+        """ Возвращает количество файлов с каждым исходом
+
+        Returns:
+            Словарь, в котором ключ - исход, а значение - количество файлов
+        """
+        self.flush()
+        return dict(self._db.execute('SELECT outcome, COUNT(*) FROM files GROUP BY outcome').fetchall())
+
+    def get_action_stats(self) -> list:
+        """ Возвращает количество и суммарную длительность выполненных действий
+
+        Returns:
+            Список кортежей (название действия, исход, количество, суммарная длительность в секундах)
+        """
+        self.flush()
+        return self._db.execute(
+            'SELECT action_id, outcome, COUNT(*), SUM(elapsed) FROM actions GROUP BY action_id, outcome '
+            'ORDER BY action_id, outcome'
+        ).fetchall()
+
+    def iter_files(self, outcome: str = None, path_pattern: str = None, action_id: str = None, limit: int = None):
+        """ Перебирает результаты обработки файлов в порядке обработки
+
+        Args:
+            outcome: только файлы с этим исходом
+            path_pattern: только файлы, пути к которым соответствуют шаблону (`*`, `?`, `[...]`)
+            action_id: только файлы, для которых выполнялось это действие
+            limit: не больше этого количества файлов
+
+        Returns:
+            Итератор словарей с ключами из `REPORT_COLUMNS`; значение `actions` - список словарей с ключами
+            `action`, `out_dir`, `outcome` и `elapsed`
+        """
+        self.flush()
+        conditions = []
+        params = []
+        if outcome is not None:
+            conditions.append('outcome = ?')
+            params.append(outcome)
+        if path_pattern is not None:
+            conditions.append('path GLOB ?')
+            params.append(path_pattern)
+        if action_id is not None:
+            conditions.append('id IN (SELECT file_id FROM actions WHERE action_id = ?)')
+            params.append(action_id)
+        files_query = 'SELECT id, path, outcome, patterns, elapsed, error FROM files'
+        if conditions:
+            files_query += ' WHERE ' + ' AND '.join(conditions)
+        files_query += ' ORDER BY id'
+        if limit is not None:
+            files_query += ' LIMIT ?'
+            params.append(limit)
+        # действия выбираются тем же запросом: строки одного файла идут подряд и группируются по его id
+        query = (
+            'SELECT f.id, f.path, f.outcome, f.patterns, f.elapsed, f.error, '
+            'a.action_id, a.out_dir, a.outcome, a.elapsed '
+            'FROM ({}) AS f LEFT JOIN actions AS a ON a.file_id = f.id ORDER BY f.id, a.rowid'.format(files_query)
+        )
+        for file_id, rows in itertools.groupby(self._db.execute(query, params), key=lambda r: r[0]):
+            rows = list(rows)
+            _, path, file_outcome, patterns, elapsed, error = rows[0][:6]
+            yield {
+                'path': path,
+                'outcome': file_outcome,
+                'patterns': json.loads(patterns),
+                'actions': [{'action': r[6], 'out_dir': r[7], 'outcome': r[8], 'elapsed': r[9]}
+                            for r in rows if r[6] is not None],
+                'elapsed': elapsed,
+                'error': error,
+            }
+
+    def export(self, stream, export_format: str, **filters) -> int:
+        """ Выгружает результаты обработки файлов
+
+        Args:
+            stream: текстовый поток для записи
+            export_format: `csv` или `json` (по одному объекту JSON в строке)
+            filters: условия отбора, как у `iter_files`
+
+        Returns:
+            Количество выгруженных файлов
+        """
+        if export_format not in ('csv', 'json'):
+            raise ValueError('Unknown export format: {}'.format(export_format))
+        writer = None
+        if export_format == 'csv':
+            writer = csv.writer(stream)
+            writer.writerow(REPORT_COLUMNS)
+        count = 0
+        for row in self.iter_files(**filters):
+            if writer is None:
+                stream.write(json.dumps(row, ensure_ascii=False))
+                stream.write('\n')
+            else:
+                row['patterns'] = json.dumps(row['patterns'], ensure_ascii=False)
+                row['actions'] = json.dumps(row['actions'], ensure_ascii=False)
+                writer.writerow([row[c] for c in REPORT_COLUMNS])
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """ Записывает накопленные результаты и закрывает базу данных
+
+        """
+        self.flush()
+        self._db.close()
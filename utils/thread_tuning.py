@@ -0,0 +1,247 @@
+""" Модуль с классом `ThreadTuner` - подбором количества потоков ffmpeg
+
+Количество потоков для очередного задания конвертирования выбирается по двум признакам:
+
+- количеству заданий, выполняющихся в данный момент всеми процессами приложения - каждое задание регистрируется
+  файлом в общей папке, поэтому учитываются и параллельно запущенные экземпляры
+- модели производительности профиля - скорости конвертирования (отношению длительности входного файла ко времени
+  конвертирования) при разном количестве потоков, накопленной по результатам предыдущих запусков
+
+Экземпляр, если он создан, хранится в `thread_tuner`.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+EFFICIENCY_THRESHOLD = 0.95
+SMOOTHING = 0.3
+
+thread_tuner = None
+
+
+def _is_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ThreadTuner:
+    """ Класс, подбирающий количество потоков ffmpeg для заданий конвертирования
+
+    Доступные процессоры делятся поровну между выполняющимися заданиями. В пределах своей доли задание получает
+    наименьшее количество потоков, скорость при котором по модели не ниже `EFFICIENCY_THRESHOLD` от лучшей - если
+    производительность профиля перестаёт расти с количеством потоков, лишние процессоры остаются другим заданиям.
+    Пока скорость при всей доле не измерена, задание получает всю долю. Затем количество потоков, выбранное по модели,
+    один раз пробуется уменьшить вдвое - так модель накапливает измерения, по которым его можно сократить.
+    """
+
+    def __init__(self, state_dir: str):
+        """
+
+        Args:
+            state_dir: папка для файлов выполняющихся заданий и модели производительности
+        """
+        self._jobs_dir = os.path.join(state_dir, 'jobs')
+        os.makedirs(self._jobs_dir, exist_ok=True)
+        self._model_path = os.path.join(state_dir, 'throughput.json')
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._jobs = set()
+
+    def start_job(self) -> str:
+        """ Регистрирует начало задания
+
+        Returns:
+            Идентификатор задания для `finish_job`
+        """
+        with self._lock:
+            self._counter += 1
+            job_id = '{}-{}-{}.job'.format(os.getpid(), threading.get_ident(), self._counter)
+            self._jobs.add(job_id)
+        open(os.path.join(self._jobs_dir, job_id), 'w').close()
+        return job_id
+
+    def finish_job(self, job_id: str) -> None:
+        """ Регистрирует окончание задания
+
+        Args:
+            job_id: идентификатор задания, полученный от `start_job`
+        """
+        with self._lock:
+            self._jobs.discard(job_id)
+        try:
+            os.remove(os.path.join(self._jobs_dir, job_id))
+        except FileNotFoundError:
+            pass
+
+    def count_jobs(self) -> int:
+        """ Возвращает количество выполняющихся заданий, удаляя файлы заданий завершившихся процессов
+
+        Returns:
+            Количество заданий
+        """
+        result = 0
+        alive = {}
+        for name in os.listdir(self._jobs_dir):
+            try:
+                pid = int(name.split('-', 1)[0])
+            except ValueError:
+                continue
+            if pid not in alive:
+                alive[pid] = _is_alive(pid)
+            if alive[pid]:
+                result += 1
+                continue
+            logging.debug('Removing stale job file {}...'.format(name))
+            try:
+                os.remove(os.path.join(self._jobs_dir, name))
+            except FileNotFoundError:
+                pass
+        return result
+
+    def _load_model(self) -> dict:
+        try:
+            with open(self._model_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logging.warning('Throughput model file "{}" is corrupted - starting over'.format(self._model_path))
+            return {}
+
+    def get_speeds(self, profile_name: str) -> dict:
+        """ Возвращает измеренные скорости конвертирования по профилю
+
+        Args:
+            profile_name: название профиля
+
+        Returns:
+            Словарь, в котором ключ - количество потоков, а значение - скорость (длительность входного файла, делённая
+            на время конвертирования)
+        """
+        return dict([(int(t), v[0]) for t, v in self._load_model().get(profile_name, {}).items()])
+
+    def suggest(self, profile_name: str) -> int:
+        """ Подбирает количество потоков для очередного задания
+
+        Задание уже должно быть зарегистрировано `start_job`.
+
+        Args:
+            profile_name: название профиля
+
+        Returns:
+            Количество потоков
+        """
+        jobs = max(1, self.count_jobs())
+        budget = max(1, (os.cpu_count() or 1) // jobs)
+        speeds = self.get_speeds(profile_name)
+        if budget not in speeds:
+            threads = budget
+        else:
+            measured = [(t, s) for t, s in speeds.items() if t <= budget]
+            best = max([s for t, s in measured])
+            threads = min([t for t, s in measured if s >= best * EFFICIENCY_THRESHOLD])
+            # Без измерений при меньшем количестве потоков порог не сработает никогда - поэтому вдвое меньшее
+            # количество, пока оно не измерено, пробуется один раз
+            if threads // 2 and threads // 2 not in speeds:
+                threads //= 2
+        logging.debug('Running jobs: {}, CPU share: {}, threads: {}'.format(jobs, budget, threads))
+        return threads
+
+    def record(self, profile_name: str, threads: int, speed: float) -> None:
+        """ Добавляет измерение скорости конвертирования в модель
+
+        Args:
+            profile_name: название профиля
+            threads: количество потоков
+            speed: скорость (длительность входного файла, делённая на время конвертирования)
+        """
+        with self._lock:
+            model = self._load_model()
+            entry = model.setdefault(profile_name, {}).get(str(threads))
+            if entry is None:
+                entry = [speed, 1]
+            else:
+                entry = [entry[0] * (1 - SMOOTHING) + speed * SMOOTHING, entry[1] + 1]
+            model[profile_name][str(threads)] = entry
+            logging.debug('Profile {} speed with {} threads: {:.2f}x'.format(profile_name, threads, entry[0]))
+            tmp_path = '{}.{}.tmp'.format(self._model_path, os.getpid())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(model, f)
+            os.replace(tmp_path, self._model_path)
+
+    def estimate(self, profile_name: str, threads: int, duration: float):
+        """ Оценивает время конвертирования по измеренной ранее скорости
+
+        Args:
+            profile_name: название профиля
+            threads: количество потоков
+            duration: длительность входного файла в секундах
+
+        Returns:
+            Время в секундах или None, если скорость с таким количеством потоков ещё не измерялась
+        """
+        speed = self.get_speeds(profile_name).get(threads)
+        if not speed:
+            return None
+        return duration / speed
+
+    def close(self) -> None:
+        """ Удаляет файлы незавершённых заданий этого процесса
+
+        """
+        for job_id in list(self._jobs):
+            self.finish_job(job_id)
+
+
+def get_duration(input_metadata: dict):
+    """ Возвращает длительность входного файла из его метаданных
+
+    Args:
+        input_metadata: метаданные входного файла
+
+    Returns:
+        Длительность в секундах или None, если она неизвестна
+    """
+    try:
+        duration = float(input_metadata['format']['duration'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return duration if duration > 0 else None
+
+
+def measure(start: float, input_metadata: dict):
+    """ Вычисляет скорость конвертирования по длительности входного файла
+
+    Args:
+        start: значение `time.monotonic()` в момент начала конвертирования
+        input_metadata: метаданные входного файла
+
+    Returns:
+        Скорость или None, если длительность входного файла неизвестна
+    """
+    elapsed = time.monotonic() - start
+    duration = get_duration(input_metadata)
+    if duration is None or elapsed <= 0:
+        return None
+    return duration / elapsed
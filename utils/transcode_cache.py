@@ -0,0 +1,177 @@
+""" Модуль с классом `TranscodeCache` - кэшем результатов конвертирования
+
+Ключ записи - полный хэш входного файла и строка, описывающая отрисованные параметры ffmpeg (см.
+`FfmpegConvertAction._get_action_key`). Косметические изменения профиля, не меняющие итоговые параметры, или
+изменение структуры выходных папок не приводят к повторному конвертированию.
+
+Экземпляр кэша, если он включен, хранится в `transcode_cache`.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+
+from utils.fingerprint import get_fingerprint
+from utils import out_tree
+from utils.file_link import materialize
+
+MODES = ('store', 'pointer')
+
+transcode_cache = None
+
+
+class TranscodeCache:
+    """ Кэш результатов конвертирования с вытеснением давно не использовавшихся записей
+
+    Режимы работы:
+
+    - `store` - выходные файлы помещаются в папку кэша (reflink-копией, жёсткой ссылкой или копированием) и не зависят
+      от дальнейшей судьбы выходной папки
+    - `pointer` - в кэше хранятся только пути к выходным файлам, запись считается действительной, пока файлы существуют
+      и не изменили размер
+
+    Суммарный размер записей ограничен, при превышении удаляются записи, которые дольше всех не использовались.
+    """
+
+    def __init__(self, cache_dir: str, mode: str, max_size: int):
+        """
+
+        Args:
+            cache_dir: папка кэша
+            mode: режим работы - `store` или `pointer`
+            max_size: максимальный суммарный размер записей в байтах
+        """
+        import sqlite3
+
+        if mode not in MODES:
+            raise ValueError('Unknown transcode cache mode: {}'.format(mode))
+        self._mode = mode
+        self._max_size = max_size
+        self._objects_dir = os.path.join(cache_dir, 'objects')
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'))
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'id INTEGER PRIMARY KEY, size INTEGER NOT NULL, sample_hash TEXT NOT NULL, full_hash TEXT NOT NULL, '
+            'params_key TEXT NOT NULL, mode TEXT NOT NULL, outputs TEXT NOT NULL, total_size INTEGER NOT NULL, '
+            'last_access REAL NOT NULL)'
+        )
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS entries_fingerprint ON entries (size, sample_hash, params_key)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self._db.commit()
+
+    @staticmethod
+    def _is_valid(outputs: list) -> bool:
+        for path, size in outputs:
+            try:
+                if os.path.getsize(path) != size:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def get(self, input_url: str, params_key: str, out_paths: list, simulate: bool) -> bool:
+        """ Ищет результат конвертирования в кэше и, если находит, переносит его в `out_paths`
+
+        Args:
+            input_url: путь к входному файлу
+            params_key: строка, описывающая отрисованные параметры ffmpeg
+            out_paths: пути к выходным файлам
+            simulate: флаг симуляции
+
+        Returns:
+            True, если результат был найден и конвертирование не нужно
+        """
+        fingerprint = get_fingerprint(input_url)
+        candidates = self._db.execute(
+            'SELECT id, full_hash, mode, outputs FROM entries WHERE size = ? AND sample_hash = ? AND params_key = ?',
+            (fingerprint.size, fingerprint.sample_hash, params_key)
+        ).fetchall()
+        for entry_id, full_hash, mode, outputs in candidates:
+            outputs = json.loads(outputs)
+            if len(outputs) != len(out_paths) or full_hash != fingerprint.full_hash:
+                continue
+            if not self._is_valid(outputs):
+                logging.debug('Transcode cache entry {} is no longer valid - removing it'.format(entry_id))
+                self._remove(entry_id, mode, outputs)
+                continue
+            for (src, size), dst in zip(outputs, out_paths):
+                logging.info('Transcode cache hit - materializing "{}" as "{}"...'.format(src, dst))
+                if not simulate:
+                    method = materialize(src, dst)
+                    out_tree.add(dst)
+                    logging.debug('Materialized using {}'.format(method))
+            self._db.execute('UPDATE entries SET last_access = ? WHERE id = ?', (time.time(), entry_id))
+            self._db.commit()
+            return True
+        return False
+
+    def put(self, input_url: str, params_key: str, out_paths: list) -> None:
+        """ Сохраняет результат конвертирования в кэше
+
+        Args:
+            input_url: путь к входному файлу
+            params_key: строка, описывающая отрисованные параметры ffmpeg
+            out_paths: пути к полученным выходным файлам
+        """
+        fingerprint = get_fingerprint(input_url)
+        full_hash = fingerprint.full_hash
+        cursor = self._db.execute(
+            'INSERT INTO entries (size, sample_hash, full_hash, params_key, mode, outputs, total_size, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (fingerprint.size, fingerprint.sample_hash, full_hash, params_key, self._mode, '[]', 0, time.time())
+        )
+        entry_id = cursor.lastrowid
+        outputs = []
+        try:
+            if self._mode == 'store':
+                entry_dir = os.path.join(self._objects_dir, str(entry_id))
+                os.makedirs(entry_dir, exist_ok=True)
+                for n, path in enumerate(out_paths):
+                    stored_path = os.path.join(entry_dir, '{}{}'.format(n, os.path.splitext(path)[1]))
+                    method = materialize(path, stored_path)
+                    logging.debug('Stored "{}" in transcode cache using {}'.format(path, method))
+                    outputs.append((stored_path, os.path.getsize(stored_path)))
+            else:
+                outputs = [(path, os.path.getsize(path)) for path in out_paths]
+        except OSError as e:
+            logging.warning('Unable to store conversion result in transcode cache: {}'.format(str(e)))
+            self._remove(entry_id, self._mode, outputs)
+            self._db.commit()
+            return
+        self._db.execute(
+            'UPDATE entries SET outputs = ?, total_size = ? WHERE id = ?',
+            (json.dumps(outputs), sum([size for path, size in outputs]), entry_id)
+        )
+        self._db.commit()
+        self._evict()
+
+    def _remove(self, entry_id: int, mode: str, outputs: list) -> None:
+        if mode == 'store':
+            shutil.rmtree(os.path.join(self._objects_dir, str(entry_id)), ignore_errors=True)
+        self._db.execute('DELETE FROM entries WHERE id = ?', (entry_id, ))
+
+    def _evict(self) -> None:
+        total_size = self._db.execute('SELECT COALESCE(SUM(total_size), 0) FROM entries').fetchone()[0]
+        if total_size <= self._max_size:
+            return
+        logging.debug('Transcode cache size {} exceeds the limit {} - evicting...'.format(total_size, self._max_size))
+        for entry_id, mode, outputs, size in self._db.execute(
+                'SELECT id, mode, outputs, total_size FROM entries ORDER BY last_access').fetchall():
+            if total_size <= self._max_size:
+                break
+            self._remove(entry_id, mode, json.loads(outputs))
+            total_size -= size
+        self._db.commit()
+
+    def close(self) -> None:
+        """ Закрывает базу данных кэша
+
+        """
+        self._db.commit()
+        self._db.close()
@@ -0,0 +1,32 @@
+""" Модуль с функциями для работы с URL входных файлов
+
+Модуль импортируется при каждом запуске приложения, поэтому не использует сетевые модули (`http.client` и т.п.) - они
+подключаются в `utils.http_source` лишь при обработке URL. `urllib.parse` (вместе с `ipaddress`) импортируется
+функциями, которым он нужен: `is_url` вызывается для каждого входного пути, в том числе локального.
+"""
+
+import os
+
+
+def is_url(path: str) -> bool:
+    """ Проверяет, является ли путь URL HTTP(S)
+
+    """
+    return path.startswith(('http://', 'https://'))
+
+
+def get_basename(url: str) -> str:
+    """ Возвращает имя файла из URL
+
+    """
+    from urllib.parse import unquote, urlsplit
+    return unquote(urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1])
+
+
+def join(base_url: str, rel_path: str) -> str:
+    """ Добавляет к URL папки относительный путь (с разделителями `/` или `os.sep`)
+
+    """
+    from urllib.parse import quote
+    parts = rel_path.replace(os.sep, '/').split('/')
+    return '{}/{}'.format(base_url.rstrip('/'), '/'.join([quote(p) for p in parts if p]))